@@ -1,7 +1,14 @@
-# -*- coding: utf-8 -*-
 from __future__ import annotations
+
 import frappe  # MUST come before any @frappe.whitelist()
 
+from it.capabilities import child_doctype, has_field
+from it.handlers.delivery_bom_ledger import ROW_LINK_FIELD, TRACE_FIELD, pending_order_qty
+from it.handlers.response_cache import cached_rows, response_version
+from it.instrumentation import instrumented, lap
+from it.payload import not_modified, shape
+
+
 # ----------------------------------------------------------------------
 # helpers
 # ----------------------------------------------------------------------
@@ -12,22 +19,148 @@ def _f(v):
         return 0.0
 
 
-def _has(meta, fieldname: str) -> bool:
-    try:
-        return bool(meta.get_field(fieldname))
-    except Exception:
-        return False
+# ----------------------------------------------------------------------
+# Item master loader (request scoped)
+# ----------------------------------------------------------------------
+# One `IN (...)` query per batch of unseen item codes; every later lookup is
+# served from a map kept on `frappe.local`, so it lives exactly as long as the
+# current request / background job.
+ITEM_ATTR_FIELDS = ("item_name", "stock_uom", "purchase_uom", "sales_uom", "last_purchase_rate")
+
+
+def _item_cache() -> dict:
+    cache = getattr(frappe.local, "it_item_cache", None)
+    if cache is None:
+        cache = frappe.local.it_item_cache = {"items": {}, "hits": 0, "misses": 0, "queries": 0}
+    return cache
+
+
+def _prefetch_items(item_codes) -> None:
+    """Load Item attributes for every code not cached yet, in a single query."""
+    cache = _item_cache()
+    items = cache["items"]
+    missing = list({c for c in (item_codes or []) if c and c not in items})
+    if not missing:
+        return
+
+    cache["queries"] += 1
+    for d in frappe.get_all(
+        "Item",
+        filters={"name": ["in", missing]},
+        fields=["name", *ITEM_ATTR_FIELDS],
+    ):
+        items[d.name] = d
+
+    # remember unknown codes too, so a typo does not cost a query per row
+    for code in missing:
+        items.setdefault(code, None)
+
+
+def _item_attr(item_code: str, fieldname: str):
+    if not item_code:
+        return None
+    cache = _item_cache()
+    if item_code in cache["items"]:
+        cache["hits"] += 1
+    else:
+        cache["misses"] += 1
+        _prefetch_items([item_code])
+    d = cache["items"].get(item_code)
+    return d.get(fieldname) if d else None
 
 
 def _item_name(item_code: str) -> str:
     if not item_code:
         return ""
-    return frappe.db.get_value("Item", item_code, "item_name") or item_code
+    return _item_attr(item_code, "item_name") or item_code
+
+
+def _stock_uom(item_code: str) -> str | None:
+    return _item_attr(item_code, "stock_uom")
+
+
+def get_item_cache_stats() -> dict:
+    """Hit / miss counters of the request-scoped Item loader."""
+    cache = _item_cache()
+    return {
+        "items": len(cache["items"]),
+        "hits": cache["hits"],
+        "misses": cache["misses"],
+        "queries": cache["queries"],
+    }
+
+
+def _component_description(description: str | None, parents: list[str]) -> str:
+    desc = description or ""
+    if parents:
+        note = f"Component of {', '.join(parents)}"
+        desc = f"{desc}\n{note}" if desc else note
+    return desc
+
+
+def _row_item_codes(rows, *fieldnames: str) -> list[str]:
+    fieldnames = fieldnames or ("item",)
+    codes = []
+    for r in (rows or []):
+        for f in fieldnames:
+            code = r.get(f)
+            if code:
+                codes.append(code)
+                break
+    return codes
+
+
+# ----------------------------------------------------------------------
+# Projected child-table reader
+# ----------------------------------------------------------------------
+# The core mappers already load the source document; reading a child table
+# again through frappe.get_doc would hydrate every other table, tax row and
+# link a second time. These helpers read only the columns we copy, ordered
+# by idx, in one query.
+DELIVERY_BOM_FIELDS = (
+    "item", "item_name", "description", "qty", "custom_parent_product",
+    "delivered_qty", "billed_qty", "ordered_qty",
+)
+OPPORTUNITY_BUNDLE_FIELDS = ("item_code", "description", "qty", "uom", "custom_product")
 
 
-def _delivery_bom_rows_from_opportunity(opp) -> list[dict]:
+def _child_doctype(parenttype: str, parentfield: str) -> str | None:
+    return child_doctype(parenttype, parentfield)
+
+
+def _child_rows(parenttype: str, parent: str, parentfield: str, fields, run: bool = True):
+    """Read `fields` of one child table of one document, ordered by idx (run=False: the SQL)."""
+    child_doctype = _child_doctype(parenttype, parentfield)
+    if not parent or not child_doctype:
+        return []
+
+    fields = [f for f in fields if has_field(child_doctype, f)]
+    return frappe.get_all(
+        child_doctype,
+        filters={"parenttype": parenttype, "parent": parent, "parentfield": parentfield},
+        fields=["name", "idx", *fields],
+        order_by="idx asc",
+        run=run,
+    )
+
+
+def _delivery_bom_rows(parenttype: str, parent: str) -> list:
+    return _child_rows(parenttype, parent, "custom_delivery_bom", DELIVERY_BOM_FIELDS)
+
+
+def delivery_bom_rows_query(parenttype: str, parent: str) -> str:
+    """SQL that _delivery_bom_rows() runs (EXPLAINed by it.indexes)."""
+    return _child_rows(parenttype, parent, "custom_delivery_bom", DELIVERY_BOM_FIELDS, run=False)
+
+
+def _opportunity_bundle_rows(opportunity: str) -> list:
+    return _child_rows("Opportunity", opportunity, "custom_product_bundle", OPPORTUNITY_BUNDLE_FIELDS)
+
+
+def _delivery_bom_rows_from_opportunity(bundle_rows) -> list[dict]:
     rows: list[dict] = []
-    for r in (opp.get("custom_product_bundle") or []):
+    _prefetch_items(_row_item_codes(bundle_rows, "item_code"))
+    for r in (bundle_rows or []):
         item_code = r.get("item_code")
         if not item_code:
             continue
@@ -42,9 +175,10 @@ def _delivery_bom_rows_from_opportunity(opp) -> list[dict]:
     return rows
 
 
-def _delivery_bom_rows_from_doc(doc) -> list[dict]:
+def _delivery_bom_rows_from_doc(bom_rows) -> list[dict]:
     rows: list[dict] = []
-    for r in (doc.get("custom_delivery_bom") or []):
+    _prefetch_items(_row_item_codes(bom_rows, "item", "item_code"))
+    for r in (bom_rows or []):
         item_code = r.get("item") or r.get("item_code")
         if not item_code:
             continue
@@ -54,7 +188,7 @@ def _delivery_bom_rows_from_doc(doc) -> list[dict]:
             "description": r.get("description") or "",
             "qty": _f(r.get("qty")),
         }
-        if hasattr(r, "custom_parent_product"):
+        if "custom_parent_product" in r:
             row["custom_parent_product"] = r.get("custom_parent_product")
         rows.append(row)
     return rows
@@ -64,6 +198,7 @@ def _delivery_bom_rows_from_doc(doc) -> list[dict]:
 # 1) Opportunity -> Quotation   (copy Product Bundle -> custom_delivery_bom)
 # ----------------------------------------------------------------------
 @frappe.whitelist()
+@instrumented
 def make_quotation_with_bundle(source_name: str, target_doc: dict | None = None):
     """
     Call ERPNext core Opportunity->Quotation mapping, then also copy:
@@ -74,26 +209,26 @@ def make_quotation_with_bundle(source_name: str, target_doc: dict | None = None)
     )
 
     qtn = core_make_quotation(source_name, target_doc)
-
-    try:
-        opp = frappe.get_doc("Opportunity", source_name)
-    except frappe.DoesNotExistError:
-        return qtn
+    lap("core_mapping")
 
     # ensure child exists, then (re)fill
     if not hasattr(qtn, "custom_delivery_bom"):
         return qtn
 
+    bundle_rows = _opportunity_bundle_rows(source_name)
+
     qtn.custom_delivery_bom = []
-    for r in (opp.get("custom_product_bundle") or []):
+    _prefetch_items(_row_item_codes(bundle_rows, "item_code"))
+    for r in bundle_rows:
         item_code = r.get("item_code")
         if not item_code:
             continue
         row = qtn.append("custom_delivery_bom", {})
         row.item        = item_code
-        row.item_name   = frappe.db.get_value("Item", item_code, "item_name") or item_code
+        row.item_name   = _item_name(item_code)
         row.description = r.get("description") or ""
         row.qty         = _f(r.get("qty"))
+    lap("bundle_append")
 
     qtn.flags.ignore_permissions = True
     try:
@@ -101,6 +236,7 @@ def make_quotation_with_bundle(source_name: str, target_doc: dict | None = None)
         qtn.run_method("calculate_taxes_and_totals")
     except Exception:
         pass
+    lap("totals")
 
     return qtn
 
@@ -109,6 +245,7 @@ def make_quotation_with_bundle(source_name: str, target_doc: dict | None = None)
 # 2) Quotation -> Sales Order   (carry custom_delivery_bom forward)
 # ----------------------------------------------------------------------
 @frappe.whitelist()
+@instrumented
 def make_sales_order_with_bundle(source_name: str, target_doc: dict | None = None):
     """
     Call ERPNext core Quotation->Sales Order mapping, then copy:
@@ -119,25 +256,25 @@ def make_sales_order_with_bundle(source_name: str, target_doc: dict | None = Non
     )
 
     so = core_make_sales_order(source_name, target_doc)
-
-    try:
-        qtn = frappe.get_doc("Quotation", source_name)
-    except frappe.DoesNotExistError:
-        return so
+    lap("core_mapping")
 
     if not hasattr(so, "custom_delivery_bom"):
         return so
 
+    bom_rows = _delivery_bom_rows("Quotation", source_name)
+
     so.custom_delivery_bom = []
-    for r in (qtn.get("custom_delivery_bom") or []):
+    _prefetch_items(_row_item_codes(bom_rows))
+    for r in bom_rows:
         item_code = r.get("item")
         if not item_code:
             continue
         row = so.append("custom_delivery_bom", {})
         row.item        = item_code
-        row.item_name   = r.get("item_name") or frappe.db.get_value("Item", item_code, "item_name") or item_code
+        row.item_name   = r.get("item_name") or _item_name(item_code)
         row.description = r.get("description") or ""
         row.qty         = _f(r.get("qty"))
+    lap("bundle_append")
 
     so.flags.ignore_permissions = True
     try:
@@ -145,6 +282,7 @@ def make_sales_order_with_bundle(source_name: str, target_doc: dict | None = Non
         so.run_method("calculate_taxes_and_totals")
     except Exception:
         pass
+    lap("totals")
 
     return so
 
@@ -153,34 +291,42 @@ def make_sales_order_with_bundle(source_name: str, target_doc: dict | None = Non
 # 3) Sales Order -> Delivery Note   (append components, no SO link, rate=0)
 # ----------------------------------------------------------------------
 @frappe.whitelist()
+@instrumented
 def make_delivery_note_merged(source_name: str, target_doc: dict | None = None):
     """
     1) Use ERPNext core mapper for SO Items (keeps so_detail links).
     2) Append extra rows from Sales Order.custom_delivery_bom without SO linkage,
        and with rate = 0 (parent SO item carries the price).
+       Only the quantity not yet delivered (Delivery BOM ledger) is appended.
     """
     from erpnext.selling.doctype.sales_order.sales_order import (
         make_delivery_note as core_make_delivery_note,
     )
 
     dn = core_make_delivery_note(source_name, target_doc)
+    lap("core_mapping")
 
-    try:
-        so = frappe.get_doc("Sales Order", source_name)
-    except frappe.DoesNotExistError:
-        return dn
+    bom_rows = _delivery_bom_rows("Sales Order", source_name)
+    link_rows = has_field("Delivery Note Item", ROW_LINK_FIELD)
 
-    for r in (so.get("custom_delivery_bom") or []):
+    _prefetch_items(_row_item_codes(bom_rows))
+    for r in bom_rows:
         item_code = r.get("item")
         if not item_code:
             continue
 
+        pending = _f(r.get("qty")) - _f(r.get("delivered_qty"))
+        if pending <= 0:
+            continue
+
         dnr = dn.append("items", {})
         dnr.item_code   = item_code
-        dnr.item_name   = r.get("item_name") or frappe.db.get_value("Item", item_code, "item_name") or item_code
+        dnr.item_name   = r.get("item_name") or _item_name(item_code)
         dnr.description = r.get("description") or ""
-        dnr.uom         = frappe.db.get_value("Item", item_code, "stock_uom")
-        dnr.qty         = _f(r.get("qty"))
+        dnr.uom         = _stock_uom(item_code)
+        dnr.qty         = pending
+        if link_rows:
+            dnr.set(ROW_LINK_FIELD, r.name)
 
         # DO NOT set sales order links on these component rows
         # dnr.against_sales_order = None
@@ -190,6 +336,7 @@ def make_delivery_note_merged(source_name: str, target_doc: dict | None = None):
         dnr.rate = 0
         dnr.discount_percentage = 0
         dnr.discount_amount = 0
+    lap("bundle_append")
 
     dn.flags.ignore_permissions = True
     try:
@@ -197,6 +344,7 @@ def make_delivery_note_merged(source_name: str, target_doc: dict | None = None):
         dn.run_method("calculate_taxes_and_totals")
     except Exception:
         pass
+    lap("totals")
 
     return dn
 
@@ -205,47 +353,61 @@ def make_delivery_note_merged(source_name: str, target_doc: dict | None = None):
 # 4) Sales Order -> Sales Invoice   (append bundle rows, rate=0)
 # ----------------------------------------------------------------------
 @frappe.whitelist()
+@instrumented
 def make_sales_invoice_merged(source_name: str, target_doc: dict | None = None):
     """
     1) Use ERPNext core mapper for SO Items.
     2) Append extra rows from Sales Order.custom_delivery_bom with rate = 0.
-       Skip if the row already exists (e.g., SI created from DN).
+       Only the quantity not yet billed (Delivery BOM ledger) and not already
+       on this invoice (e.g., SI created from DN) is appended.
     """
     from erpnext.selling.doctype.sales_order.sales_order import (
         make_sales_invoice as core_make_sales_invoice,
     )
 
     si = core_make_sales_invoice(source_name, target_doc)
+    lap("core_mapping")
 
-    try:
-        so = frappe.get_doc("Sales Order", source_name)
-    except frappe.DoesNotExistError:
-        return si
-
-    existing = {
-        (d.item_code, _f(d.qty), (d.description or "").strip())
-        for d in (si.items or [])
-        if d.item_code
-    }
+    bom_rows = _delivery_bom_rows("Sales Order", source_name)
 
-    for r in (so.get("custom_delivery_bom") or []):
+    link_rows = has_field("Sales Invoice Item", ROW_LINK_FIELD)
+
+    # component qty already on this invoice, per Delivery BOM row; rows without
+    # a link (created before the ledger) still match on (item, qty, description)
+    on_invoice: dict[str, float] = {}
+    unlinked = set()
+    for d in (si.items or []):
+        row_name = d.get(ROW_LINK_FIELD) if link_rows else None
+        if row_name:
+            on_invoice[row_name] = on_invoice.get(row_name, 0.0) + _f(d.qty)
+        elif d.item_code:
+            unlinked.add((d.item_code, _f(d.qty), (d.description or "").strip()))
+
+    _prefetch_items(_row_item_codes(bom_rows))
+    for r in bom_rows:
         item_code = r.get("item")
         if not item_code:
             continue
 
-        key = (item_code, _f(r.get("qty")), (r.get("description") or "").strip())
-        if key in existing:
+        if r.name not in on_invoice and (item_code, _f(r.get("qty")), (r.get("description") or "").strip()) in unlinked:
+            continue
+
+        pending = _f(r.get("qty")) - _f(r.get("billed_qty")) - on_invoice.get(r.name, 0.0)
+        if pending <= 0:
             continue
 
         sir = si.append("items", {})
         sir.item_code   = item_code
         sir.item_name   = r.get("item_name") or _item_name(item_code)
         sir.description = r.get("description") or ""
-        sir.uom         = frappe.db.get_value("Item", item_code, "stock_uom")
-        sir.qty         = _f(r.get("qty"))
+        sir.uom         = _stock_uom(item_code)
+        sir.qty         = pending
+        if link_rows:
+            sir.set(ROW_LINK_FIELD, r.name)
         sir.rate = 0
         sir.discount_percentage = 0
         sir.discount_amount = 0
+    lap("bundle_append")
 
     si.flags.ignore_permissions = True
     try:
@@ -253,6 +415,7 @@ def make_sales_invoice_merged(source_name: str, target_doc: dict | None = None):
         si.run_method("calculate_taxes_and_totals")
     except Exception:
         pass
+    lap("totals")
 
     return si
 
@@ -260,75 +423,150 @@ def make_sales_invoice_merged(source_name: str, target_doc: dict | None = None):
 # ----------------------------------------------------------------------
 # 5) Utility APIs used by client scripts
 # ----------------------------------------------------------------------
+def _versioned_rows(method: str, doctype: str, name: str, loader, fields, compact):
+    """
+    Rows of a get_delivery_bom_from_* endpoint. The source document's modified is
+    read first: a browser GET that already holds this version gets a 304 (None
+    here) without loading anything, everything else gets the cached rows.
+    """
+    modified = frappe.db.get_value(doctype, name, "modified") if name else None
+    if not_modified(method, response_version(doctype, name, modified), fields, compact):
+        return None
+    return shape(cached_rows(doctype, name, loader, modified), fields, compact)
+
+
 @frappe.whitelist()
-def get_delivery_bom_from_opportunity_bundle(opportunity_name: str):
-    try:
-        opp = frappe.get_doc("Opportunity", opportunity_name)
-    except frappe.DoesNotExistError:
-        return []
-    return _delivery_bom_rows_from_opportunity(opp)
+@instrumented
+def get_delivery_bom_from_opportunity_bundle(opportunity_name: str, fields=None, compact: int = 0):
+    return _versioned_rows(
+        "it.api.get_delivery_bom_from_opportunity_bundle", "Opportunity", opportunity_name,
+        lambda: _delivery_bom_rows_from_opportunity(_opportunity_bundle_rows(opportunity_name)),
+        fields, compact,
+    )
 
 
 @frappe.whitelist()
-def get_delivery_bom_from_quotation(quotation_name: str):
-    try:
-        qtn = frappe.get_doc("Quotation", quotation_name)
-    except frappe.DoesNotExistError:
-        return []
-    return _delivery_bom_rows_from_doc(qtn)
+@instrumented
+def get_delivery_bom_from_quotation(quotation_name: str, fields=None, compact: int = 0):
+    return _versioned_rows(
+        "it.api.get_delivery_bom_from_quotation", "Quotation", quotation_name,
+        lambda: _delivery_bom_rows_from_doc(_delivery_bom_rows("Quotation", quotation_name)),
+        fields, compact,
+    )
 
 
 @frappe.whitelist()
-def get_delivery_bom_from_sales_order(sales_order_name: str):
-    try:
-        so = frappe.get_doc("Sales Order", sales_order_name)
-    except frappe.DoesNotExistError:
-        return []
-    return _delivery_bom_rows_from_doc(so)
+@instrumented
+def get_delivery_bom_from_sales_order(sales_order_name: str, fields=None, compact: int = 0):
+    return _versioned_rows(
+        "it.api.get_delivery_bom_from_sales_order", "Sales Order", sales_order_name,
+        lambda: _delivery_bom_rows_from_doc(_delivery_bom_rows("Sales Order", sales_order_name)),
+        fields, compact,
+    )
 
 
 # ----------------------------------------------------------------------
 # 6) Sales Order -> Purchase Order   (items + custom_delivery_bom)
 # ----------------------------------------------------------------------
 @frappe.whitelist()
-def make_purchase_order_from_so_bundle(sales_order: str):
+@instrumented
+def make_purchase_order_from_so_bundle(sales_order: str, consolidate: int = 0):
+    """
+    Purchase Order with one line per Sales Order item plus one per custom_delivery_bom row.
+
+    consolidate=1 merges component lines sharing (item_code, uom, conversion_factor)
+    into one line with the summed qty; the contributing Delivery BOM rows and parent
+    products are kept in custom_bundle_trace. Sales Order item lines are never merged,
+    they keep their sales_order_item link for ERPNext's ordered qty bookkeeping.
+    """
+    consolidate = frappe.utils.cint(consolidate)
     so = frappe.get_doc("Sales Order", sales_order)
+    lap("load_sales_order")
 
     po = frappe.new_doc("Purchase Order")
     po.company = so.company
     po.currency = so.currency
+    append_so_bundle_lines(po, so, consolidate)
+    lap("bundle_append")
 
+    po.flags.ignore_permissions = True
+    try:
+        po.run_method("set_missing_values")
+        po.run_method("calculate_taxes_and_totals")
+    except Exception:
+        pass
+    lap("totals")
+
+    return po
+
+
+def append_so_bundle_lines(po, so, consolidate: int = 0, pending: dict | None = None) -> None:
+    """
+    Append the Sales Order item and custom_delivery_bom lines of `so` to `po`.
+
+    `pending` ({"items": {so item: stock qty}, "rows": {delivery bom row: qty}})
+    replaces the full quantities with what is still to order; None orders everything.
+    """
     schedule_date = getattr(so, "delivery_date", None) or frappe.utils.today()
 
-    po_item_meta = frappe.get_meta("Purchase Order Item")
+    has_so_link = has_field("Purchase Order Item", "sales_order")
+    has_so_item_link = has_field("Purchase Order Item", "sales_order_item")
+    has_bom_row_link = has_field("Purchase Order Item", ROW_LINK_FIELD)
+    has_trace = has_field("Purchase Order Item", TRACE_FIELD)
+
+    # consolidation: (item_code, uom, conversion_factor) -> merged line state
+    merged: dict[tuple, dict] = {}
 
     def add_po_item(item_code: str, item_name: str, description: str, qty: float, uom: str | None = None,
-                    conversion_factor: float | None = None, sales_order_item: str | None = None):
+                    conversion_factor: float | None = None, sales_order_item: str | None = None,
+                    delivery_bom_row: str | None = None, parent_product: str | None = None):
         if not item_code or qty <= 0:
             return
 
+        uom = uom or _stock_uom(item_code)
+        conversion_factor = conversion_factor or 1
+        key = (item_code, uom, conversion_factor)
+        if consolidate and not sales_order_item and key in merged:
+            line = merged[key]
+            line["row"].qty += _f(qty)
+            line["trace"].append([delivery_bom_row, parent_product, _f(qty)])
+            return
+
         row = po.append("items", {})
         row.item_code = item_code
         row.item_name = item_name or _item_name(item_code)
         row.description = description or ""
         row.qty = _f(qty)
-        row.uom = uom or frappe.db.get_value("Item", item_code, "stock_uom")
-        row.conversion_factor = conversion_factor or 1
+        row.uom = uom
+        row.conversion_factor = conversion_factor
         row.schedule_date = schedule_date
         row.rate = 0
 
-        if _has(po_item_meta, "sales_order"):
+        if consolidate and not sales_order_item:
+            merged[key] = {"row": row, "trace": [[delivery_bom_row, parent_product, _f(qty)]]}
+
+        if has_so_link:
             row.sales_order = so.name
-        if sales_order_item and _has(po_item_meta, "sales_order_item"):
+        if sales_order_item and has_so_item_link:
             row.sales_order_item = sales_order_item
+        if delivery_bom_row and has_bom_row_link:
+            row.set(ROW_LINK_FIELD, delivery_bom_row)
+
+    _prefetch_items(
+        [it.item_code for it in (so.items or []) if it.item_code]
+        + _row_item_codes(so.get("custom_delivery_bom"))
+    )
 
     # 1) Add Sales Order items (parent/main rows)
     for it in (so.items or []):
+        qty = _f(it.qty)
+        if pending is not None:
+            qty = pending["items"].get(it.name, 0.0) / (_f(getattr(it, "conversion_factor", 1)) or 1)
         add_po_item(
             item_code=it.item_code,
             item_name=it.item_name,
             description=it.description,
-            qty=_f(it.qty),
+            qty=qty,
             uom=it.uom,
             conversion_factor=_f(getattr(it, "conversion_factor", 1)),
             sales_order_item=it.name,
@@ -340,40 +578,48 @@ def make_purchase_order_from_so_bundle(sales_order: str):
         if not item_code:
             continue
 
-        desc = r.get("description") or ""
-        if hasattr(r, "custom_parent_product") and r.get("custom_parent_product"):
-            desc = f"{desc}\nComponent of {r.get('custom_parent_product')}" if desc else f"Component of {r.get('custom_parent_product')}"
+        parent_product = r.get("custom_parent_product") if hasattr(r, "custom_parent_product") else None
+        desc = _component_description(r.get("description"), [parent_product] if parent_product else [])
 
         add_po_item(
             item_code=item_code,
             item_name=r.get("item_name"),
             description=desc,
-            qty=_f(r.get("qty")),
+            qty=_f(r.get("qty")) if pending is None else pending["rows"].get(r.name, 0.0),
             uom=None,
             conversion_factor=1,
             sales_order_item=None,
+            delivery_bom_row=r.name,
+            parent_product=parent_product,
         )
 
-    po.flags.ignore_permissions = True
-    try:
-        po.run_method("set_missing_values")
-        po.run_method("calculate_taxes_and_totals")
-    except Exception:
-        pass
-
-    return po
+    # 3) Consolidated lines: drop the single-row link, keep a compact trace instead
+    bom_desc = {r.name: r.get("description") for r in (so.get("custom_delivery_bom") or [])}
+    for line in merged.values():
+        trace = line["trace"]
+        if len(trace) < 2:
+            continue
+        row = line["row"]
+        parents = list(dict.fromkeys(t[1] for t in trace if t[1]))
+        row.description = _component_description(bom_desc.get(trace[0][0]), parents)
+        if has_bom_row_link:
+            row.set(ROW_LINK_FIELD, None)
+        if has_trace:
+            row.set(TRACE_FIELD, frappe.as_json(trace, indent=None))
 
 
 # ----------------------------------------------------------------------
 # 7) Sales Order -> Purchase Order override (include custom_delivery_bom)
 # ----------------------------------------------------------------------
 @frappe.whitelist()
+@instrumented
 def make_purchase_order_merged(source_name: str, target_doc: dict | None = None):
     # ignore target_doc to avoid core checks and ensure BOM items are included
     return make_purchase_order_from_so_bundle(source_name)
 
 
 @frappe.whitelist()
+@instrumented
 def make_purchase_order_from_so_selection(sales_order: str, selections):
     """
     Create a Purchase Order from a Sales Order using a custom selection list
@@ -388,19 +634,23 @@ def make_purchase_order_from_so_selection(sales_order: str, selections):
       - uom (optional)
       - conversion_factor (optional)
       - sales_order_item (optional, for SO rows)
+      - delivery_bom_row (optional, for BOM rows)
     """
     selections = frappe.parse_json(selections)
     if not isinstance(selections, list):
         return None
 
     so = frappe.get_doc("Sales Order", sales_order)
+    lap("load_sales_order")
 
     po = frappe.new_doc("Purchase Order")
     po.company = so.company
     po.currency = so.currency
 
     schedule_date = getattr(so, "delivery_date", None) or frappe.utils.today()
-    po_item_meta = frappe.get_meta("Purchase Order Item")
+    has_so_link = has_field("Purchase Order Item", "sales_order")
+    has_so_item_link = has_field("Purchase Order Item", "sales_order_item")
+    has_bom_row_link = has_field("Purchase Order Item", ROW_LINK_FIELD)
 
     def add_po_item(row: dict):
         item_code = row.get("item_code")
@@ -413,20 +663,25 @@ def make_purchase_order_from_so_selection(sales_order: str, selections):
         d.item_name = row.get("item_name") or _item_name(item_code)
         d.description = row.get("description") or ""
         d.qty = qty
-        d.uom = row.get("uom") or frappe.db.get_value("Item", item_code, "stock_uom")
+        d.uom = row.get("uom") or _stock_uom(item_code)
         d.conversion_factor = _f(row.get("conversion_factor") or 1)
         d.schedule_date = schedule_date
         d.rate = 0
 
-        if _has(po_item_meta, "sales_order"):
+        if has_so_link:
             d.sales_order = so.name
         so_item = row.get("sales_order_item")
-        if so_item and _has(po_item_meta, "sales_order_item"):
+        if so_item and has_so_item_link:
             d.sales_order_item = so_item
+        bom_row = row.get("delivery_bom_row")
+        if bom_row and has_bom_row_link:
+            d.set(ROW_LINK_FIELD, bom_row)
 
+    _prefetch_items(_row_item_codes([r for r in selections if isinstance(r, dict)], "item_code"))
     for row in selections:
         if isinstance(row, dict):
             add_po_item(row)
+    lap("bundle_append")
 
     po.flags.ignore_permissions = True
     try:
@@ -434,6 +689,7 @@ def make_purchase_order_from_so_selection(sales_order: str, selections):
         po.run_method("calculate_taxes_and_totals")
     except Exception:
         pass
+    lap("totals")
 
     return po
 
@@ -442,16 +698,22 @@ def make_purchase_order_from_so_selection(sales_order: str, selections):
 # 8) Sales Order -> Purchase Order item picker (include custom_delivery_bom)
 # ----------------------------------------------------------------------
 @frappe.whitelist()
-def get_items_merged(source_name: str, target_doc: dict | None = None):
+@instrumented
+def get_items_merged(source_name: str, target_doc: dict | None = None, fields=None, compact: int = 0):
     """
     Extend ERPNext Sales Order -> Purchase Order item picker to include
-    Sales Order.custom_delivery_bom rows.
+    Sales Order.custom_delivery_bom rows, with pending_qty net of submitted POs.
     """
+    return shape(_get_items_merged(source_name, target_doc), fields, compact)
+
+
+def _get_items_merged(source_name: str, target_doc: dict | None = None):
     from erpnext.selling.doctype.sales_order.sales_order import (
         get_items as core_get_items,
     )
 
     base = core_get_items(source_name, target_doc)
+    lap("core_mapping")
 
     # normalize to list
     if isinstance(base, dict) and "items" in base:
@@ -461,33 +723,44 @@ def get_items_merged(source_name: str, target_doc: dict | None = None):
         items_list = base if isinstance(base, list) else []
         container = None
 
-    try:
-        so = frappe.get_doc("Sales Order", source_name)
-    except frappe.DoesNotExistError:
+    so = frappe.db.get_value("Sales Order", source_name, ["name", "delivery_date"], as_dict=True)
+    if not so:
         return base
 
-    schedule_date = getattr(so, "delivery_date", None) or frappe.utils.today()
+    schedule_date = so.delivery_date or frappe.utils.today()
 
-    for r in (so.get("custom_delivery_bom") or []):
+    bom_rows = _delivery_bom_rows("Sales Order", so.name)
+    pending_of = pending_order_qty(bom_rows, so.name)
+
+    _prefetch_items(_row_item_codes(bom_rows))
+    for r in bom_rows:
         item_code = r.get("item")
         if not item_code:
             continue
 
+        # skip components already fully covered by submitted Purchase Orders
+        pending = pending_of.get(r.name, 0.0)
+        if pending <= 0:
+            continue
+
         qty = _f(r.get("qty"))
+        stock_uom = _stock_uom(item_code)
         row = {
             "item_code": item_code,
             "item_name": r.get("item_name") or _item_name(item_code),
             "description": r.get("description") or "",
             "qty": qty,
-            "pending_qty": qty,
-            "uom": frappe.db.get_value("Item", item_code, "stock_uom"),
-            "stock_uom": frappe.db.get_value("Item", item_code, "stock_uom"),
+            "pending_qty": pending,
+            "uom": stock_uom,
+            "stock_uom": stock_uom,
             "conversion_factor": 1,
             "schedule_date": schedule_date,
             "supplier": None,
             "sales_order_item": None,
+            "delivery_bom_row": r.name,
         }
         items_list.append(row)
+    lap("bundle_append")
 
     if container is not None:
         container["items"] = items_list
@@ -497,11 +770,18 @@ def get_items_merged(source_name: str, target_doc: dict | None = None):
 
 
 @frappe.whitelist()
+@instrumented
 def get_items_from_sales_order_merged(sales_order: str, *args, **kwargs):
     """
-    Override Purchase Order item picker to include Sales Order.custom_delivery_bom rows.
+    Override Purchase Order item picker to include Sales Order.custom_delivery_bom rows
+    (pending_qty net of submitted POs).
     Compatible with different ERPNext versions by accepting *args/**kwargs.
     """
+    fields, compact = kwargs.pop("fields", None), kwargs.pop("compact", 0)
+    return shape(_get_items_from_sales_order_merged(sales_order, *args, **kwargs), fields, compact)
+
+
+def _get_items_from_sales_order_merged(sales_order: str, *args, **kwargs):
     try:
         from erpnext.buying.doctype.purchase_order.purchase_order import (
             get_items_from_sales_order as core_get_items_from_sales_order,
@@ -510,6 +790,7 @@ def get_items_from_sales_order_merged(sales_order: str, *args, **kwargs):
         return []
 
     base = core_get_items_from_sales_order(sales_order, *args, **kwargs)
+    lap("core_mapping")
 
     # normalize to list
     if isinstance(base, dict) and "items" in base:
@@ -519,34 +800,45 @@ def get_items_from_sales_order_merged(sales_order: str, *args, **kwargs):
         items_list = base if isinstance(base, list) else []
         container = None
 
-    try:
-        so = frappe.get_doc("Sales Order", sales_order)
-    except frappe.DoesNotExistError:
+    so = frappe.db.get_value("Sales Order", sales_order, ["name", "delivery_date"], as_dict=True)
+    if not so:
         return base
 
-    schedule_date = getattr(so, "delivery_date", None) or frappe.utils.today()
+    schedule_date = so.delivery_date or frappe.utils.today()
 
-    for r in (so.get("custom_delivery_bom") or []):
+    bom_rows = _delivery_bom_rows("Sales Order", so.name)
+    pending_of = pending_order_qty(bom_rows, so.name)
+
+    _prefetch_items(_row_item_codes(bom_rows))
+    for r in bom_rows:
         item_code = r.get("item")
         if not item_code:
             continue
 
+        # skip components already fully covered by submitted Purchase Orders
+        pending = pending_of.get(r.name, 0.0)
+        if pending <= 0:
+            continue
+
         qty = _f(r.get("qty"))
+        stock_uom = _stock_uom(item_code)
         row = {
             "item_code": item_code,
             "item_name": r.get("item_name") or _item_name(item_code),
             "description": r.get("description") or "",
             "qty": qty,
-            "pending_qty": qty,
-            "uom": frappe.db.get_value("Item", item_code, "stock_uom"),
-            "stock_uom": frappe.db.get_value("Item", item_code, "stock_uom"),
+            "pending_qty": pending,
+            "uom": stock_uom,
+            "stock_uom": stock_uom,
             "conversion_factor": 1,
             "schedule_date": schedule_date,
             "supplier": None,
             "sales_order": so.name,
             "sales_order_item": None,
+            "delivery_bom_row": r.name,
         }
         items_list.append(row)
+    lap("bundle_append")
 
     if container is not None:
         container["items"] = items_list
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import frappe
+from frappe import _
+
+# ----------------------------------------------------------------------
+# Background variant of the bundle mappers
+# ----------------------------------------------------------------------
+# enqueue_mapping() returns a job id at once; the job runs the same mapper as
+# the synchronous button (core mapping, bundle rows, set_missing_values and
+# calculate_taxes_and_totals), inserts the result as a draft and reports
+# progress to the requesting user on PROGRESS_EVENT. The client helper in
+# public/js/async_mapping.js opens the draft when the "done" stage arrives.
+PROGRESS_EVENT = "it_mapping_progress"
+JOB_TIMEOUT = 3600
+MAPPERS = {
+    # key: (mapper, source doctype, target doctype)
+    "quotation": ("it.api.make_quotation_with_bundle", "Opportunity", "Quotation"),
+    "sales_order": ("it.api.make_sales_order_with_bundle", "Quotation", "Sales Order"),
+    "delivery_note": ("it.api.make_delivery_note_merged", "Sales Order", "Delivery Note"),
+}
+
+
+def _job_id(mapper: str, source_name: str) -> str:
+    return f"it-mapping::{mapper}::{source_name}"
+
+
+def _progress(job_id: str, user: str, stage: str, percent: int, **extra) -> None:
+    frappe.publish_realtime(
+        PROGRESS_EVENT, dict(extra, job_id=job_id, stage=stage, percent=percent), user=user
+    )
+
+
+@frappe.whitelist()
+def enqueue_mapping(mapper: str, source_name: str):
+    """Start a background mapping; returns {"job_id"} (one job per mapper and source at a time)."""
+    if mapper not in MAPPERS:
+        frappe.throw(_("Unknown mapping: {0}").format(mapper))
+    _method, source_doctype, target_doctype = MAPPERS[mapper]
+    frappe.has_permission(source_doctype, "read", doc=source_name, throw=True)
+    frappe.has_permission(target_doctype, "create", throw=True)
+
+    job_id = _job_id(mapper, source_name)
+    frappe.enqueue(
+        "it.async_mapping.run_mapping",
+        queue="long",
+        timeout=JOB_TIMEOUT,
+        job_id=job_id,
+        deduplicate=True,
+        mapper=mapper,
+        source_name=source_name,
+        user=frappe.session.user,
+    )
+    return {"job_id": job_id}
+
+
+def run_mapping(mapper: str, source_name: str, user: str):
+    """Job body: map, save the draft, publish progress; errors are logged and reported."""
+    method, _source_doctype, target_doctype = MAPPERS[mapper]
+    job_id = _job_id(mapper, source_name)
+    frappe.set_user(user)
+
+    try:
+        _progress(job_id, user, "mapping", 10)
+        doc = frappe.get_attr(method)(source_name)
+
+        _progress(job_id, user, "saving", 70, rows=len(doc.get("items") or []))
+        doc.flags.ignore_permissions = False
+        doc.insert()
+        frappe.db.commit()
+    except Exception:
+        frappe.db.rollback()
+        frappe.log_error(title=f"Background {target_doctype} mapping failed for {source_name}")
+        _progress(job_id, user, "failed", 100, error=_("Could not create {0} from {1}, see Error Log").format(
+            _(target_doctype), source_name))
+        return
+
+    _progress(job_id, user, "done", 100, doctype=doc.doctype, name=doc.name)
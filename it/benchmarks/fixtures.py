@@ -0,0 +1,180 @@
+"""
+Synthetic documents for the benchmarks: one Opportunity, Quotation and Sales
+Order (all named "BENCH-1") with `rows` bundle / Delivery BOM rows, spread over
+`rows // COMPONENTS_PER_PRODUCT` parent products that each use a Product Bundle.
+"""
+from __future__ import annotations
+
+import random
+
+import frappe
+
+DOC_NAME = "BENCH-1"
+COMPONENTS_PER_PRODUCT = 10
+COMPONENT_POOL = 2000
+
+_ITEM_ROW = {
+    "item_code": ("Link", "Item"),
+    "item_name": ("Data", None),
+    "description": ("Text Editor", None),
+    "qty": ("Float", None),
+    "rate": ("Currency", None),
+    "uom": ("Link", "UOM"),
+    "conversion_factor": ("Float", None),
+}
+
+
+def _metas() -> dict[str, dict[str, tuple]]:
+    metas = {
+        "Item": {f: ("Data", None) for f in ("item_name", "stock_uom", "purchase_uom", "sales_uom", "last_purchase_rate")},
+        "Product Bundle": {"new_item_code": ("Link", "Item"), "items": ("Table", "Product Bundle Item")},
+        "Product Bundle Item": {
+            "item_code": ("Link", "Item"),
+            "description": ("Text Editor", None),
+            "qty": ("Float", None),
+            "uom": ("Link", "UOM"),
+            "custom_product": ("Link", "Item"),
+            "custom_cost": ("Currency", None),
+            "custom_total_cost": ("Float", None),
+        },
+        "Delivery BOM": {
+            "item": ("Link", "Item"),
+            "item_name": ("Data", None),
+            "description": ("Text Editor", None),
+            "qty": ("Float", None),
+            "custom_parent_product": ("Link", "Item"),
+            "delivered_qty": ("Float", None),
+            "billed_qty": ("Float", None),
+            "ordered_qty": ("Float", None),
+        },
+        "Opportunity Item": dict(
+            _ITEM_ROW,
+            custom_product_bundle=("Link", "Product Bundle"),
+            custom_purchase_rate=("Float", None),
+            custom_margin=("Float", None),
+        ),
+        "Quotation Item": dict(_ITEM_ROW, prevdoc_docname=("Link", "Opportunity")),
+        "Sales Order Item": dict(_ITEM_ROW, prevdoc_docname=("Link", "Quotation")),
+        "Delivery Note Item": dict(_ITEM_ROW, against_sales_order=("Link", "Sales Order"), so_detail=("Data", None)),
+        "Sales Invoice Item": dict(_ITEM_ROW, sales_order=("Link", "Sales Order"), so_detail=("Data", None)),
+        "Purchase Order Item": dict(
+            _ITEM_ROW,
+            sales_order=("Link", "Sales Order"),
+            sales_order_item=("Data", None),
+            schedule_date=("Date", None),
+            stock_qty=("Float", None),
+        ),
+    }
+    for dt in ("Delivery Note Item", "Sales Invoice Item", "Purchase Order Item"):
+        metas[dt]["custom_delivery_bom_row"] = ("Data", None)
+    metas["Purchase Order Item"]["custom_bundle_trace"] = ("Small Text", None)
+
+    header = {"company": ("Link", "Company"), "currency": ("Link", "Currency"), "customer": ("Link", "Customer")}
+    metas["Opportunity"] = dict(header, items=("Table", "Opportunity Item"), custom_product_bundle=("Table", "Product Bundle Item"))
+    for dt in ("Quotation", "Sales Order"):
+        metas[dt] = dict(header, items=("Table", f"{dt} Item"), custom_delivery_bom=("Table", "Delivery BOM"))
+    metas["Sales Order"]["delivery_date"] = ("Date", None)
+    for dt in ("Delivery Note", "Sales Invoice", "Purchase Order"):
+        metas[dt] = dict(header, items=("Table", f"{dt} Item"))
+    return metas
+
+
+def _child(doctype: str, parenttype: str, parentfield: str, idx: int, **values) -> dict:
+    return dict(
+        values,
+        name=f"{parenttype[:3]}-{parentfield[:6]}-{idx}",
+        doctype=doctype,
+        parent=DOC_NAME,
+        parenttype=parenttype,
+        parentfield=parentfield,
+        idx=idx,
+    )
+
+
+def build(rows: int, seed: int = 7) -> None:
+    """Replace the stand-in tables with a dataset of `rows` component rows per document."""
+    rnd = random.Random(seed)
+    frappe.METAS.clear()
+    frappe.METAS.update(_metas())
+    frappe.TABLES.clear()
+    frappe.cache().flushall()
+    frappe.reset_request()
+
+    products = max(1, rows // COMPONENTS_PER_PRODUCT)
+    pool = min(COMPONENT_POOL, max(rows, COMPONENTS_PER_PRODUCT))
+    T = frappe.TABLES
+
+    T["Item"] = [
+        {"name": f"P-{p}", "item_name": f"Product {p}", "stock_uom": "Nos", "sales_uom": "Nos"}
+        for p in range(products)
+    ] + [
+        {"name": f"C-{c}", "item_name": f"Component {c}", "stock_uom": "Nos", "purchase_uom": "Box",
+         "last_purchase_rate": rnd.randint(1, 500)}
+        for c in range(pool)
+    ]
+
+    # one Product Bundle per parent product
+    T["Product Bundle"] = [{"name": f"P-{p}", "new_item_code": f"P-{p}"} for p in range(products)]
+    T["Product Bundle Item"] = []
+    for p in range(products):
+        for j in range(COMPONENTS_PER_PRODUCT):
+            T["Product Bundle Item"].append(
+                dict(
+                    name=f"PB-{p}-{j}", parent=f"P-{p}", parenttype="Product Bundle", parentfield="items",
+                    idx=j + 1, item_code=f"C-{rnd.randrange(pool)}", qty=rnd.randint(1, 4), uom="Nos",
+                    description=f"component {j}",
+                )
+            )
+
+    header = {"company": "Bench Co", "currency": "USD", "customer": "Bench Customer",
+              "modified": "2026-01-15 10:00:00.000000", "docstatus": 1}
+    for dt in ("Opportunity", "Quotation", "Sales Order"):
+        T[dt] = [dict(header, name=DOC_NAME, delivery_date="2026-02-01")]
+        T[f"{dt} Item"] = [
+            _child(f"{dt} Item", dt, "items", p + 1, item_code=f"P-{p}", item_name=f"Product {p}", qty=1,
+                   rate=rnd.randint(100, 5000), uom="Nos", conversion_factor=1,
+                   custom_product_bundle=f"P-{p}" if dt == "Opportunity" else None)
+            for p in range(products)
+        ]
+
+    components = [
+        (f"P-{i // COMPONENTS_PER_PRODUCT % products}", f"C-{rnd.randrange(pool)}", rnd.randint(1, 4))
+        for i in range(rows)
+    ]
+    T["Product Bundle Item"] += [
+        _child("Product Bundle Item", "Opportunity", "custom_product_bundle", i + 1, item_code=code,
+               qty=qty, uom="Nos", description=f"component {i}", custom_product=parent,
+               custom_cost=rnd.randint(1, 300))
+        for i, (parent, code, qty) in enumerate(components)
+    ]
+    T["Delivery BOM"] = [
+        _child("Delivery BOM", dt, "custom_delivery_bom", i + 1, item=code, item_name=None, qty=qty,
+               description=f"component {i}", custom_parent_product=parent)
+        for dt in ("Quotation", "Sales Order")
+        for i, (parent, code, qty) in enumerate(components)
+    ]
+
+
+def opportunity_doc(edited: bool = False):
+    """The Opportunity as passed to validate: new, or saved before with one changed row."""
+    doc = frappe.get_doc("Opportunity", DOC_NAME)
+    if edited:
+        doc._doc_before_save = frappe.get_doc("Opportunity", DOC_NAME)
+        doc.items[0].rate = (doc.items[0].rate or 0) + 1
+        rows = doc.custom_product_bundle
+        if rows:
+            rows[-1].custom_cost = (rows[-1].custom_cost or 0) + 1
+    return doc
+
+
+def po_selection(limit: int = 50) -> list[dict]:
+    """Selection payload of the PO dialog: every SO item plus the first Delivery BOM rows."""
+    selection = [
+        {"source": "SO", "item_code": r["item_code"], "qty": r["qty"], "sales_order_item": r["name"]}
+        for r in frappe.TABLES["Sales Order Item"]
+    ]
+    selection += [
+        {"source": "BOM", "item_code": r["item"], "qty": r["qty"], "delivery_bom_row": r["name"]}
+        for r in frappe.TABLES["Delivery BOM"] if r["parenttype"] == "Sales Order"
+    ][:limit]
+    return selection
@@ -0,0 +1,191 @@
+"""
+Offline benchmarks for the `it.api` endpoints and the Opportunity validate hook.
+
+    python -m it.benchmarks.run --sizes 10,100,1000,5000 --output bench.json
+    python -m it.benchmarks.run --baseline bench.json   # non-zero exit on regression
+
+Every case runs against the in-memory stand-in in `standin/` (no MariaDB, no
+Redis). For each case and size the report holds wall time (best / median over
+--repeat fresh requests), Python allocations (tracemalloc peak and retained
+blocks) and the number of stand-in database calls, both cold (empty cache) and
+warm (site cache filled, new request).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+STANDIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "standin")
+if STANDIN not in sys.path:
+    sys.path.insert(0, STANDIN)
+
+import frappe
+
+from it.benchmarks import fixtures
+
+DEFAULT_SIZES = (10, 100, 1000, 5000)
+DEFAULT_REPEAT = 5
+# allowed growth before a case counts as a regression
+WALL_TOLERANCE = 0.25
+
+
+def _cases():
+    """name -> prepare(); prepare() builds the arguments (not measured) and returns the call."""
+    from it import api
+    from it.handlers.opportunity_bundle import on_validate
+
+    name = fixtures.DOC_NAME
+
+    def call(fn, *args, **kwargs):
+        return lambda: (lambda: fn(*args, **kwargs))
+
+    def built(fn, build):
+        """Like call(), with the arguments returned by build() at prepare time."""
+        def prepare():
+            args = build()
+            return lambda: fn(*args)
+        return prepare
+
+    return {
+        "make_quotation_with_bundle": call(api.make_quotation_with_bundle, name),
+        "make_sales_order_with_bundle": call(api.make_sales_order_with_bundle, name),
+        "make_delivery_note_merged": call(api.make_delivery_note_merged, name),
+        "make_sales_invoice_merged": call(api.make_sales_invoice_merged, name),
+        "get_delivery_bom_from_opportunity_bundle": call(api.get_delivery_bom_from_opportunity_bundle, name),
+        "get_delivery_bom_from_quotation": call(api.get_delivery_bom_from_quotation, name),
+        "get_delivery_bom_from_sales_order": call(api.get_delivery_bom_from_sales_order, name),
+        "make_purchase_order_from_so_bundle": call(api.make_purchase_order_from_so_bundle, name),
+        "make_purchase_order_from_so_bundle[consolidate]": call(api.make_purchase_order_from_so_bundle, name, consolidate=1),
+        "make_purchase_order_merged": call(api.make_purchase_order_merged, name),
+        "make_purchase_order_from_so_selection": built(
+            api.make_purchase_order_from_so_selection, lambda: (name, json.dumps(fixtures.po_selection()))
+        ),
+        "get_items_merged": call(api.get_items_merged, name),
+        "get_items_from_sales_order_merged": call(api.get_items_from_sales_order_merged, name),
+        "on_validate[new]": built(on_validate, lambda: (fixtures.opportunity_doc(),)),
+        "on_validate[edited]": built(on_validate, lambda: (fixtures.opportunity_doc(edited=True),)),
+    }
+
+
+def _db_calls() -> dict[str, int]:
+    calls = dict(frappe.CALLS)
+    calls["total"] = sum(calls.values())
+    return calls
+
+
+def _request(prepare) -> tuple[float, dict]:
+    frappe.reset_request()
+    fn = prepare()
+    frappe.reset_request()
+    frappe.reset_calls()
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000.0, _db_calls()
+
+
+def measure(name: str, prepare, rows: int, repeat: int) -> dict:
+    fixtures.build(rows)
+
+    _cold_ms, cold_calls = _request(prepare)
+    timings, warm_calls = [], {}
+    for _ in range(repeat):
+        elapsed, warm_calls = _request(prepare)
+        timings.append(elapsed)
+
+    frappe.reset_request()
+    fn = prepare()
+    frappe.reset_request()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    fn()
+    after = tracemalloc.take_snapshot()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained = sum(s.count_diff for s in after.compare_to(before, "filename") if s.count_diff > 0)
+
+    return {
+        "case": name,
+        "rows": rows,
+        "wall_ms": {
+            "min": round(min(timings), 3),
+            "median": round(statistics.median(timings), 3),
+            "mean": round(statistics.fmean(timings), 3),
+        },
+        "alloc": {"peak_kib": round(peak / 1024, 1), "retained_blocks": retained},
+        "db_calls": warm_calls,
+        "db_calls_cold": cold_calls,
+    }
+
+
+def run(sizes=DEFAULT_SIZES, repeat: int = DEFAULT_REPEAT, only=None) -> dict:
+    cases = _cases()
+    results = []
+    for rows in sizes:
+        for name, prepare in cases.items():
+            if only and not any(o in name for o in only):
+                continue
+            results.append(measure(name, prepare, rows, repeat))
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "sizes": list(sizes),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float = WALL_TOLERANCE) -> list[str]:
+    """Regressions against a previous report: more database calls, or slower beyond `tolerance`."""
+    previous = {(r["case"], r["rows"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in report["results"]:
+        old = previous.get((r["case"], r["rows"]))
+        if not old:
+            continue
+        label = f"{r['case']} @ {r['rows']} rows"
+        for key in ("db_calls", "db_calls_cold"):
+            if r[key]["total"] > old[key]["total"]:
+                regressions.append(f"{label}: {key} {old[key]['total']} -> {r[key]['total']}")
+        if r["wall_ms"]["median"] > old["wall_ms"]["median"] * (1 + tolerance):
+            regressions.append(f"{label}: median {old['wall_ms']['median']} ms -> {r['wall_ms']['median']} ms")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma separated row counts")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--only", action="append", help="run cases whose name contains this text")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="previous JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=WALL_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    report = run([int(s) for s in args.sizes.split(",") if s.strip()], max(1, args.repeat), args.only)
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+
+    payload = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+    for line in report.get("regressions", []):
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
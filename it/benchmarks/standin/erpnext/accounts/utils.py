@@ -0,0 +1,2 @@
+def get_fiscal_year(date=None, company=None, **kwargs):
+    return ("2026", "2026-01-01", "2026-12-31")
@@ -0,0 +1,5 @@
+from erpnext.selling.doctype.sales_order.sales_order import get_items
+
+
+def get_items_from_sales_order(sales_order, *args, **kwargs):
+    return get_items(sales_order)
@@ -0,0 +1,5 @@
+from erpnext.mapper import map_items
+
+
+def make_quotation(source_name, target_doc=None):
+    return map_items("Opportunity", source_name, "Quotation", {"prevdoc_docname": "parent"})
@@ -0,0 +1,19 @@
+"""Shared stand-in for erpnext's get_mapped_doc: load the source, copy its items."""
+from __future__ import annotations
+
+import frappe
+
+ITEM_FIELDS = ("item_code", "item_name", "description", "qty", "rate", "uom", "conversion_factor")
+
+
+def map_items(source_doctype: str, source_name: str, target_doctype: str, link_fields=None):
+    source = frappe.get_doc(source_doctype, source_name)
+    target = frappe.new_doc(target_doctype)
+    for key in ("company", "currency", "customer", "delivery_date"):
+        target.set(key, source.get(key))
+    for item in (source.items or []):
+        row = {f: item.get(f) for f in ITEM_FIELDS}
+        for target_field, source_field in (link_fields or {}).items():
+            row[target_field] = source_name if source_field == "parent" else item.get(source_field)
+        target.append("items", row)
+    return target
@@ -0,0 +1,5 @@
+from erpnext.mapper import map_items
+
+
+def make_sales_order(source_name, target_doc=None):
+    return map_items("Quotation", source_name, "Sales Order", {"prevdoc_docname": "parent"})
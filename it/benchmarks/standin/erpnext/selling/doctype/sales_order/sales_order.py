@@ -0,0 +1,14 @@
+from erpnext.mapper import map_items
+
+
+def make_delivery_note(source_name, target_doc=None):
+    return map_items("Sales Order", source_name, "Delivery Note", {"against_sales_order": "parent", "so_detail": "name"})
+
+
+def make_sales_invoice(source_name, target_doc=None):
+    return map_items("Sales Order", source_name, "Sales Invoice", {"sales_order": "parent", "so_detail": "name"})
+
+
+def get_items(source_name, target_doc=None):
+    doc = map_items("Sales Order", source_name, "Purchase Order", {"sales_order": "parent", "sales_order_item": "name"})
+    return [row.as_dict() for row in doc.items]
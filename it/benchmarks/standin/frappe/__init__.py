@@ -0,0 +1,307 @@
+"""
+In-memory stand-in for the parts of the `frappe` API used by `it.api` and
+`it.handlers`. Tables are plain lists of dicts in TABLES, doctype fields are
+declared in METAS, and every database-shaped call is counted in CALLS.
+
+Only used by `it.benchmarks`; never importable from a bench (the `standin`
+directory is not a package and is put on sys.path by the benchmark runner).
+"""
+from __future__ import annotations
+
+import importlib
+import json
+import os
+import types
+import uuid
+from collections import Counter
+
+
+class _dict(dict):
+    __getattr__ = dict.get
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+    def __delattr__(self, key):
+        del self[key]
+
+    def copy(self):
+        return _dict(self)
+
+
+class ValidationError(Exception):
+    pass
+
+
+class DoesNotExistError(ValidationError):
+    pass
+
+
+class PermissionError(Exception):
+    pass
+
+
+local = types.SimpleNamespace()
+flags = _dict()
+conf = _dict()
+session = _dict(user="Administrator")
+
+TABLES: dict[str, list[dict]] = {}       # doctype -> rows
+METAS: dict[str, dict[str, tuple]] = {}  # doctype -> {fieldname: (fieldtype, options)}
+CALLS: Counter = Counter()               # call name -> count
+
+
+def reset_calls() -> None:
+    CALLS.clear()
+
+
+def reset_request() -> None:
+    """Start a new request: drop everything kept on frappe.local."""
+    local.__dict__.clear()
+    local.site = "bench.localhost"
+    local.db = db
+
+
+# ---- filters / selects -------------------------------------------------
+
+def _compare(op: str, value, arg) -> bool:
+    if op == "=":
+        return value == arg
+    if op == "!=":
+        return value != arg
+    if op == "in":
+        return value in arg
+    if op == "not in":
+        return value not in arg
+    if op == "is":
+        return bool(value) == (arg == "set")
+    if op == "between":
+        return arg[0] <= (value or "") <= arg[1]
+    if op in ("<", "<=", ">", ">="):
+        value = value or 0
+        return {"<": value < arg, "<=": value <= arg, ">": value > arg, ">=": value >= arg}[op]
+    raise NotImplementedError(op)
+
+
+def _match(row: dict, filters) -> bool:
+    if isinstance(filters, (list, tuple)):
+        filters = {f[-3]: [f[-2], f[-1]] for f in filters}
+    for key, cond in (filters or {}).items():
+        if isinstance(cond, (list, tuple)):
+            if not _compare(cond[0], row.get(key), cond[1]):
+                return False
+        elif row.get(key) != cond:
+            return False
+    return True
+
+
+def _select(doctype, filters=None, fields=None, order_by=None, limit=None, pluck=None, distinct=False):
+    rows = [r for r in TABLES.get(doctype, []) if _match(r, filters)]
+    if order_by:
+        for part in reversed([p.strip() for p in order_by.split(",")]):
+            field, _, direction = part.replace("`", "").partition(" ")
+            rows.sort(key=lambda r: (r.get(field) is None, r.get(field) or 0), reverse=direction.strip().lower() == "desc")
+    if limit:
+        rows = rows[: int(limit)]
+    if pluck:
+        values = [r.get(pluck) for r in rows]
+        return list(dict.fromkeys(values)) if distinct else values
+    fields = fields or ["name"]
+    out = [_dict({f: r.get(f) for f in fields}) for r in rows]
+    if distinct:
+        out = list({tuple(d.values()): d for d in out}.values())
+    return out
+
+
+def get_all(doctype, filters=None, fields=None, order_by=None, limit=None, limit_page_length=None,
+            pluck=None, distinct=False, **kwargs):
+    CALLS["get_all"] += 1
+    return _select(doctype, filters, fields, order_by, limit or limit_page_length, pluck, distinct)
+
+
+get_list = get_all
+
+
+# ---- meta --------------------------------------------------------------
+
+class _Meta:
+    def __init__(self, doctype: str):
+        self.name = doctype
+        self._fields = METAS.get(doctype, {})
+
+    def get_field(self, fieldname: str):
+        if fieldname in self._fields:
+            fieldtype, options = self._fields[fieldname]
+            return _dict(fieldname=fieldname, fieldtype=fieldtype, options=options)
+
+    def has_field(self, fieldname: str) -> bool:
+        return fieldname in self._fields
+
+    def get_table_fields(self):
+        return [self.get_field(f) for f, (ft, _o) in self._fields.items() if ft == "Table"]
+
+
+def get_meta(doctype: str):
+    CALLS["get_meta"] += 1
+    if doctype not in METAS:
+        raise DoesNotExistError(f"DocType {doctype} not found")
+    return _Meta(doctype)
+
+
+# ---- cache (redis) -----------------------------------------------------
+
+class _Cache:
+    def __init__(self):
+        self.data: dict = {}
+
+    def get_value(self, key, generator=None, expires=False):
+        if key not in self.data and generator:
+            self.data[key] = generator()
+        return self.data.get(key)
+
+    def set_value(self, key, value, expires_in_sec=None):
+        self.data[key] = value
+
+    def delete_value(self, keys):
+        for key in keys if isinstance(keys, (list, tuple)) else [keys]:
+            self.data.pop(key, None)
+
+    delete_key = delete_value
+
+    def hget(self, name, key, generator=None):
+        h = self.data.setdefault(name, {})
+        if key not in h and generator:
+            h[key] = generator()
+        return h.get(key)
+
+    def hset(self, name, key, value):
+        self.data.setdefault(name, {})[key] = value
+
+    def hdel(self, name, keys):
+        for key in keys if isinstance(keys, (list, tuple)) else [keys]:
+            self.data.get(name, {}).pop(key, None)
+
+    def hgetall(self, name):
+        return dict(self.data.get(name, {}))
+
+    def incrby(self, key, amount=1):
+        self.data[key] = self.data.get(key, 0) + amount
+        return self.data[key]
+
+    def hincrby(self, name, key, amount=1):
+        h = self.data.setdefault(name, {})
+        h[key] = h.get(key, 0) + amount
+        return h[key]
+
+    def make_key(self, key, user=None, shared=False):
+        return key
+
+    def flushall(self):
+        self.data.clear()
+
+
+_cache = _Cache()
+
+
+def cache():
+    return _cache
+
+
+# ---- documents ---------------------------------------------------------
+
+from frappe.model.document import Document
+
+
+def new_doc(doctype: str):
+    return Document({"doctype": doctype})
+
+
+def get_doc(doctype, name=None):
+    if isinstance(doctype, dict):
+        return Document(doctype)
+    CALLS["get_doc"] += 1
+    for row in TABLES.get(doctype, []):
+        if row.get("name") == name:
+            doc = Document(dict(row, doctype=doctype))
+            for fieldname, (fieldtype, options) in METAS.get(doctype, {}).items():
+                if fieldtype == "Table":
+                    doc.set(
+                        fieldname,
+                        [
+                            dict(r, doctype=options)
+                            for r in TABLES.get(options, [])
+                            if r.get("parent") == name and r.get("parenttype") == doctype
+                            and r.get("parentfield") == fieldname
+                        ],
+                    )
+            return doc
+    raise DoesNotExistError(f"{doctype} {name} not found")
+
+
+# ---- misc API ----------------------------------------------------------
+
+def whitelist(*args, **kwargs):
+    if args and callable(args[0]):
+        return args[0]
+    return lambda fn: fn
+
+
+def parse_json(value):
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def as_json(obj, indent=1, separators=None, ensure_ascii=True):
+    return json.dumps(obj, default=str, indent=indent, separators=separators, ensure_ascii=ensure_ascii)
+
+
+def _(msg, *args, **kwargs):
+    return msg
+
+
+def throw(msg, exc=ValidationError, title=None, **kwargs):
+    raise exc(msg)
+
+
+def msgprint(*args, **kwargs):
+    pass
+
+
+def log_error(*args, **kwargs):
+    pass
+
+
+def publish_realtime(*args, **kwargs):
+    pass
+
+
+def enqueue(method, **kwargs):
+    for key in ("queue", "timeout", "job_name", "now", "enqueue_after_commit", "job_id", "deduplicate"):
+        kwargs.pop(key, None)
+    if isinstance(method, str):
+        module, _, fn = method.rpartition(".")
+        method = getattr(importlib.import_module(module), fn)
+    return method(**kwargs)
+
+
+def generate_hash(txt=None, length=10):
+    return uuid.uuid4().hex[:length]
+
+
+def has_permission(*args, **kwargs):
+    return True
+
+
+def only_for(*args, **kwargs):
+    pass
+
+
+def get_hooks(*args, **kwargs):
+    return []
+
+
+def get_app_path(app: str, *parts: str) -> str:
+    return os.path.join(os.path.dirname(importlib.import_module(app).__file__), *parts)
+
+
+# submodules last: they import this module (frappe.db, frappe.utils)
+from frappe import db, utils
@@ -0,0 +1,61 @@
+"""frappe.db stand-in: reads go through frappe._select, writes are no-ops."""
+from __future__ import annotations
+
+import frappe
+
+STANDARD_FIELDS = ("name", "creation", "modified", "docstatus")
+
+
+def get_value(doctype, filters=None, fieldname="name", as_dict=False, **kwargs):
+    frappe.CALLS["get_value"] += 1
+    filters = filters if isinstance(filters, dict) else {"name": filters or doctype}
+    rows = frappe._select(doctype, filters, limit=1, fields=list(frappe.METAS.get(doctype, {})) + list(STANDARD_FIELDS))
+    if not rows:
+        return None
+    row = rows[0]
+    if isinstance(fieldname, (list, tuple)):
+        return frappe._dict({f: row.get(f) for f in fieldname}) if as_dict else tuple(row.get(f) for f in fieldname)
+    return frappe._dict({fieldname: row.get(fieldname)}) if as_dict else row.get(fieldname)
+
+
+def get_single_value(doctype, fieldname, cache=False):
+    return get_value(doctype, doctype, fieldname)
+
+
+def exists(doctype, name=None, cache=False):
+    return get_value(doctype, name, "name")
+
+
+def sql(query, values=None, as_dict=False, **kwargs):
+    """Raw SQL is only counted; callers see an empty result set."""
+    frappe.CALLS["sql"] += 1
+    return []
+
+
+def count(doctype, filters=None, **kwargs):
+    frappe.CALLS["count"] += 1
+    return len(frappe._select(doctype, filters))
+
+
+def set_value(*args, **kwargs):
+    frappe.CALLS["set_value"] += 1
+
+
+def bulk_update(*args, **kwargs):
+    frappe.CALLS["bulk_update"] += 1
+
+
+def delete(*args, **kwargs):
+    frappe.CALLS["delete"] += 1
+
+
+def commit():
+    pass
+
+
+def rollback(save_point=None):
+    pass
+
+
+def savepoint(save_point):
+    pass
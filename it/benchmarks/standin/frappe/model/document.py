@@ -0,0 +1,73 @@
+"""Minimal Document: attribute access over a dict, child tables as lists of Documents."""
+from __future__ import annotations
+
+import frappe
+
+
+class Document:
+    def __init__(self, data=None):
+        self.__dict__["_data"] = {}
+        self.__dict__["flags"] = frappe._dict()
+        self.__dict__["_doc_before_save"] = None
+        for key, value in dict(data or {}).items():
+            self.set(key, value)
+
+    def __getattr__(self, key):
+        data = self.__dict__["_data"]
+        if key in data:
+            return data[key]
+        if key.startswith("__"):
+            raise AttributeError(key)
+        field = frappe.METAS.get(data.get("doctype"), {}).get(key)
+        if field and field[0] == "Table":
+            return data.setdefault(key, [])
+        return None
+
+    def __setattr__(self, key, value):
+        if key in self.__dict__:
+            self.__dict__[key] = value
+        else:
+            self.set(key, value)
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def set(self, key, value):
+        if isinstance(value, list):
+            self._data[key] = []
+            for row in value:
+                self.append(key, row)
+        else:
+            self._data[key] = value
+
+    def append(self, key, value=None):
+        rows = self._data.setdefault(key, [])
+        row = value if isinstance(value, Document) else Document(value)
+        if not row.get("doctype"):
+            field = frappe.METAS.get(self._data.get("doctype"), {}).get(key)
+            if field:
+                row._data["doctype"] = field[1]
+        row._data.setdefault("idx", len(rows) + 1)
+        rows.append(row)
+        return row
+
+    def as_dict(self):
+        return {
+            key: [row.as_dict() for row in value] if isinstance(value, list) else value
+            for key, value in self._data.items()
+        }
+
+    def get_doc_before_save(self):
+        return self._doc_before_save
+
+    def run_method(self, method, *args, **kwargs):
+        fn = getattr(type(self), method, None)
+        return fn(self, *args, **kwargs) if fn else None
+
+    def insert(self, **kwargs):
+        if not self.name:
+            self.name = frappe.generate_hash(length=10)
+        return self
+
+    def save(self, **kwargs):
+        return self
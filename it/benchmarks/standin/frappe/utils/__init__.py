@@ -0,0 +1,58 @@
+"""frappe.utils stand-in: the coercion and date helpers used by the app."""
+from __future__ import annotations
+
+import datetime
+
+BENCHMARK_TODAY = datetime.date(2026, 1, 1)
+
+
+def flt(value, precision=None) -> float:
+    try:
+        value = float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+    return round(value, precision) if precision is not None else value
+
+
+def cint(value) -> int:
+    try:
+        return int(float(value or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def cstr(value) -> str:
+    return "" if value is None else str(value)
+
+
+def getdate(value=None) -> datetime.date:
+    if not value:
+        return BENCHMARK_TODAY
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def add_days(date, days: int) -> datetime.date:
+    return getdate(date) + datetime.timedelta(days=days)
+
+
+def add_to_date(date, days=0, hours=0, **kwargs) -> datetime.datetime:
+    if not isinstance(date, datetime.datetime):
+        date = datetime.datetime.combine(getdate(date), datetime.time())
+    return date + datetime.timedelta(days=days, hours=hours)
+
+
+def today() -> str:
+    return BENCHMARK_TODAY.isoformat()
+
+
+nowdate = today
+
+
+def now() -> str:
+    return f"{today()} 00:00:00"
+
+
+def now_datetime() -> datetime.datetime:
+    return datetime.datetime.combine(BENCHMARK_TODAY, datetime.time())
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import frappe
+from frappe import _
+
+from it.api import (
+    _child_doctype,
+    _prefetch_items,
+    make_delivery_note_merged,
+    make_sales_invoice_merged,
+)
+
+# ----------------------------------------------------------------------
+# Bulk Sales Order -> Delivery Note / Sales Invoice conversion
+# ----------------------------------------------------------------------
+# Runs the same merged mappers as the form buttons, but for many orders in
+# one background job. Item attributes and doctype meta live on frappe.local,
+# so they are loaded once and shared by every order of the job.
+BULK_MAPPERS = {
+    "Delivery Note": make_delivery_note_merged,
+    "Sales Invoice": make_sales_invoice_merged,
+}
+DEFAULT_CHUNK_SIZE = 50
+REPORT_TTL = 24 * 60 * 60
+PROGRESS_EVENT = "it_bulk_conversion_progress"
+DONE_EVENT = "it_bulk_conversion_done"
+
+
+def _report_key(report_id: str) -> str:
+    return f"it:bulk_conversion:{report_id}"
+
+
+def _resolve_sales_orders(sales_orders=None, filters=None) -> list[str]:
+    """Submitted, open Sales Orders from an explicit list and/or list filters."""
+    sales_orders = frappe.parse_json(sales_orders) if sales_orders else []
+    filters = frappe.parse_json(filters) if filters else None
+
+    names: list[str] = []
+    if sales_orders:
+        names = [n for n in sales_orders if isinstance(n, str) and n]
+    elif filters is not None:
+        names = frappe.get_list("Sales Order", filters=filters, pluck="name", order_by="name asc")
+
+    if not names:
+        return []
+
+    # keep caller order, drop drafts / cancelled / closed orders and the ones the
+    # user may not read (get_list applies the permission checks)
+    allowed = set(
+        frappe.get_list(
+            "Sales Order",
+            filters={"name": ["in", names], "docstatus": 1, "status": ["not in", ["Closed", "On Hold"]]},
+            pluck="name",
+        )
+    )
+    seen = set()
+    return [n for n in names if n in allowed and not (n in seen or seen.add(n))]
+
+
+def _prefetch_chunk(sales_orders: list[str]) -> None:
+    """Load every component Item of a chunk of orders with one query."""
+    child_doctype = _child_doctype("Sales Order", "custom_delivery_bom")
+    if not child_doctype or not sales_orders:
+        return
+    _prefetch_items(
+        frappe.get_all(
+            child_doctype,
+            filters={
+                "parenttype": "Sales Order",
+                "parentfield": "custom_delivery_bom",
+                "parent": ["in", sales_orders],
+            },
+            pluck="item",
+            distinct=True,
+        )
+    )
+
+
+@frappe.whitelist()
+def enqueue_bulk_conversion(
+    target_doctype: str,
+    sales_orders=None,
+    filters=None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+):
+    """
+    Queue the merged SO -> `target_doctype` mapping for many Sales Orders.
+
+    Returns the report id; progress is published on `it_bulk_conversion_progress`
+    and the final per-order report on `it_bulk_conversion_done`.
+    """
+    if target_doctype not in BULK_MAPPERS:
+        frappe.throw(_("Bulk conversion is only supported for {0}").format(", ".join(BULK_MAPPERS)))
+    frappe.has_permission(target_doctype, "create", throw=True)
+
+    names = _resolve_sales_orders(sales_orders, filters)
+    if not names:
+        frappe.throw(_("No submitted Sales Orders to convert"))
+
+    report_id = frappe.generate_hash(length=12)
+    chunk_size = max(1, frappe.utils.cint(chunk_size) or DEFAULT_CHUNK_SIZE)
+
+    frappe.cache().set_value(
+        _report_key(report_id),
+        {"status": "Queued", "user": frappe.session.user, "target_doctype": target_doctype, "total": len(names)},
+        expires_in_sec=REPORT_TTL,
+    )
+    frappe.enqueue(
+        "it.bulk_conversion.run_bulk_conversion",
+        queue="long",
+        timeout=max(1500, len(names) * 10),
+        job_name=f"it_bulk_conversion_{report_id}",
+        target_doctype=target_doctype,
+        sales_orders=names,
+        chunk_size=chunk_size,
+        report_id=report_id,
+        user=frappe.session.user,
+    )
+    return {"report_id": report_id, "total": len(names)}
+
+
+def run_bulk_conversion(
+    target_doctype: str,
+    sales_orders: list[str],
+    chunk_size: int,
+    report_id: str,
+    user: str | None = None,
+):
+    """Background job: map + insert one draft per order, commit per chunk."""
+    mapper = BULK_MAPPERS[target_doctype]
+    total = len(sales_orders)
+    report = {
+        "status": "Running",
+        "user": user,
+        "target_doctype": target_doctype,
+        "total": total,
+        "created": [],
+        "failed": [],
+    }
+
+    for start in range(0, total, chunk_size):
+        chunk = sales_orders[start : start + chunk_size]
+        _prefetch_chunk(chunk)
+
+        for so_name in chunk:
+            frappe.db.savepoint("it_bulk_conversion")
+            try:
+                doc = mapper(so_name)
+                doc.insert()
+                report["created"].append({"sales_order": so_name, "name": doc.name})
+            except Exception as e:
+                frappe.db.rollback(save_point="it_bulk_conversion")
+                report["failed"].append({"sales_order": so_name, "error": str(e) or e.__class__.__name__})
+                frappe.log_error(title=f"Bulk {target_doctype} from {so_name} failed")
+            finally:
+                frappe.local.message_log = []
+
+        frappe.db.commit()
+
+        done = min(start + chunk_size, total)
+        frappe.cache().set_value(_report_key(report_id), report, expires_in_sec=REPORT_TTL)
+        frappe.publish_realtime(
+            PROGRESS_EVENT,
+            {"report_id": report_id, "done": done, "total": total, "failed": len(report["failed"])},
+            user=user,
+        )
+
+    report["status"] = "Completed"
+    frappe.cache().set_value(_report_key(report_id), report, expires_in_sec=REPORT_TTL)
+    frappe.publish_realtime(DONE_EVENT, dict(report, report_id=report_id), user=user)
+    return report
+
+
+@frappe.whitelist()
+def get_bulk_conversion_report(report_id: str):
+    """The job's report, for the user who started it (or a System Manager)."""
+    report = frappe.cache().get_value(_report_key(report_id))
+    if report and report.get("user") != frappe.session.user and "System Manager" not in frappe.get_roles():
+        frappe.throw(_("Not permitted"), frappe.PermissionError)
+    return report
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import os
+
+import frappe
+
+# ----------------------------------------------------------------------
+# Field capability registry
+# ----------------------------------------------------------------------
+# The app works with several optional custom fields that may or may not be
+# installed on a site. Instead of probing `meta.get_field()` for every row,
+# existence is resolved once per site for every field we rely on and kept in
+# frappe.cache (site scoped). Custom Field / Property Setter changes drop it.
+CAPABILITY_CACHE_KEY = "it:field_capabilities"
+
+# fields used in code that are not declared in the app's custom JSON files
+EXTRA_FIELDS = {
+    "Opportunity": (
+        "custom_product_bundle", "custom_overhead", "custom_total_cost", "custom_total_profit",
+        "custom_profit_margin",
+    ),
+    "Quotation": ("custom_delivery_bom",),
+    "Sales Order": ("custom_delivery_bom",),
+    "Product Bundle Item": ("custom_product", "custom_cost", "custom_total_cost"),
+    "Delivery BOM": ("item", "item_name", "description", "qty", "custom_parent_product"),
+    "Purchase Order Item": ("sales_order", "sales_order_item"),
+}
+
+
+def _declared_custom_fields() -> dict[str, set[str]]:
+    """Custom fields shipped in fixtures/custom_field.json and it/custom/*.json."""
+    declared: dict[str, set[str]] = {}
+
+    def collect(records):
+        for cf in (records or []):
+            if isinstance(cf, dict) and cf.get("dt") and cf.get("fieldname"):
+                declared.setdefault(cf["dt"], set()).add(cf["fieldname"])
+
+    fixture = frappe.get_app_path("it", "fixtures", "custom_field.json")
+    if os.path.exists(fixture):
+        with open(fixture) as f:
+            collect(json.load(f))
+
+    custom_dir = frappe.get_app_path("it", "it", "custom")
+    if os.path.isdir(custom_dir):
+        for fname in sorted(os.listdir(custom_dir)):
+            if fname.endswith(".json"):
+                with open(os.path.join(custom_dir, fname)) as f:
+                    collect((json.load(f) or {}).get("custom_fields"))
+
+    return declared
+
+
+def _resolve_capabilities() -> dict:
+    fields = _declared_custom_fields()
+    for dt, names in EXTRA_FIELDS.items():
+        fields.setdefault(dt, set()).update(names)
+
+    has: dict[str, dict[str, bool]] = {}
+    tables: dict[str, str | None] = {}
+    for dt, names in fields.items():
+        try:
+            meta = frappe.get_meta(dt)
+        except frappe.DoesNotExistError:
+            meta = None
+        has[dt] = {}
+        for fieldname in sorted(names):
+            df = meta.get_field(fieldname) if meta else None
+            has[dt][fieldname] = bool(df)
+            if df and df.fieldtype == "Table":
+                tables[f"{dt}.{fieldname}"] = df.options
+    return {"has": has, "tables": tables}
+
+
+def get_capabilities() -> dict:
+    caps = getattr(frappe.local, "it_field_capabilities", None)
+    if caps is None:
+        caps = frappe.cache().get_value(CAPABILITY_CACHE_KEY, generator=_resolve_capabilities)
+        frappe.local.it_field_capabilities = caps
+    return caps
+
+
+def has_field(doctype: str, fieldname: str) -> bool:
+    known = get_capabilities()["has"].get(doctype) or {}
+    if fieldname in known:
+        return known[fieldname]
+    # not registered: fall back to meta (still cached per request by frappe)
+    try:
+        return bool(frappe.get_meta(doctype).get_field(fieldname))
+    except Exception:
+        return False
+
+
+def child_doctype(parenttype: str, fieldname: str) -> str | None:
+    """Options of a registered Table field, None when the field is not installed."""
+    key = f"{parenttype}.{fieldname}"
+    tables = get_capabilities()["tables"]
+    if key in tables:
+        return tables[key]
+    df = frappe.get_meta(parenttype).get_field(fieldname)
+    return df.options if df and df.fieldtype == "Table" else None
+
+
+def clear_capabilities(doc=None, method=None):
+    """doc_events hook for Custom Field / Property Setter."""
+    frappe.cache().delete_value(CAPABILITY_CACHE_KEY)
+    frappe.local.it_field_capabilities = None
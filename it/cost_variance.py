@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import frappe
+from frappe.utils import flt
+
+# ----------------------------------------------------------------------
+# Cost Note estimate vs actual purchase cost
+# ----------------------------------------------------------------------
+# The chain Cost Note -> Opportunity -> Quotation (opportunity) -> Sales Order
+# Item (prevdoc_docname) -> Purchase Order Item (sales_order) -> Purchase
+# Invoice Item (po_detail) is resolved level by level for a whole batch of
+# Cost Notes, with one IN query per level and chunk. Purchase Invoice costs
+# are aggregated in SQL per PO row, so no full document is ever loaded.
+LINK_CHUNK = 500
+
+
+def _chunks(values, size: int = LINK_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def _quotations_by_opportunity(opportunities) -> dict[str, str]:
+    """quotation -> opportunity"""
+    quotation_opp: dict[str, str] = {}
+    for chunk in _chunks(opportunities):
+        for q in frappe.get_all(
+            "Quotation",
+            filters={"opportunity": ["in", chunk], "docstatus": 1},
+            fields=["name", "opportunity"],
+        ):
+            quotation_opp[q.name] = q.opportunity
+    return quotation_opp
+
+
+def _sales_orders_by_quotation(quotation_opp: dict[str, str]) -> dict[str, set[str]]:
+    """sales order -> opportunities (a Sales Order may merge several quotations)"""
+    so_opps: dict[str, set[str]] = {}
+    for chunk in _chunks(quotation_opp):
+        for parent, quotation in frappe.db.sql(
+            """select distinct parent, prevdoc_docname
+                from `tabSales Order Item`
+                where prevdoc_docname in %(quotations)s and docstatus = 1""",
+            {"quotations": chunk},
+        ):
+            so_opps.setdefault(parent, set()).add(quotation_opp[quotation])
+    return so_opps
+
+
+def _purchase_order_rows(so_opps: dict[str, set[str]]) -> dict[str, str]:
+    """Purchase Order Item name -> sales order"""
+    po_rows: dict[str, str] = {}
+    for chunk in _chunks(so_opps):
+        for name, sales_order in frappe.db.sql(
+            """select name, sales_order
+                from `tabPurchase Order Item`
+                where sales_order in %(sales_orders)s and docstatus = 1""",
+            {"sales_orders": chunk},
+        ):
+            po_rows[name] = sales_order
+    return po_rows
+
+
+def get_actual_costs(opportunities) -> dict[tuple[str, str], dict]:
+    """
+    (opportunity, item_code) -> {"qty", "amount", "invoices"} of submitted
+    Purchase Invoices, in stock UOM and company currency.
+    """
+    quotation_opp = _quotations_by_opportunity(set(opportunities))
+    if not quotation_opp:
+        return {}
+    so_opps = _sales_orders_by_quotation(quotation_opp)
+    if not so_opps:
+        return {}
+    po_rows = _purchase_order_rows(so_opps)
+    if not po_rows:
+        return {}
+
+    actual: dict[tuple[str, str], dict] = {}
+    for chunk in _chunks(po_rows):
+        for po_detail, item_code, qty, amount, invoices in frappe.db.sql(
+            """select po_detail, item_code, sum(stock_qty), sum(base_net_amount), count(distinct parent)
+                from `tabPurchase Invoice Item`
+                where po_detail in %(rows)s and docstatus = 1
+                group by po_detail, item_code""",
+            {"rows": chunk},
+        ):
+            for opportunity in so_opps[po_rows[po_detail]]:
+                row = actual.setdefault((opportunity, item_code), {"qty": 0.0, "amount": 0.0, "invoices": 0})
+                row["qty"] += flt(qty)
+                row["amount"] += flt(amount)
+                row["invoices"] += invoices
+    return actual
+
+
+def get_cost_note_variance(cost_notes=None, filters=None) -> list[dict]:
+    """
+    One row per Cost Note Item with its estimated unit cost, the average unit
+    cost actually invoiced for the item on the Opportunity's chain and the
+    variance between them. `cost_notes` limits the run to explicit names,
+    otherwise every submitted Cost Note matching `filters` is used.
+    """
+    note_filters = dict(filters or {}, docstatus=1)
+    if cost_notes:
+        note_filters["name"] = ["in", list(cost_notes)]
+    notes = {
+        n.name: n
+        for n in frappe.get_all(
+            "Cost Note",
+            filters=note_filters,
+            fields=["name", "opportunity", "date"],
+            order_by="date desc, name desc",
+        )
+    }
+    if not notes:
+        return []
+
+    items = []
+    for chunk in _chunks(notes):
+        items += frappe.get_all(
+            "Cost Note Item",
+            filters={"parenttype": "Cost Note", "parent": ["in", chunk]},
+            fields=["parent", "idx", "item", "description", "uom", "cost", "rate", "profit", "bundle"],
+            order_by="parent asc, idx asc",
+        )
+
+    actual = get_actual_costs({n.opportunity for n in notes.values() if n.opportunity})
+
+    data = []
+    for d in items:
+        note = notes[d.parent]
+        spent = actual.get((note.opportunity, d.item)) or {}
+        estimated = flt(d.cost)
+        actual_cost = (spent["amount"] / spent["qty"]) if spent.get("qty") else None
+        variance = (actual_cost - estimated) if actual_cost is not None else None
+        data.append(
+            {
+                "cost_note": note.name,
+                "opportunity": note.opportunity,
+                "date": note.date,
+                "idx": d.idx,
+                "item": d.item,
+                "description": d.description,
+                "uom": d.uom,
+                "bundle": d.bundle,
+                "estimated_cost": estimated,
+                "rate": flt(d.rate),
+                "profit": flt(d.profit),
+                "actual_qty": flt(spent.get("qty")),
+                "actual_amount": flt(spent.get("amount")),
+                "actual_cost": actual_cost,
+                "variance": variance,
+                "variance_pct": (variance / estimated * 100.0) if variance is not None and estimated else None,
+                "invoices": spent.get("invoices", 0),
+            }
+        )
+    return data
+
+
+@frappe.whitelist()
+def get_cost_note_variance_for(cost_note: str):
+    """Variance rows of one Cost Note (form button / API)."""
+    frappe.has_permission("Cost Note", "read", doc=cost_note, throw=True)
+    return get_cost_note_variance([cost_note])
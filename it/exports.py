@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import csv
+import io
+import os
+import tempfile
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, getdate
+from werkzeug.wrappers import Response
+
+from it.capabilities import has_field
+
+# ----------------------------------------------------------------------
+# Streaming Delivery BOM export (CSV / XLSX) across Sales Orders
+# ----------------------------------------------------------------------
+# `custom_delivery_bom` rows joined to their Sales Order header are read with
+# keyset pagination on (parent, idx), EXPORT_CHUNK rows per query, and passed
+# through a generator: no Sales Order document is loaded and only one chunk is
+# in memory at a time. CSV is streamed to the client as it is produced; XLSX
+# is written by openpyxl in write-only mode to a temporary file which is then
+# streamed in STREAM_BLOCK pieces and removed.
+EXPORT_CHUNK = 2000
+STREAM_BLOCK = 64 * 1024
+HEADERS = ("Sales Order", "Date", "Delivery Date", "Customer", "Parent Product",
+           "Item", "Item Name", "Qty", "Delivered Qty", "Pending Qty")
+
+
+def _conditions(from_date=None, to_date=None, customer=None, company=None, include_drafts=0):
+    conditions = ["so.docstatus = 1"] if not cint(include_drafts) else ["so.docstatus < 2"]
+    values = {}
+    if from_date:
+        conditions.append("so.transaction_date >= %(from_date)s")
+        values["from_date"] = getdate(from_date)
+    if to_date:
+        conditions.append("so.transaction_date <= %(to_date)s")
+        values["to_date"] = getdate(to_date)
+    if customer:
+        conditions.append("so.customer = %(customer)s")
+        values["customer"] = customer
+    if company:
+        conditions.append("so.company = %(company)s")
+        values["company"] = company
+    return conditions, values
+
+
+def iter_delivery_bom_rows(**filters):
+    """Yield one tuple per Delivery BOM row (see HEADERS), ordered by Sales Order and row."""
+    conditions, values = _conditions(**filters)
+    parent_product = "d.custom_parent_product" if has_field("Delivery BOM", "custom_parent_product") else "''"
+    # keep the connection object: Database.sql reconnects if the request
+    # teardown closed it while the response is still being streamed
+    db = frappe.db
+
+    last_parent, last_idx = "", 0
+    while True:
+        chunk = db.sql(
+            f"""select d.parent, so.transaction_date, so.delivery_date, so.customer, {parent_product},
+                    d.item, d.item_name, d.qty, d.delivered_qty, d.idx
+                from `tabDelivery BOM` d
+                inner join `tabSales Order` so on so.name = d.parent
+                where d.parenttype = 'Sales Order' and d.parentfield = 'custom_delivery_bom'
+                    and (d.parent > %(last_parent)s or (d.parent = %(last_parent)s and d.idx > %(last_idx)s))
+                    and {" and ".join(conditions)}
+                order by d.parent asc, d.idx asc
+                limit {EXPORT_CHUNK}""",
+            dict(values, last_parent=last_parent, last_idx=last_idx),
+        )
+        for r in chunk:
+            qty, delivered = flt(r[7]), flt(r[8])
+            yield (r[0], r[1], r[2], r[3], r[4] or "", r[5], r[6], qty, delivered, max(qty - delivered, 0.0))
+        if len(chunk) < EXPORT_CHUNK:
+            return
+        last_parent, last_idx = chunk[-1][0], chunk[-1][9]
+
+
+def _csv_stream(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADERS)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % EXPORT_CHUNK == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _xlsx_file(rows) -> str:
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(_("Delivery BOM"))
+    ws.append(list(HEADERS))
+    for row in rows:
+        ws.append(list(row))
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    wb.save(path)
+    return path
+
+
+def _file_stream(path: str):
+    try:
+        with open(path, "rb") as f:
+            while block := f.read(STREAM_BLOCK):
+                yield block
+    finally:
+        os.remove(path)
+
+
+@frappe.whitelist()
+def export_delivery_bom(from_date=None, to_date=None, customer=None, company=None,
+                        include_drafts=0, file_format: str = "csv"):
+    """
+    Download the Delivery BOM rows of every matching Sales Order as CSV or XLSX.
+    Filters apply to the Sales Order header (transaction date range, customer,
+    company); only submitted orders unless include_drafts=1.
+    """
+    frappe.has_permission("Sales Order", "read", throw=True)
+    file_format = (file_format or "csv").lower()
+    if file_format not in ("csv", "xlsx"):
+        frappe.throw(_("Unsupported export format: {0}").format(file_format))
+
+    rows = iter_delivery_bom_rows(
+        from_date=from_date, to_date=to_date, customer=customer, company=company, include_drafts=include_drafts
+    )
+    filename = f"delivery-bom-{frappe.utils.nowdate()}.{file_format}"
+
+    if file_format == "csv":
+        body, mimetype = _csv_stream(rows), "text/csv"
+    else:
+        body = _file_stream(_xlsx_file(rows))
+        mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+    return Response(
+        body,
+        mimetype=mimetype,
+        direct_passthrough=True,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
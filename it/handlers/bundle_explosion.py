@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+from it.handlers.product_bundle import get_bundle_components
+
+# ---- Multi-level Product Bundle / BOM explosion ----
+# A sub-assembly is a Product Bundle (its components may be bundles again) or
+# a BOM (BOM Item rows with a `bom_no` are sub-assembly BOMs). Structure is
+# loaded breadth first, one query per level and source for everything not yet
+# known, then flattened depth first. The flattened per-unit component list of
+# every sub-assembly is memoized on frappe.local, so it is shared by all items
+# of a document and by every document of a batch (request / job): a kit used
+# N times is expanded once. A sub-assembly reached again while it is being
+# expanded is a cycle and raises.
+MEMO_ATTR = "it_explosion_memo"
+# ----------------------------------------------------
+
+
+def _memo() -> dict:
+    memo = getattr(frappe.local, MEMO_ATTR, None)
+    if memo is None:
+        memo = {"bundles": {}, "boms": {}, "flat": {}}
+        setattr(frappe.local, MEMO_ATTR, memo)
+    return memo
+
+
+def _load_boms(names: list[str], memo: dict) -> None:
+    """BOM name -> {"quantity", "items": [{item_code, stock_qty, stock_uom, description, bom_no}]}."""
+    if not names:
+        return
+    boms = {
+        b.name: {"quantity": flt(b.quantity) or 1.0, "items": []}
+        for b in frappe.get_all("BOM", filters={"name": ["in", names]}, fields=["name", "quantity"])
+    }
+    for r in frappe.get_all(
+        "BOM Item",
+        filters={"parenttype": "BOM", "parentfield": "items", "parent": ["in", list(boms)]},
+        fields=["parent", "item_code", "stock_qty", "stock_uom", "description", "bom_no"],
+        order_by="parent asc, idx asc",
+    ):
+        boms[r.parent]["items"].append(r)
+    for name in names:
+        memo["boms"][name] = boms.get(name) or {"quantity": 1.0, "items": []}
+
+
+def _children(node: tuple, memo: dict) -> list[tuple]:
+    """Sub-assembly nodes referenced by a loaded node."""
+    kind, name = node
+    if kind == "bundle":
+        return [("item", c["item_code"]) for c in memo["bundles"].get(name) or [] if c.get("item_code")]
+    return [
+        ("bom", r.bom_no) if r.bom_no else ("item", r.item_code)
+        for r in memo["boms"][name]["items"]
+        if r.item_code
+    ]
+
+
+def _preload(roots: list[tuple], memo: dict) -> None:
+    """Load every reachable bundle / BOM, one batch per level."""
+    seen: set[tuple] = set()
+    level = list(dict.fromkeys(roots))
+    while level:
+        seen.update(level)
+        # a plain item is a sub-assembly when a Product Bundle of that name exists
+        bundles = {name for kind, name in level if kind in ("item", "bundle") and name not in memo["bundles"]}
+        if bundles:
+            memo["bundles"].update(get_bundle_components(sorted(bundles)))
+        _load_boms(sorted({name for kind, name in level if kind == "bom" and name not in memo["boms"]}), memo)
+
+        nxt = []
+        for kind, name in level:
+            node = ("bom", name) if kind == "bom" else ("bundle", name)
+            if kind == "item" and not memo["bundles"].get(name):
+                continue
+            nxt += [c for c in _children(node, memo) if c not in seen]
+        level = list(dict.fromkeys(nxt))
+
+
+def _flatten(node: tuple, memo: dict, path: list[tuple]) -> list[dict]:
+    """Per-unit leaf components of a bundle / BOM node, memoized."""
+    if node in memo["flat"]:
+        return memo["flat"][node]
+    if node in path:
+        cycle = " → ".join(name for _kind, name in [*path[path.index(node):], node])
+        frappe.throw(_("Circular Product Bundle / BOM structure: {0}").format(cycle), title=_("Bundle Cycle"))
+
+    path.append(node)
+    kind, name = node
+    out: list[dict] = []
+    # components of expanded sub-assemblies merge by (item_code, uom); the node's
+    # own rows stay as they are, so a single-level bundle keeps its row layout
+    merged: dict[tuple, dict] = {}
+
+    def add(item_code, qty, uom, description, sub=None):
+        if sub is None:
+            out.append({"item_code": item_code, "qty": qty, "uom": uom, "description": description})
+            return
+        for leaf in _flatten(sub, memo, path):
+            key = (leaf["item_code"], leaf["uom"])
+            if key in merged:
+                merged[key]["qty"] += leaf["qty"] * qty
+            else:
+                merged[key] = dict(leaf, qty=leaf["qty"] * qty)
+                out.append(merged[key])
+
+    if kind == "bundle":
+        for c in memo["bundles"].get(name) or []:
+            qty = flt(c.get("qty"))
+            if not c.get("item_code") or qty <= 0:
+                continue
+            sub = ("bundle", c["item_code"]) if memo["bundles"].get(c["item_code"]) else None
+            add(c["item_code"], qty, c.get("uom") or "", c.get("description") or "", sub)
+    else:
+        bom = memo["boms"][name]
+        for r in bom["items"]:
+            qty = flt(r.stock_qty) / bom["quantity"]
+            if not r.item_code or qty <= 0:
+                continue
+            if r.bom_no:
+                sub = ("bom", r.bom_no)
+            elif memo["bundles"].get(r.item_code):
+                sub = ("bundle", r.item_code)
+            else:
+                sub = None
+            add(r.item_code, qty, r.stock_uom or "", r.description or "", sub)
+
+    path.pop()
+    memo["flat"][node] = out
+    return memo["flat"][node]
+
+
+def explode(sources: dict[str, tuple[str | None, str | None]]) -> dict[str, list[dict]]:
+    """
+    {parent item: (product bundle, bom)} -> {parent item: [{item_code, qty, uom, description}]}
+    with qty per ONE parent unit. The bundle wins when both are given; an item
+    without either is exploded when it is itself a Product Bundle.
+    """
+    memo = _memo()
+    nodes: dict[str, tuple] = {}
+    for item_code, (bundle, bom) in sources.items():
+        if bundle:
+            nodes[item_code] = ("bundle", bundle)
+        elif bom:
+            nodes[item_code] = ("bom", bom)
+        else:
+            nodes[item_code] = ("item", item_code)
+
+    _preload([("item", n) if k == "bundle" else (k, n) for k, n in nodes.values()], memo)
+
+    out: dict[str, list[dict]] = {}
+    for item_code, (kind, name) in nodes.items():
+        if kind == "item":
+            if not memo["bundles"].get(name):
+                out[item_code] = []
+                continue
+            kind = "bundle"
+        out[item_code] = _flatten((kind, name), memo, [])
+    return out
+
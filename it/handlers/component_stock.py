@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import time
+
+import frappe
+from frappe.utils import flt
+
+# ---- Component stock availability (frappe.cache, short TTL) ----
+# One hash entry per item_code: {"at": epoch, "bins": {warehouse: [actual,
+# reserved, projected]}}. Entries older than STOCK_TTL seconds count as misses;
+# misses are loaded together with one Bin query. Stock Ledger Entry on_submit
+# drops the entry of the posted item, so a stock movement is visible at once
+# and the TTL only bounds reserved / projected qty changes (Sales Order,
+# Purchase Order) that post no ledger entry.
+STOCK_CACHE_KEY = "it:component_stock"
+STOCK_TTL = 60  # seconds
+# -----------------------------------------------------------------
+
+
+def get_item_bins(item_codes) -> dict[str, dict[str, list[float]]]:
+    """item_code -> {warehouse: [actual_qty, reserved_qty, projected_qty]}"""
+    cache = frappe.cache()
+    now = time.time()
+    out: dict[str, dict] = {}
+    missing: list[str] = []
+
+    for code in dict.fromkeys(c for c in (item_codes or []) if c):
+        entry = cache.hget(STOCK_CACHE_KEY, code)
+        if entry is None or now - entry["at"] > STOCK_TTL:
+            missing.append(code)
+        else:
+            out[code] = entry["bins"]
+
+    if not missing:
+        return out
+
+    loaded: dict[str, dict] = {code: {} for code in missing}
+    for item_code, warehouse, actual, reserved, projected in frappe.db.sql(
+        """select item_code, warehouse, actual_qty, reserved_qty, projected_qty
+            from `tabBin`
+            where item_code in %(items)s
+                and (actual_qty != 0 or reserved_qty != 0 or projected_qty != 0)""",
+        {"items": missing},
+    ):
+        loaded[item_code][warehouse] = [flt(actual), flt(reserved), flt(projected)]
+
+    for code, bins in loaded.items():
+        cache.hset(STOCK_CACHE_KEY, code, {"at": now, "bins": bins})
+        out[code] = bins
+    return out
+
+
+def invalidate_component_stock(doc, method=None):
+    """Stock Ledger Entry on_submit: drop the cached bins of the posted item."""
+    if doc.get("item_code"):
+        frappe.cache().hdel(STOCK_CACHE_KEY, doc.item_code)
+
+
+@frappe.whitelist()
+def get_component_availability(sales_order: str):
+    """
+    Stock of every custom_delivery_bom component of a Sales Order:
+    [{item, item_name, required_qty, warehouse, available_qty, shortage_qty, bins: [...]}]
+    with required = qty - delivered_qty and, when the order has a set_warehouse,
+    availability measured in that warehouse, otherwise over all warehouses.
+    """
+    frappe.has_permission("Sales Order", "read", doc=sales_order, throw=True)
+    set_warehouse = frappe.db.get_value("Sales Order", sales_order, "set_warehouse")
+
+    required: dict[str, dict] = {}
+    for r in frappe.get_all(
+        "Delivery BOM",
+        filters={"parenttype": "Sales Order", "parentfield": "custom_delivery_bom", "parent": sales_order},
+        fields=["item", "item_name", "qty", "delivered_qty"],
+        order_by="idx asc",
+    ):
+        if not r.item:
+            continue
+        line = required.setdefault(r.item, {"item": r.item, "item_name": r.item_name, "required_qty": 0.0})
+        line["required_qty"] += max(flt(r.qty) - flt(r.delivered_qty), 0.0)
+
+    bins_of = get_item_bins(list(required))
+
+    out = []
+    for code, line in required.items():
+        bins = bins_of.get(code) or {}
+        if set_warehouse:
+            scope = [bins[set_warehouse]] if set_warehouse in bins else []
+        else:
+            scope = bins.values()
+        available = sum(actual - reserved for actual, reserved, _projected in scope)
+        line.update(
+            {
+                "warehouse": set_warehouse,
+                "available_qty": available,
+                "shortage_qty": max(line["required_qty"] - available, 0.0),
+                "bins": [
+                    {"warehouse": wh, "actual_qty": a, "reserved_qty": r, "projected_qty": p}
+                    for wh, (a, r, p) in sorted(bins.items())
+                ],
+            }
+        )
+        out.append(line)
+    return out
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import frappe
+from frappe.utils import flt
+
+from it.capabilities import has_field
+
+# ---- Delivery BOM fulfilment ledger ----
+# Each Sales Order custom_delivery_bom row carries delivered / billed / ordered
+# quantities. Transaction rows created from a component point back to it via
+# ROW_LINK_FIELD; submit adds their qty, cancel takes it back out.
+DELIVERY_BOM_DOCTYPE = "Delivery BOM"
+ROW_LINK_FIELD = "custom_delivery_bom_row"
+TRACE_FIELD = "custom_bundle_trace"  # consolidated PO lines: [[bom row, parent product, qty], ...]
+LEDGER_FIELD_OF = {
+    "Delivery Note": "delivered_qty",
+    "Sales Invoice": "billed_qty",
+    "Purchase Order": "ordered_qty",
+}
+# ----------------------------------------
+
+
+def trace_quantities(trace, qty, conversion_factor) -> dict[str, float]:
+    """
+    Delivery BOM row name -> stock qty of a consolidated line. The trace records
+    the split at creation; it is scaled to the line's current qty, so a line
+    edited afterwards books what it really orders.
+    """
+    split: dict[str, float] = {}
+    for bom_row, _parent, traced in frappe.parse_json(trace) or []:
+        if bom_row and flt(traced):
+            split[bom_row] = split.get(bom_row, 0.0) + flt(traced)
+    total = sum(split.values())
+    if not total:
+        return {}
+    scale = flt(qty) / total * (flt(conversion_factor) or 1)
+    return {bom_row: traced * scale for bom_row, traced in split.items()}
+
+
+def _row_quantities(doc) -> dict[str, float]:
+    """Delivery BOM row name -> qty on this document (stock qty when available)."""
+    qty_of: dict[str, float] = {}
+    for d in (doc.get("items") or []):
+        trace = d.get(TRACE_FIELD)
+        if trace:
+            for bom_row, qty in trace_quantities(trace, d.get("qty"), d.get("conversion_factor")).items():
+                qty_of[bom_row] = qty_of.get(bom_row, 0.0) + qty
+            continue
+
+        row = d.get(ROW_LINK_FIELD)
+        if not row:
+            continue
+        qty = flt(d.get("stock_qty")) or flt(d.get("qty"))
+        if qty:
+            qty_of[row] = qty_of.get(row, 0.0) + qty
+    return qty_of
+
+
+def apply_ledger_delta(fieldname: str, qty_of: dict[str, float], sign: int = 1) -> None:
+    """Add sign * qty to `fieldname` of many Delivery BOM rows with a single UPDATE."""
+    if not qty_of:
+        return
+
+    cases, values = [], []
+    for row, qty in qty_of.items():
+        cases.append("when %s then %s")
+        values += [row, sign * flt(qty)]
+
+    names = list(qty_of)
+    frappe.db.sql(
+        f"""update `tabDelivery BOM`
+            set `{fieldname}` = ifnull(`{fieldname}`, 0) + (case name {" ".join(cases)} else 0 end)
+            where name in ({", ".join(["%s"] * len(names))})""",
+        (*values, *names),
+    )
+
+
+def update_delivery_bom_ledger(doc, method=None):
+    """doc_events on_submit / on_cancel for Delivery Note, Sales Invoice and Purchase Order."""
+    fieldname = LEDGER_FIELD_OF.get(doc.doctype)
+    if not fieldname or not has_field(f"{doc.doctype} Item", ROW_LINK_FIELD):
+        return
+
+    sign = -1 if method == "on_cancel" else 1
+    apply_ledger_delta(fieldname, _row_quantities(doc), sign)
+
+
+# ---- ordered-to-date per Sales Order (PO item pickers) ----
+ORDERED_QTY_CACHE_KEY = "it:so_component_ordered_qty"
+
+
+def ordered_component_qty_query() -> str:
+    """SQL of _load_ordered_component_qty(), takes %(sales_order)s (EXPLAINed by it.indexes)."""
+    link = f"ifnull(`{ROW_LINK_FIELD}`, '')" if has_field("Purchase Order Item", ROW_LINK_FIELD) else "''"
+    trace = f"ifnull(`{TRACE_FIELD}`, '')" if has_field("Purchase Order Item", TRACE_FIELD) else "''"
+    # component lines are the ones without a Sales Order Item link
+    return f"""select item_code, {link}, {trace}, qty, stock_qty, conversion_factor
+        from `tabPurchase Order Item`
+        where sales_order = %(sales_order)s and docstatus = 1 and ifnull(sales_order_item, '') = ''"""
+
+
+def _load_ordered_component_qty(sales_order: str) -> dict:
+    by_row: dict[str, float] = {}
+    by_item: dict[str, float] = {}
+    for item_code, bom_row, trace_json, line_qty, qty, factor in frappe.db.sql(
+        ordered_component_qty_query(), {"sales_order": sales_order}
+    ):
+        if trace_json:
+            for row, row_qty in trace_quantities(trace_json, line_qty, factor).items():
+                by_row[row] = by_row.get(row, 0.0) + row_qty
+        elif bom_row:
+            by_row[bom_row] = by_row.get(bom_row, 0.0) + flt(qty)
+        else:
+            by_item[item_code] = by_item.get(item_code, 0.0) + flt(qty)
+    return {"rows": by_row, "items": by_item}
+
+
+def get_ordered_component_qty(sales_order: str) -> dict:
+    """
+    Submitted PO quantity against the Sales Order's components, cached per order:
+    {"rows": {delivery bom row: qty}, "items": {item_code: qty of unlinked lines}}.
+    """
+    return frappe.cache().hget(
+        ORDERED_QTY_CACHE_KEY, sales_order, generator=lambda: _load_ordered_component_qty(sales_order)
+    )
+
+
+def _fill_pending(bom_rows, by_row: dict[str, float], unlinked: dict[str, float]) -> dict[str, float]:
+    """Delivery BOM row name -> qty not covered by `by_row`; `unlinked` (item_code -> qty) fills rows in order."""
+    unlinked = dict(unlinked)
+    pending: dict[str, float] = {}
+    for r in bom_rows:
+        qty = flt(r.get("qty"))
+        left = qty - by_row.get(r.name, 0.0)
+        take = min(max(left, 0.0), unlinked.get(r.get("item"), 0.0))
+        if take:
+            unlinked[r.get("item")] -= take
+            left -= take
+        pending[r.name] = max(left, 0.0)
+    return pending
+
+
+def pending_order_qty(bom_rows, sales_order: str) -> dict[str, float]:
+    """Delivery BOM row name -> qty still to order (unlinked PO lines fill rows in idx order)."""
+    ordered = get_ordered_component_qty(sales_order)
+    return _fill_pending(bom_rows, ordered["rows"], ordered["items"])
+
+
+def open_order_qty(sales_orders) -> dict[str, dict]:
+    """
+    Stock qty on draft and submitted Purchase Orders against many Sales Orders,
+    one query: sales order -> {"items": {so item: qty}, "rows": {bom row: qty},
+    "unlinked": {item_code: qty of component lines without a row link}}.
+    Drafts count too, so a PO run that was not submitted yet is not ordered twice.
+    """
+    out: dict[str, dict] = {so: {"items": {}, "rows": {}, "unlinked": {}} for so in sales_orders}
+    if not out:
+        return out
+    link = f"ifnull(`{ROW_LINK_FIELD}`, '')" if has_field("Purchase Order Item", ROW_LINK_FIELD) else "''"
+    trace = f"ifnull(`{TRACE_FIELD}`, '')" if has_field("Purchase Order Item", TRACE_FIELD) else "''"
+    for so, so_item, item_code, bom_row, trace_json, line_qty, qty, factor in frappe.db.sql(
+        f"""select sales_order, ifnull(sales_order_item, ''), item_code, {link}, {trace},
+                qty, stock_qty, conversion_factor
+            from `tabPurchase Order Item`
+            where sales_order in %(sales_orders)s and docstatus < 2""",
+        {"sales_orders": list(out)},
+    ):
+        o = out[so]
+        if so_item:
+            o["items"][so_item] = o["items"].get(so_item, 0.0) + flt(qty)
+        elif trace_json:
+            for row, row_qty in trace_quantities(trace_json, line_qty, factor).items():
+                o["rows"][row] = o["rows"].get(row, 0.0) + row_qty
+        elif bom_row:
+            o["rows"][bom_row] = o["rows"].get(bom_row, 0.0) + flt(qty)
+        else:
+            o["unlinked"][item_code] = o["unlinked"].get(item_code, 0.0) + flt(qty)
+    return out
+
+
+def pending_purchase_qty(so, open_qty: dict) -> dict:
+    """
+    {"items": {so item: stock qty}, "rows": {bom row: qty}} still to order for a
+    Sales Order document, given its open_order_qty() entry.
+    """
+    items = {
+        it.name: max(
+            (flt(it.stock_qty) or flt(it.qty) * (flt(it.conversion_factor) or 1)) - open_qty["items"].get(it.name, 0.0),
+            0.0,
+        )
+        for it in (so.get("items") or [])
+    }
+    rows = _fill_pending(so.get("custom_delivery_bom") or [], open_qty["rows"], open_qty["unlinked"])
+    return {"items": items, "rows": rows}
+
+
+def invalidate_ordered_qty(doc, method=None):
+    """Purchase Order on_submit / on_cancel: drop the cached totals of every linked Sales Order."""
+    sales_orders = {d.get("sales_order") for d in (doc.get("items") or []) if d.get("sales_order")}
+    if sales_orders:
+        frappe.cache().hdel(ORDERED_QTY_CACHE_KEY, list(sales_orders))
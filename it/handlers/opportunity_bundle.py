@@ -1,45 +1,132 @@
 from __future__ import annotations
+
 import frappe
 from frappe.utils import flt
 
+from it.capabilities import has_field
+from it.handlers.bundle_explosion import explode
+from it.handlers.opportunity_costing import (
+    B_TOTAL,
+    I_MAIN,
+    I_MARGIN,
+    I_TOTAL_COST,
+    apply_costing,
+    compute_costing,
+)
+
 # ---- fieldnames (edit if different) ----
 PARENT_BUNDLE_TABLE = "custom_product_bundle"      # child table field on Opportunity
 CHILD_DOCTYPE       = "Product Bundle Item"        # child doctype name
 PRODUCT_FIELD       = "custom_product"             # child column linking to parent item (Link -> Item)
-CHILD_TOTAL_FIELD   = "custom_total_cost"          # TOTAL = custom_cost * qty
 PARENT_COST_TOTAL   = "custom_purchase_rate"       # parent field to write (Σ child totals)
-MARGIN_FIELD        = "custom_margin"
 # ----------------------------------------
 
-def _has(meta, fieldname: str) -> bool:
-    return bool(meta.get_field(fieldname))
+def _child_signatures(doc) -> dict[str, list[tuple]]:
+    """parent item -> [(item_code, qty, custom_cost, custom_total_cost), ...] in row order."""
+    sigs: dict[str, list[tuple]] = {}
+    for ch in (getattr(doc, PARENT_BUNDLE_TABLE, None) or []):
+        p = getattr(ch, PRODUCT_FIELD, None)
+        if p:
+            sigs.setdefault(p, []).append(
+                (
+                    getattr(ch, "item_code", None),
+                    flt(getattr(ch, "qty", 0)),
+                    flt(getattr(ch, "custom_cost", 0)),
+                    flt(getattr(ch, B_TOTAL, 0)),
+                )
+            )
+    return sigs
+
+def _item_signature(it) -> tuple:
+    """
+    Every Opportunity Item field the costing engine reads or writes:
+    (item_code, bundle, bom, qty, rate, purchase rate, main, total cost, margin).
+    A row whose signature is unchanged since the last save already holds the
+    values a full recompute would write.
+    """
+    return (
+        getattr(it, "item_code", None),
+        getattr(it, "custom_product_bundle", None),
+        getattr(it, "custom_bom", None),
+        flt(getattr(it, "qty", 0)),
+        flt(getattr(it, "rate", 0)),
+        flt(getattr(it, PARENT_COST_TOTAL, 0)),
+        flt(getattr(it, I_MAIN, 0)),
+        flt(getattr(it, I_TOTAL_COST, 0)),
+        flt(getattr(it, I_MARGIN, 0)),
+    )
+
+def _item_signatures(doc) -> dict[str, tuple]:
+    """Opportunity Item row name -> _item_signature()."""
+    return {it.name: _item_signature(it) for it in (doc.items or []) if it.name}
+
+def _dirty_since_last_save(doc) -> tuple[set[str], set[str]] | None:
+    """
+    Compare with doc.get_doc_before_save() and return
+    (parent item codes whose bundle rows or item row changed, changed item row names).
+    None means "no previous version": everything is dirty.
+    """
+    before = doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None
+    if not before:
+        return None
+
+    dirty_parents: set[str] = set()
+    old_children, new_children = _child_signatures(before), _child_signatures(doc)
+    for p in old_children.keys() | new_children.keys():
+        if old_children.get(p) != new_children.get(p):
+            dirty_parents.add(p)
+
+    dirty_rows: set[str] = set()
+    old_items = _item_signatures(before)
+    for it in (doc.items or []):
+        sig = _item_signature(it)
+        old = old_items.pop(it.name, None) if it.name else None
+        if old != sig:
+            dirty_rows.add(it.name or id(it))
+            if sig[0]:
+                dirty_parents.add(sig[0])
+            if old and old[0]:
+                dirty_parents.add(old[0])
+
+    # removed rows: their bundle group no longer has an item row
+    dirty_parents.update(old[0] for old in old_items.values() if old[0])
+
+    return dirty_parents, dirty_rows
 
 def on_validate(doc, method=None):
     """
-    - Build Product Bundle rows (once) using per-one quantities.
-    - Compute each child custom_total_cost = custom_cost * qty.
-    - Roll up Σ(child totals) into Opportunity Item.custom_purchase_rate.
-    - Compute custom_margin = ((rate - custom_purchase_rate) / rate) * 100 for EVERY row.
+    - Build Product Bundle rows (once) using per-one quantities, from the item's
+      Product Bundle or BOM exploded over every level (it.handlers.bundle_explosion).
+    - Recompute child totals, item cost / total / margin and header totals with
+      the shared costing engine (it.handlers.opportunity_costing).
+
+    On an existing document only the parent groups whose items, bundles, quantities
+    or costs changed since the last save (or whose rows get rebuilt) are recomputed;
+    untouched groups already hold these values from the previous save.
     """
     if not hasattr(doc, PARENT_BUNDLE_TABLE):
         return
 
-    opp_meta       = frappe.get_meta("Opportunity")
-    item_meta      = frappe.get_meta("Opportunity Item")
-    child_meta     = frappe.get_meta(CHILD_DOCTYPE)
+    # Field capabilities, resolved once per site (see it.capabilities)
+    has_bundle_link = has_field("Opportunity Item", "custom_product_bundle")
+    has_bom_link    = has_field("Opportunity Item", "custom_bom")
 
     # If the critical child link field is missing, we can't relate rows -> parent item.
-    if not _has(child_meta, PRODUCT_FIELD):
+    if not has_field(CHILD_DOCTYPE, PRODUCT_FIELD):
         # Nothing to do; keep silent so saving still works.
         return
 
-    # Map: parent item code -> selected bundle (to (re)build child rows)
-    bundle_of: dict[str, str] = {}
+    # None -> new document (or no snapshot): recompute everything
+    dirty = _dirty_since_last_save(doc)
+
+    # Map: parent item code -> selected (bundle, bom) (to (re)build child rows)
+    source_of: dict[str, tuple] = {}
     for it in (doc.items or []):
         code = getattr(it, "item_code", None)
-        bun  = getattr(it, "custom_product_bundle", None) if _has(item_meta, "custom_product_bundle") else None
-        if code and bun:
-            bundle_of[code] = bun
+        bun  = getattr(it, "custom_product_bundle", None) if has_bundle_link else None
+        bom  = getattr(it, "custom_bom", None) if has_bom_link else None
+        if code and (bun or bom):
+            source_of[code] = (bun, bom)
 
     # Existing child rows grouped by parent product
     rows_by_product: dict[str, list] = {}
@@ -48,77 +135,55 @@ def on_validate(doc, method=None):
         if p:
             rows_by_product.setdefault(p, []).append(ch)
 
-    # (Re)build children only if missing or bundle components changed
-    for parent_item, bundle_name in bundle_of.items():
+    # Flattened per-one components (memoized per request, one query per level when cold)
+    components = explode(source_of)
+
+    # Decide which parent groups need a rebuild: missing rows or bundle components changed
+    rebuild: dict[str, list[dict]] = {}
+    for parent_item in source_of:
         existing = rows_by_product.get(parent_item, []) or []
-        need_rebuild = False
-        compset = set()
-        try:
-            pb = frappe.get_doc("Product Bundle", bundle_name)
-            compset = {i.item_code for i in (pb.items or []) if i.item_code}
-        except Exception:
-            pb = None
+        comps = components.get(parent_item) or []
+        compset = {c["item_code"] for c in comps if c.get("item_code")}
 
         existset = {getattr(r, "item_code", None) for r in existing if getattr(r, "item_code", None)}
-        if not existing or (pb and compset and compset != existset):
-            need_rebuild = True
-
-        if need_rebuild and pb:
-            # remove any previous rows for this parent product
-            keep = []
-            for ch in (getattr(doc, PARENT_BUNDLE_TABLE) or []):
-                if getattr(ch, PRODUCT_FIELD, None) != parent_item:
-                    keep.append(ch)
-            setattr(doc, PARENT_BUNDLE_TABLE, keep)
-
+        if comps and (not existing or (compset and compset != existset)):
+            rebuild[parent_item] = comps
+
+    # Rebuild all affected groups in one pass over the child table. Rows and idx
+    # come out as if each group were dropped and re-appended in turn: untouched
+    # rows keep their place, rebuilt groups follow in item order, and each new
+    # row's idx is the table length at the moment it would have been appended.
+    if rebuild:
+        table = getattr(doc, PARENT_BUNDLE_TABLE) or []
+        size = len(table)
+        existing_count: dict[str, int] = {}
+        for ch in table:
+            p = getattr(ch, PRODUCT_FIELD, None)
+            if p in rebuild:
+                existing_count[p] = existing_count.get(p, 0) + 1
+        keep = [ch for ch in table if getattr(ch, PRODUCT_FIELD, None) not in rebuild]
+        setattr(doc, PARENT_BUNDLE_TABLE, keep)
+
+        for parent_item, comps in rebuild.items():
+            size -= existing_count.get(parent_item, 0)
             # add components with PER-ONE quantities only
-            for comp in (pb.items or []):
-                if not comp.item_code:
+            for comp in comps:
+                if not comp.get("item_code"):
                     continue
-                raw = flt(getattr(comp, "qty", 0))
+                raw = flt(comp.get("qty"))
                 if raw <= 0:
                     continue
                 ch = doc.append(PARENT_BUNDLE_TABLE, {})
-                ch.item_code   = comp.item_code
-                ch.description = getattr(comp, "description", "") or ""
-                ch.uom         = getattr(comp, "uom", "") or ""
+                ch.item_code   = comp["item_code"]
+                ch.description = comp.get("description") or ""
+                ch.uom         = comp.get("uom") or ""
                 ch.qty         = raw                      # per-one qty (not scaled by parent qty)
                 setattr(ch, PRODUCT_FIELD, parent_item)
-
-            rows_by_product[parent_item] = [r for r in getattr(doc, PARENT_BUNDLE_TABLE)
-                                            if getattr(r, PRODUCT_FIELD, None) == parent_item]
-
-    # ---- child totals & rollup ----
-    per_parent_sum: dict[str, float] = {}
-
-    for ch in (getattr(doc, PARENT_BUNDLE_TABLE) or []):
-        parent_item = getattr(ch, PRODUCT_FIELD, None)
-        if not parent_item:
-            continue
-
-        qty  = flt(getattr(ch, "qty", 0))                 # per-one qty
-        unit = flt(getattr(ch, "custom_cost", 0))         # unit cost (user editable)
-        line_total = qty * unit
-
-        if _has(child_meta, CHILD_TOTAL_FIELD):
-            setattr(ch, CHILD_TOTAL_FIELD, line_total)
-
-        per_parent_sum[parent_item] = per_parent_sum.get(parent_item, 0.0) + line_total
-
-    # Write parent totals & margins for ALL rows
-    for it in (doc.items or []):
-        item = getattr(it, "item_code", None)
-        rate = flt(getattr(it, "rate", 0))
-        if not item:
-            continue
-
-        # bundled: overwrite; single item: keep user's value (if field exists)
-        if item in per_parent_sum:
-            cpr = per_parent_sum[item]                      # Σ(child totals), independent of parent qty
-            if _has(item_meta, PARENT_COST_TOTAL):
-                setattr(it, PARENT_COST_TOTAL, cpr)
-        else:
-            cpr = flt(getattr(it, PARENT_COST_TOTAL, 0)) if _has(item_meta, PARENT_COST_TOTAL) else 0
-
-        if _has(item_meta, MARGIN_FIELD):
-            setattr(it, MARGIN_FIELD, ((rate - cpr) / rate * 100.0) if rate else 0.0)
+                size += 1
+                ch.idx = size
+
+    # Parent groups whose rollups must be recomputed (None = all)
+    if dirty is None:
+        apply_costing(doc, compute_costing(doc))
+    else:
+        apply_costing(doc, compute_costing(doc, parents=dirty[0] | set(rebuild), item_rows=dirty[1]))
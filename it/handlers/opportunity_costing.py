@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import frappe
+from frappe.utils import flt
+
+from it.capabilities import has_field
+
+# ---- Opportunity costing engine ----
+# Single implementation of the bundle / item / header cost math, used by the
+# Opportunity validate hook (opportunity_bundle.on_validate) and by the form
+# through get_opportunity_costing_diff(). compute_costing() works on a Document
+# or on plain dicts and returns only the fields whose value changes:
+#   {"bundle": {row key: {field: value}}, "items": {...}, "header": {...}}
+# Row key = row name, or "#<position>" for rows that have no name yet.
+BUNDLE_TABLE = "custom_product_bundle"
+PRODUCT_FIELD = "custom_product"  # bundle row -> parent item code
+B_TOTAL = "custom_total_cost"  # bundle row: qty * custom_cost
+I_COST_PER = "custom_purchase_rate"  # item: cost per unit (Σ bundle totals for main rows)
+I_TOTAL_COST = "custom_total_cost"  # item: qty * cost per unit
+I_MARGIN = "custom_margin"  # item: (rate - cost) / rate * 100
+I_MAIN = "custom_main"  # item: cost comes from the bundle
+H_OVERHEAD = "custom_overhead"
+H_TOTAL_COST = "custom_total_cost"  # Σ item totals + overhead
+H_PROFIT = "custom_total_profit"  # total - total cost
+H_MARGIN = "custom_profit_margin"  # profit / total cost * 100
+BUNDLE_CHILD = "Product Bundle Item"
+ITEM_CHILD = "Opportunity Item"
+# client payload columns (see opportunity_bom_build.js)
+BUNDLE_COLUMNS = ("name", PRODUCT_FIELD, "qty", "custom_cost", B_TOTAL)
+ITEM_COLUMNS = ("name", "item_code", "qty", "rate", I_MAIN, I_COST_PER, I_TOTAL_COST, I_MARGIN)
+HEADER_COLUMNS = ("total", H_OVERHEAD, H_TOTAL_COST, H_PROFIT, H_MARGIN)
+# ------------------------------------
+
+
+def row_key(row, position: int) -> str:
+    return row.get("name") or f"#{position}"
+
+
+def _capabilities() -> dict[str, bool]:
+    return {
+        "bundle_total": has_field(BUNDLE_CHILD, B_TOTAL),
+        "cost_per": has_field(ITEM_CHILD, I_COST_PER),
+        "item_total": has_field(ITEM_CHILD, I_TOTAL_COST),
+        "margin": has_field(ITEM_CHILD, I_MARGIN),
+        "main": has_field(ITEM_CHILD, I_MAIN),
+        "header": all(has_field("Opportunity", f) for f in (H_TOTAL_COST, H_PROFIT, H_MARGIN)),
+        "overhead": has_field("Opportunity", H_OVERHEAD),
+    }
+
+
+def _changed(out: dict, key: str, row, field: str, value: float) -> None:
+    if abs(flt(row.get(field)) - value) > 1e-9:
+        out.setdefault(key, {})[field] = value
+
+
+def compute_costing(doc, parents: set[str] | None = None, item_rows: set[str] | None = None) -> dict:
+    """
+    Recompute bundle row totals, item cost / total / margin and header totals.
+
+    `parents` limits the bundle groups (and their item rows) that are recomputed,
+    `item_rows` adds item rows by name; None for both recomputes everything.
+    Rows outside the scope keep their stored values, which still feed the header.
+    """
+    caps = _capabilities()
+    diff: dict[str, dict] = {"bundle": {}, "items": {}, "header": {}}
+
+    # bundle rows -> Σ(qty * unit cost) per parent item (per ONE parent unit)
+    per_parent: dict[str, float] = {}
+    for i, ch in enumerate(doc.get(BUNDLE_TABLE) or []):
+        parent = ch.get(PRODUCT_FIELD)
+        if not parent or (parents is not None and parent not in parents):
+            continue
+        line_total = flt(ch.get("qty")) * flt(ch.get("custom_cost"))
+        if caps["bundle_total"]:
+            _changed(diff["bundle"], row_key(ch, i), ch, B_TOTAL, line_total)
+        per_parent[parent] = per_parent.get(parent, 0.0) + line_total
+
+    # items: main rows (or, without the main flag, rows that have bundle rows) take
+    # the bundle cost; other rows keep the user's cost
+    items_cost = 0.0
+    for i, it in enumerate(doc.get("items") or []):
+        code = it.get("item_code")
+        cost = flt(it.get(I_COST_PER)) if caps["cost_per"] else 0.0
+        total = flt(it.get(I_TOTAL_COST))
+
+        in_scope = code and (
+            parents is None or code in parents or (item_rows is not None and it.get("name") in item_rows)
+        )
+        if in_scope:
+            key = row_key(it, i)
+            from_bundle = bool(flt(it.get(I_MAIN))) if caps["main"] else code in per_parent
+            if from_bundle:
+                cost = per_parent.get(code, 0.0)
+                if caps["cost_per"]:
+                    _changed(diff["items"], key, it, I_COST_PER, cost)
+            if caps["item_total"]:
+                total = flt(it.get("qty")) * cost
+                _changed(diff["items"], key, it, I_TOTAL_COST, total)
+            if caps["margin"]:
+                rate = flt(it.get("rate"))
+                _changed(diff["items"], key, it, I_MARGIN, ((rate - cost) / rate * 100.0) if rate > 0 else 0.0)
+
+        items_cost += total if caps["item_total"] else 0.0
+
+    # header totals & cost based margin
+    if caps["header"] and caps["item_total"]:
+        total_cost = items_cost + (flt(doc.get(H_OVERHEAD)) if caps["overhead"] else 0.0)
+        profit = flt(doc.get("total")) - total_cost
+        header = {
+            H_TOTAL_COST: total_cost,
+            H_PROFIT: profit,
+            H_MARGIN: (profit / total_cost * 100.0) if total_cost > 0 else 0.0,
+        }
+        for field, value in header.items():
+            if abs(flt(doc.get(field)) - value) > 1e-9:
+                diff["header"][field] = value
+
+    return diff
+
+
+def apply_costing(doc, diff: dict) -> None:
+    """Write a compute_costing() diff back onto a Document."""
+    for table, rows in ((BUNDLE_TABLE, diff.get("bundle")), ("items", diff.get("items"))):
+        if not rows:
+            continue
+        for i, row in enumerate(doc.get(table) or []):
+            for field, value in (rows.get(row_key(row, i)) or {}).items():
+                row.set(field, value)
+    for field, value in (diff.get("header") or {}).items():
+        doc.set(field, value)
+
+
+@frappe.whitelist()
+def get_opportunity_costing_diff(doc):
+    """
+    Form endpoint: `doc` is the compact payload built by opportunity_bom_build.js
+    ({"items": [...], "custom_product_bundle": [...], header columns}); returns
+    only the values that change, keyed by row name.
+    """
+    frappe.has_permission("Opportunity", "read", throw=True)
+    doc = frappe.parse_json(doc) or {}
+
+    payload = frappe._dict({f: doc.get(f) for f in HEADER_COLUMNS})
+    payload["items"] = [frappe._dict({f: r.get(f) for f in ITEM_COLUMNS}) for r in (doc.get("items") or [])]
+    payload[BUNDLE_TABLE] = [
+        frappe._dict({f: r.get(f) for f in BUNDLE_COLUMNS}) for r in (doc.get(BUNDLE_TABLE) or [])
+    ]
+    return compute_costing(payload)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import frappe
+
+# ---- Product Bundle component index (frappe.cache) ----
+# One hash entry per bundle name: [{item_code, qty, uom, description}, ...]
+# in bundle row order. Filled lazily by get_bundle_components(), dropped by
+# the Product Bundle doc_events below; an Item rename drops the whole hash
+# (component rows carry item codes).
+BUNDLE_INDEX_KEY = "it:product_bundle_components"
+COMPONENT_FIELDS = ("item_code", "qty", "uom", "description")
+# -------------------------------------------------------
+
+
+def _component_rows(bundle_names, run: bool = True):
+    """Product Bundle Item rows of many bundles in bundle row order (run=False: the SQL)."""
+    return frappe.get_all(
+        "Product Bundle Item",
+        filters={"parenttype": "Product Bundle", "parentfield": "items", "parent": ["in", bundle_names]},
+        fields=["parent", *COMPONENT_FIELDS],
+        order_by="parent asc, idx asc",
+        run=run,
+    )
+
+
+def bundle_components_query(bundle_names) -> str:
+    """SQL that get_bundle_components() runs for its cache misses (EXPLAINed by it.indexes)."""
+    return _component_rows(list(bundle_names), run=False)
+
+
+def get_bundle_components(bundle_names) -> dict[str, list[dict]]:
+    """
+    Return {bundle_name: [component, ...]} for every requested bundle.
+    Cache misses are loaded together with a single Product Bundle Item query.
+    Unknown bundles map to an empty list.
+    """
+    cache = frappe.cache()
+    out: dict[str, list[dict]] = {}
+    missing: list[str] = []
+
+    for name in dict.fromkeys(n for n in (bundle_names or []) if n):
+        comps = cache.hget(BUNDLE_INDEX_KEY, name)
+        if comps is None:
+            missing.append(name)
+        else:
+            out[name] = comps
+
+    if not missing:
+        return out
+
+    loaded: dict[str, list[dict]] = {name: [] for name in missing}
+    for r in _component_rows(missing):
+        loaded[r.parent].append({f: r.get(f) for f in COMPONENT_FIELDS})
+
+    for name, comps in loaded.items():
+        cache.hset(BUNDLE_INDEX_KEY, name, comps)
+        out[name] = comps
+
+    return out
+
+
+def invalidate_bundle_components(doc, method=None, *args):
+    frappe.cache().hdel(BUNDLE_INDEX_KEY, doc.name)
+
+
+def on_bundle_rename(doc, method=None, old_name=None, new_name=None, merge=False):
+    frappe.cache().hdel(BUNDLE_INDEX_KEY, [n for n in (old_name, new_name, doc.name) if n])
+
+
+def on_item_rename(doc, method=None, old_name=None, new_name=None, merge=False):
+    """Item after_rename: any bundle may list the renamed item as a component."""
+    frappe.cache().delete_value(BUNDLE_INDEX_KEY)
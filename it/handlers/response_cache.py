@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import frappe
+from frappe.utils import cint
+
+# ---- Versioned response cache for the get_delivery_bom_from_* endpoints ----
+# One hash entry per source document ("<doctype>::<name>"):
+# {"modified": <modified of the version it was built from>, "rows": [...]}.
+# An entry is served only while the document's current modified matches, so a
+# repeat form load is a primary key lookup plus a cache read and a write the
+# doc_events below missed can never serve stale rows. The doc_events still drop
+# the entry when the source document is saved, cancelled, deleted or renamed;
+# Item renames and item_name edits drop the whole hash (rows carry item names).
+# Hit / miss counters live in a site-wide redis hash ("<doctype>:hits" / ":misses"),
+# next to the item generation that response_version() adds to the HTTP ETag.
+RESPONSE_CACHE_KEY = "it:delivery_bom_response"
+STATS_KEY = "it:delivery_bom_response_stats"
+ITEM_GENERATION = "item_generation"
+CACHED_DOCTYPES = ("Opportunity", "Quotation", "Sales Order")
+# ---------------------------------------------------------------------------
+
+
+def _field(doctype: str, name: str) -> str:
+    return f"{doctype}::{name}"
+
+
+def _counter(field: str, amount: int = 1) -> int:
+    """Add to (and return) a site-wide counter; amount=0 only reads it."""
+    cache = frappe.cache()
+    return cint(cache.hincrby(cache.make_key(STATS_KEY), field, amount))
+
+
+def _count(doctype: str, outcome: str) -> None:
+    _counter(f"{doctype}:{outcome}")
+
+
+def response_version(doctype: str, name: str, modified) -> str | None:
+    """Version tag of the rows of (doctype, name) at `modified`; None when there is nothing to tag."""
+    if not (name and modified):
+        return None
+    return f"{_field(doctype, name)}::{modified}::{_counter(ITEM_GENERATION, 0)}"
+
+
+def cached_rows(doctype: str, name: str, loader, modified=None) -> list:
+    """
+    Rows for (doctype, name, modified) from the cache, or loader() stored with that
+    modified. Pass the modified the caller already read to skip the lookup.
+    """
+    if not name:
+        return loader()
+    if modified is None:
+        modified = frappe.db.get_value(doctype, name, "modified")
+    if not modified:
+        # unknown documents are not cached, they would never be invalidated
+        return loader()
+
+    cache = frappe.cache()
+    entry = cache.hget(RESPONSE_CACHE_KEY, _field(doctype, name))
+    if entry is not None and entry.get("modified") == str(modified):
+        _count(doctype, "hits")
+        return entry["rows"]
+
+    _count(doctype, "misses")
+    rows = loader()
+    cache.hset(RESPONSE_CACHE_KEY, _field(doctype, name), {"modified": str(modified), "rows": rows})
+    return rows
+
+
+def invalidate_response_cache(doc, method=None, *args):
+    """doc_events (on_update, on_update_after_submit, on_cancel, on_trash) of the cached doctypes."""
+    frappe.cache().hdel(RESPONSE_CACHE_KEY, _field(doc.doctype, doc.name))
+
+
+def on_source_rename(doc, method=None, old_name=None, new_name=None, merge=False):
+    frappe.cache().hdel(
+        RESPONSE_CACHE_KEY, [_field(doc.doctype, n) for n in (old_name, new_name, doc.name) if n]
+    )
+
+
+def on_item_change(doc, method=None, *args, **kwargs):
+    """Item after_rename / on_update (only when item_name changed)."""
+    if method == "on_update" and not doc.has_value_changed("item_name"):
+        return
+    frappe.cache().delete_value(RESPONSE_CACHE_KEY)
+    _counter(ITEM_GENERATION)
+
+
+@frappe.whitelist()
+def get_response_cache_stats():
+    """Hit / miss counters and hit rate per doctype for this site (all workers)."""
+    frappe.only_for("System Manager")
+    out = {}
+    for doctype in CACHED_DOCTYPES:
+        hits, misses = _counter(f"{doctype}:hits", 0), _counter(f"{doctype}:misses", 0)
+        calls = hits + misses
+        out[doctype] = {"hits": hits, "misses": misses, "hit_rate": round(hits / calls, 4) if calls else 0.0}
+    return out
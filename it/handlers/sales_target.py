@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import calendar
+
+import frappe
+from frappe.utils import cint, flt, getdate
+
+# ---- Sales Target achievement aggregates ----
+# `tabSales Target Achievement` holds one row per (sales partner, fiscal year,
+# month) with the net invoiced amount and the number of invoices (credit notes
+# reduce the amount but are not counted). Sales Invoice submit / cancel adjust
+# it in place; backfill_sales_target_achievement() rebuilds it from history.
+AGGREGATE_DOCTYPE = "Sales Target Achievement"
+# ---------------------------------------------
+
+
+def _aggregate_name(sales_partner: str, fiscal_year: str, month_index: int) -> str:
+    return f"{sales_partner}-{fiscal_year}-{month_index:02d}"
+
+
+def _fiscal_year_of(posting_date, company: str, memo: dict) -> str | None:
+    from erpnext.accounts.utils import get_fiscal_year
+
+    key = (posting_date, company)
+    if key not in memo:
+        try:
+            memo[key] = get_fiscal_year(posting_date, company=company)[0]
+        except Exception:
+            memo[key] = None
+    return memo[key]
+
+
+def _add_invoice(totals: dict, inv, sign: int, memo: dict) -> None:
+    if not inv.sales_partner:
+        return
+    fiscal_year = _fiscal_year_of(inv.posting_date, inv.company, memo)
+    if not fiscal_year:
+        return
+    key = (inv.sales_partner, fiscal_year, getdate(inv.posting_date).month)
+    amount, count = totals.get(key, (0.0, 0))
+    totals[key] = (amount + sign * flt(inv.base_net_total), count + (0 if cint(inv.is_return) else sign))
+
+
+def apply_totals(totals: dict) -> None:
+    """Add {(sales_partner, fiscal_year, month_index): (amount, count)} with one upsert."""
+    if not totals:
+        return
+
+    now, user = frappe.utils.now(), frappe.session.user
+    values = []
+    for (partner, fiscal_year, month_index), (amount, count) in totals.items():
+        values += [
+            _aggregate_name(partner, fiscal_year, month_index), partner, fiscal_year,
+            calendar.month_name[month_index], month_index, amount, count, now, now, user, user,
+        ]
+
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(totals))
+    frappe.db.sql(
+        f"""insert into `tabSales Target Achievement`
+            (name, sales_partner, fiscal_year, month, month_index, achieved_amount, invoice_count,
+             creation, modified, owner, modified_by)
+            values {placeholders}
+            on duplicate key update
+                achieved_amount = ifnull(achieved_amount, 0) + values(achieved_amount),
+                invoice_count = ifnull(invoice_count, 0) + values(invoice_count),
+                modified = values(modified)""",
+        values,
+    )
+
+
+def update_achievement(doc, method=None):
+    """Sales Invoice on_submit / on_cancel."""
+    totals: dict = {}
+    _add_invoice(totals, doc, -1 if method == "on_cancel" else 1, {})
+    apply_totals(totals)
+
+
+@frappe.whitelist()
+def rebuild_sales_target_achievement(fiscal_year: str | None = None):
+    """Queue a full (or single fiscal year) rebuild of the aggregate table."""
+    frappe.only_for("System Manager")
+    frappe.enqueue(
+        "it.handlers.sales_target.backfill_sales_target_achievement",
+        queue="long",
+        timeout=7200,
+        job_name=f"it_sales_target_backfill_{fiscal_year or 'all'}",
+        fiscal_year=fiscal_year,
+    )
+
+
+def backfill_sales_target_achievement(fiscal_year: str | None = None):
+    """
+    Rebuild the aggregates (all, or one fiscal year) in a single transaction.
+
+    The in-scope aggregate rows are locked first, so a Sales Invoice submitted or
+    cancelled meanwhile waits in update_achievement() and applies its change on
+    top of the rebuilt rows; invoices committed before the lock are in the
+    snapshot read below. Readers keep seeing the previous totals until the
+    commit, never a partial rebuild. Invoices are summed per (partner, company,
+    posting date) in the database, so the lock is held for one grouped scan.
+    """
+    conditions = "docstatus = 1 and ifnull(sales_partner, '') != ''"
+    params: dict = {}
+    if fiscal_year:
+        period = frappe.db.get_value("Fiscal Year", fiscal_year, ["year_start_date", "year_end_date"])
+        if not period:
+            frappe.log_error(
+                title="Sales Target Achievement backfill skipped",
+                message=f"Fiscal Year {fiscal_year} not found",
+            )
+            return
+        conditions += " and posting_date between %(start)s and %(end)s"
+        params.update(start=period[0], end=period[1])
+
+    try:
+        frappe.db.sql(
+            f"""select name from `tab{AGGREGATE_DOCTYPE}`
+                {"where fiscal_year = %(fiscal_year)s" if fiscal_year else ""}
+                for update""",
+            {"fiscal_year": fiscal_year},
+        )
+
+        memo: dict = {}
+        totals: dict = {}
+        unknown: list = []
+        for d in frappe.db.sql(
+            f"""select sales_partner, company, posting_date,
+                    sum(base_net_total) as amount, sum(if(is_return = 1, 0, 1)) as count
+                from `tabSales Invoice`
+                where {conditions}
+                group by sales_partner, company, posting_date""",
+            params,
+            as_dict=True,
+        ):
+            fy = _fiscal_year_of(d.posting_date, d.company, memo)
+            if not fy:
+                unknown.append(f"{d.company} {d.posting_date} ({d.sales_partner})")
+                continue
+            if fiscal_year and fy != fiscal_year:
+                continue
+            key = (d.sales_partner, fy, getdate(d.posting_date).month)
+            amount, count = totals.get(key, (0.0, 0))
+            totals[key] = (amount + flt(d.amount), count + cint(d.count))
+
+        frappe.db.delete(AGGREGATE_DOCTYPE, {"fiscal_year": fiscal_year} if fiscal_year else None)
+        apply_totals(totals)
+        frappe.db.commit()
+    finally:
+        # no-op after the commit; on failure it releases the aggregate row locks
+        frappe.db.rollback()
+
+    if unknown:
+        frappe.log_error(
+            title="Sales Target Achievement backfill: no fiscal year",
+            message="Invoices skipped (company, posting date, partner):\n" + "\n".join(unknown),
+        )
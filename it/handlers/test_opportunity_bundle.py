@@ -0,0 +1,181 @@
+# Copyright (c) 2026, Connect 4 Systems and Contributors
+# See license.txt
+
+import random
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt
+
+from it.handlers import opportunity_bundle
+from it.handlers.opportunity_bundle import PARENT_BUNDLE_TABLE, PRODUCT_FIELD, on_validate
+
+CASES = 200
+ITEM_FIELDS = (
+	"name",
+	"item_code",
+	"custom_product_bundle",
+	"qty",
+	"rate",
+	"custom_main",
+	"custom_purchase_rate",
+	"custom_total_cost",
+	"custom_margin",
+)
+BUNDLE_FIELDS = ("name", "idx", PRODUCT_FIELD, "item_code", "qty", "custom_cost", "custom_total_cost")
+HEADER_FIELDS = ("total", "custom_overhead", "custom_total_cost", "custom_total_profit", "custom_profit_margin")
+CODES = [f"TEST-OB-{i}" for i in range(8)]
+BUNDLES = [f"TEST-OB-PB-{i}" for i in range(4)]
+
+
+def _components(rng):
+	"""bundle -> per-one components, as it.handlers.bundle_explosion.explode returns them."""
+	return {
+		bundle: [
+			{"item_code": code, "qty": rng.choice((0, 1, 2, 0.5)), "description": "", "uom": "Nos"}
+			for code in rng.sample(CODES, rng.randint(1, 4))
+		]
+		for bundle in BUNDLES
+	}
+
+
+def _fake_explode(components):
+	def explode(source_of):
+		return {code: components[bun] for code, (bun, _bom) in source_of.items() if bun in components}
+
+	return explode
+
+
+def _copy(doc):
+	return frappe.get_doc(frappe.parse_json(frappe.as_json(doc.as_dict())))
+
+
+def _name_new_rows(doc):
+	for table in ("items", PARENT_BUNDLE_TABLE):
+		for row in doc.get(table) or []:
+			if not row.name:
+				row.name = frappe.generate_hash(length=10)
+
+
+def _new_opportunity(rng):
+	items = []
+	for code in rng.sample(CODES, rng.randint(1, 6)):
+		bundled = rng.random() < 0.6
+		items.append(
+			{
+				"item_code": code,
+				"custom_product_bundle": rng.choice(BUNDLES) if bundled else None,
+				"custom_main": 1 if bundled else 0,
+				"qty": rng.randint(1, 5),
+				"rate": rng.choice((0, 10, 99.5, 250)),
+				"custom_purchase_rate": rng.choice((0, 7, 40)),
+			}
+		)
+	return frappe.get_doc(
+		{
+			"doctype": "Opportunity",
+			"total": rng.choice((0, 500, 1200)),
+			"custom_overhead": rng.choice((0, 15)),
+			"items": items,
+		}
+	)
+
+
+def _edit(doc, rng):
+	"""Random user edits between two saves."""
+	for _ in range(rng.randint(1, 4)):
+		items = doc.get("items") or []
+		bundle_rows = doc.get(PARENT_BUNDLE_TABLE) or []
+		action = rng.choice(("rate", "qty", "cost", "stale", "remove", "bundle", "add"))
+		if action == "rate" and items:
+			rng.choice(items).rate = rng.choice((0, 15, 120))
+		elif action == "qty" and items:
+			rng.choice(items).qty = rng.randint(1, 9)
+		elif action == "cost" and bundle_rows:
+			rng.choice(bundle_rows).custom_cost = rng.choice((0, 3, 12.5))
+		elif action == "stale":
+			# values the client may send back out of sync with the costing
+			if items:
+				row = rng.choice(items)
+				row.set(rng.choice(("custom_margin", "custom_total_cost", "custom_purchase_rate")), 123.0)
+			if bundle_rows:
+				rng.choice(bundle_rows).custom_total_cost = 77.0
+		elif action == "remove" and items:
+			removed = rng.choice(items)
+			doc.set("items", [r for r in items if r is not removed])
+		elif action == "bundle" and items:
+			row = rng.choice(items)
+			row.custom_product_bundle = rng.choice(BUNDLES)
+			row.custom_main = 1
+		elif action == "add":
+			doc.append(
+				"items",
+				{
+					"item_code": rng.choice(CODES),
+					"custom_product_bundle": rng.choice(BUNDLES),
+					"custom_main": 1,
+					"qty": 1,
+					"rate": 50,
+				},
+			)
+
+
+def _sequential_rebuild_layout(doc, components):
+	"""
+	(custom_product, item_code, idx) of every bundle row after the rebuild as the
+	hook originally did it: per item, drop that item's rows, then append the new ones.
+	"""
+	table = [(r.get(PRODUCT_FIELD), r.item_code, r.idx) for r in doc.get(PARENT_BUNDLE_TABLE) or []]
+	source_of = {}
+	for it in doc.get("items") or []:
+		if it.item_code and it.custom_product_bundle:
+			source_of[it.item_code] = it.custom_product_bundle
+
+	for parent, bundle in source_of.items():
+		comps = components.get(bundle) or []
+		existing = {code for p, code, _idx in table if p == parent and code}
+		compset = {c["item_code"] for c in comps}
+		if not comps or (existing and compset == existing):
+			continue
+		table = [row for row in table if row[0] != parent]
+		for c in comps:
+			if flt(c["qty"]) > 0:
+				table.append((parent, c["item_code"], len(table) + 1))
+	return table
+
+
+def _snapshot(doc):
+	return (
+		[tuple(r.get(f) for f in ITEM_FIELDS) for r in doc.get("items") or []],
+		[tuple(r.get(f) for f in BUNDLE_FIELDS) for r in doc.get(PARENT_BUNDLE_TABLE) or []],
+		tuple(doc.get(f) for f in HEADER_FIELDS),
+	)
+
+
+class TestOpportunityBundle(FrappeTestCase):
+	def test_incremental_validate_matches_full_recompute(self):
+		rng = random.Random(20260518)
+		for case in range(CASES):
+			components = _components(rng)
+			with self.subTest(case=case), patch.object(opportunity_bundle, "explode", _fake_explode(components)):
+				saved = _new_opportunity(rng)
+				on_validate(saved)
+				_name_new_rows(saved)
+
+				edited = _copy(saved)
+				_edit(edited, rng)
+				expected_layout = _sequential_rebuild_layout(edited, components)
+
+				incremental = _copy(edited)
+				incremental._doc_before_save = _copy(saved)
+				on_validate(incremental)
+
+				full = _copy(edited)
+				on_validate(full)
+
+				self.assertEqual(_snapshot(incremental), _snapshot(full))
+				self.assertEqual(
+					[(r.get(PRODUCT_FIELD), r.item_code, r.idx) for r in full.get(PARENT_BUNDLE_TABLE) or []],
+					expected_layout,
+				)
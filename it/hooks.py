@@ -31,6 +31,10 @@ doctype_js = {
     "Delivery Note": "public/js/doctype/delivery_note/delivery_note_delivery_bom.js",
 }
 
+doctype_list_js = {
+    "Delivery Note": "public/js/doctype/delivery_note/delivery_note_list.js",
+}
+
 
 # ... existing imports/metadata ...
 
@@ -61,7 +65,10 @@ override_whitelisted_methods = {
 
 # include js, css files in header of desk.html
 # app_include_css = "/assets/it/css/it.css"
-# app_include_js = "/assets/it/js/it.js"
+app_include_js = [
+    "/assets/it/js/async_mapping.js",
+    "/assets/it/js/bundle_payload.js",
+]
 
 # include js, css files in header of web template
 # web_include_css = "/assets/it/css/it.css"
@@ -180,6 +187,76 @@ override_whitelisted_methods = {
 # 	}
 # }
 
+doc_events = {
+    "Custom Field": {
+        "on_update": "it.capabilities.clear_capabilities",
+        "on_trash": "it.capabilities.clear_capabilities",
+    },
+    "Property Setter": {
+        "on_update": "it.capabilities.clear_capabilities",
+        "on_trash": "it.capabilities.clear_capabilities",
+    },
+    "Delivery Note": {
+        "on_submit": "it.handlers.delivery_bom_ledger.update_delivery_bom_ledger",
+        "on_cancel": "it.handlers.delivery_bom_ledger.update_delivery_bom_ledger",
+    },
+    "Quotation": {
+        "on_update": "it.handlers.response_cache.invalidate_response_cache",
+        "on_update_after_submit": "it.handlers.response_cache.invalidate_response_cache",
+        "on_cancel": "it.handlers.response_cache.invalidate_response_cache",
+        "on_trash": "it.handlers.response_cache.invalidate_response_cache",
+        "after_rename": "it.handlers.response_cache.on_source_rename",
+    },
+    "Sales Order": {
+        "on_update": "it.handlers.response_cache.invalidate_response_cache",
+        "on_update_after_submit": "it.handlers.response_cache.invalidate_response_cache",
+        "on_cancel": "it.handlers.response_cache.invalidate_response_cache",
+        "on_trash": "it.handlers.response_cache.invalidate_response_cache",
+        "after_rename": "it.handlers.response_cache.on_source_rename",
+    },
+    "Item": {
+        "on_update": "it.handlers.response_cache.on_item_change",
+        "after_rename": [
+            "it.handlers.response_cache.on_item_change",
+            "it.handlers.product_bundle.on_item_rename",
+        ],
+    },
+    "Sales Invoice": {
+        "on_submit": [
+            "it.handlers.delivery_bom_ledger.update_delivery_bom_ledger",
+            "it.handlers.sales_target.update_achievement",
+        ],
+        "on_cancel": [
+            "it.handlers.delivery_bom_ledger.update_delivery_bom_ledger",
+            "it.handlers.sales_target.update_achievement",
+        ],
+    },
+    "Purchase Order": {
+        "on_submit": [
+            "it.handlers.delivery_bom_ledger.update_delivery_bom_ledger",
+            "it.handlers.delivery_bom_ledger.invalidate_ordered_qty",
+        ],
+        "on_cancel": [
+            "it.handlers.delivery_bom_ledger.update_delivery_bom_ledger",
+            "it.handlers.delivery_bom_ledger.invalidate_ordered_qty",
+        ],
+    },
+    "Opportunity": {
+        "validate": "it.handlers.opportunity_bundle.on_validate",
+        "on_update": "it.handlers.response_cache.invalidate_response_cache",
+        "on_trash": "it.handlers.response_cache.invalidate_response_cache",
+        "after_rename": "it.handlers.response_cache.on_source_rename",
+    },
+    "Product Bundle": {
+        "on_update": "it.handlers.product_bundle.invalidate_bundle_components",
+        "on_trash": "it.handlers.product_bundle.invalidate_bundle_components",
+        "after_rename": "it.handlers.product_bundle.on_bundle_rename",
+    },
+    "Stock Ledger Entry": {
+        "on_submit": "it.handlers.component_stock.invalidate_component_stock",
+    },
+}
+
 # Scheduled Tasks
 # ---------------
 
@@ -201,6 +278,12 @@ override_whitelisted_methods = {
 # 	],
 # }
 
+scheduler_events = {
+    "daily": [
+        "it.instrumentation.purge_endpoint_log",
+    ],
+}
+
 # Testing
 # -------
 
@@ -234,11 +317,17 @@ override_whitelisted_methods = {
 # before_request = ["it.utils.before_request"]
 # after_request = ["it.utils.after_request"]
 
+# flush buffered it.instrumentation records (Endpoint Performance Log)
+# ETag / 304 for the conditional bundle GETs (it.payload)
+after_request = ["it.instrumentation.flush_endpoint_log", "it.payload.set_etag"]
+
 # Job Events
 # ----------
 # before_job = ["it.utils.before_job"]
 # after_job = ["it.utils.after_job"]
 
+after_job = ["it.instrumentation.flush_endpoint_log"]
+
 # User Data Protection
 # --------------------
 
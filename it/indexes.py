@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import frappe
+
+# ----------------------------------------------------------------------
+# Composite indexes for the app's hot queries
+# ----------------------------------------------------------------------
+# (doctype, columns, index_name). Added by post_model_sync patches; the
+# EXPLAIN check below confirms the app's queries actually pick them.
+PERFORMANCE_INDEXES = (
+    ("Delivery BOM", ("parent", "parenttype", "idx"), "it_parent_parenttype_idx"),
+    ("Product Bundle Item", ("parent", "parenttype", "idx"), "it_parent_parenttype_idx"),
+    ("Sales Invoice", ("customer", "docstatus", "posting_date", "name"), "it_customer_docstatus_posting_date"),
+    ("Purchase Order Item", ("sales_order", "item_code"), "it_sales_order_item_code"),
+)
+EXPLAIN_NAME = "IT-EXPLAIN"  # placeholder document name / party for the EXPLAINed queries
+
+
+def hot_queries() -> list[tuple[str, str, str, dict | None]]:
+    """
+    (doctype, index_name, sql, values) of each hot query, built by the code that
+    issues it, so the EXPLAIN sees exactly what runs.
+    """
+    from it.api import delivery_bom_rows_query
+    from it.handlers.delivery_bom_ledger import ordered_component_qty_query
+    from it.handlers.product_bundle import bundle_components_query
+    from it.overrides.journal_entry import invoice_page_query
+
+    return [
+        ("Delivery BOM", "it_parent_parenttype_idx", delivery_bom_rows_query("Sales Order", EXPLAIN_NAME), None),
+        (
+            "Product Bundle Item", "it_parent_parenttype_idx",
+            bundle_components_query([EXPLAIN_NAME, f"{EXPLAIN_NAME}-2"]), None,
+        ),
+        (
+            "Sales Invoice", "it_customer_docstatus_posting_date",
+            invoice_page_query(EXPLAIN_NAME, outstanding_only=1).get_sql(), None,
+        ),
+        (
+            "Purchase Order Item", "it_sales_order_item_code",
+            ordered_component_qty_query(), {"sales_order": EXPLAIN_NAME},
+        ),
+    ]
+
+
+def ensure_index(doctype: str, columns, index_name: str) -> bool:
+    """Create the index unless it (or one of its columns) is missing; True when created."""
+    table = f"tab{doctype}"
+    if not frappe.db.table_exists(doctype):
+        return False
+    if frappe.db.has_index(table, index_name):
+        return False
+    missing = [c for c in columns if c != "name" and not frappe.db.has_column(doctype, c)]
+    if missing:
+        print(f"Skipped index {index_name} on `{table}`: missing column(s) {', '.join(missing)}")
+        return False
+
+    frappe.db.add_index(doctype, list(columns), index_name)
+    print(f"Added index {index_name} on `{table}` ({', '.join(columns)})")
+    return True
+
+
+def ensure_performance_indexes() -> list[str]:
+    return [name for doctype, columns, name in PERFORMANCE_INDEXES if ensure_index(doctype, columns, name)]
+
+
+@frappe.whitelist()
+def check_index_usage() -> list[dict]:
+    """
+    EXPLAIN each hot query and report which key MariaDB picks.
+    Run with `bench --site <site> execute it.indexes.check_index_usage`.
+    """
+    frappe.only_for("System Manager")
+
+    report = []
+    for doctype, index_name, sql, values in hot_queries():
+        plan = frappe.db.sql(f"explain {sql}", values, as_dict=True)
+        keys = [p.get("key") for p in plan if p.get("key")]
+        report.append(
+            {
+                "doctype": doctype,
+                "index": index_name,
+                "keys": keys,
+                "possible_keys": [p.get("possible_keys") for p in plan],
+                "uses_index": index_name in keys,
+            }
+        )
+    return report
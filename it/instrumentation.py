@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import functools
+import json
+import time
+from collections import deque
+
+import frappe
+from frappe.utils import add_days, add_to_date, cint, now, now_datetime
+
+# ----------------------------------------------------------------------
+# Endpoint latency / query-count instrumentation
+# ----------------------------------------------------------------------
+# @instrumented wraps a whitelisted method: it times the call, counts the SQL
+# statements sent through frappe.db.sql while it runs and splits the time into
+# phases marked with lap() (core mapping, bundle append, totals, ...). Records
+# go to a per-site ring buffer in the worker process, written to `Endpoint
+# Performance Log` in one insert by the after_request hook once the buffer is
+# large or old enough. Nested instrumented calls count towards the outer one.
+LOG_DOCTYPE = "Endpoint Performance Log"
+RING_SIZE = 2000
+FLUSH_BATCH = 100
+FLUSH_INTERVAL = 60  # seconds
+LOG_RETENTION_DAYS = 14
+PERCENTILES = (50, 95, 99)
+
+_buffers: dict[str, deque] = {}
+_last_flush: dict[str, float] = {}
+
+
+def _enabled() -> bool:
+    return not cint(frappe.conf.get("it_disable_endpoint_log"))
+
+
+def _buffer() -> deque:
+    site = getattr(frappe.local, "site", None) or ""
+    if site not in _buffers:
+        _buffers[site] = deque(maxlen=RING_SIZE)
+        _last_flush[site] = time.monotonic()
+    return _buffers[site]
+
+
+def _rows_of(result) -> int:
+    """Rows produced by an endpoint: list length, list values of a dict, child rows of a doc."""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        return sum(len(v) for v in result.values() if isinstance(v, list))
+    if hasattr(result, "get"):
+        return len(result.get("items") or []) + len(result.get("custom_delivery_bom") or [])
+    return 0
+
+
+def lap(phase: str) -> None:
+    """Close the current phase of the running endpoint: time since the previous lap goes to `phase`."""
+    trace = getattr(frappe.local, "it_endpoint_trace", None)
+    if not trace:
+        return
+    t = time.perf_counter()
+    trace["phases"][phase] = trace["phases"].get(phase, 0.0) + (t - trace["lap"]) * 1000.0
+    trace["lap"] = t
+
+
+def instrumented(fn):
+    """Record duration, phases, query count and rows of every call of `fn`."""
+    method = f"{fn.__module__}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if getattr(frappe.local, "it_endpoint_trace", None) or not _enabled():
+            return fn(*args, **kwargs)
+
+        started_at, started = now(), time.perf_counter()
+        trace = {"queries": 0, "phases": {}, "lap": started}
+        frappe.local.it_endpoint_trace = trace
+
+        db = frappe.local.db
+        patched = "sql" in vars(db)
+        sql = db.sql
+
+        def counting_sql(*a, **kw):
+            trace["queries"] += 1
+            return sql(*a, **kw)
+
+        db.sql = counting_sql
+        status, result = "Error", None
+        try:
+            result = fn(*args, **kwargs)
+            status = "Success"
+            return result
+        finally:
+            if patched:
+                db.sql = sql
+            else:
+                del db.sql
+            frappe.local.it_endpoint_trace = None
+            ended = time.perf_counter()
+            if trace["phases"]:
+                # time after the last lap
+                trace["phases"]["other"] = trace["phases"].get("other", 0.0) + (ended - trace["lap"]) * 1000.0
+            _buffer().append(
+                {
+                    "method": method,
+                    "status": status,
+                    "user": frappe.session.user if getattr(frappe.local, "session", None) else None,
+                    "started_at": started_at,
+                    "duration_ms": round((ended - started) * 1000.0, 3),
+                    "query_count": trace["queries"],
+                    "rows_processed": _rows_of(result),
+                    "phases": {k: round(v, 3) for k, v in trace["phases"].items()},
+                }
+            )
+
+    return wrapper
+
+
+def flush_endpoint_log(force: bool = False, **kwargs) -> int:
+    """after_request hook: write the site's buffered records when due; returns rows written."""
+    buffer = _buffer()
+    site = getattr(frappe.local, "site", None) or ""
+    due = len(buffer) >= FLUSH_BATCH or time.monotonic() - _last_flush[site] >= FLUSH_INTERVAL
+    if not buffer or not (force or due):
+        return 0
+
+    records = [buffer.popleft() for _ in range(len(buffer))]
+    _last_flush[site] = time.monotonic()
+
+    ts, owner = now(), "Administrator"
+    fields = ["name", "creation", "modified", "owner", "modified_by", "docstatus",
+              "method", "status", "user", "started_at", "duration_ms", "query_count", "rows_processed", "phases"]
+    values = [
+        (frappe.generate_hash(length=12), ts, ts, owner, owner, 0,
+         r["method"], r["status"], r["user"], r["started_at"], r["duration_ms"], r["query_count"],
+         r["rows_processed"], json.dumps(r["phases"]))
+        for r in records
+    ]
+    try:
+        frappe.db.bulk_insert(LOG_DOCTYPE, fields, values)
+        frappe.db.commit()
+    except Exception:
+        frappe.db.rollback()
+        frappe.log_error(title="Endpoint Performance Log flush failed")
+        return 0
+    return len(values)
+
+
+def purge_endpoint_log():
+    """Daily: drop log rows older than LOG_RETENTION_DAYS."""
+    frappe.db.delete(LOG_DOCTYPE, {"creation": ["<", add_days(now_datetime(), -LOG_RETENTION_DAYS)]})
+
+
+def _percentile(sorted_values: list[float], pct: int) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+
+@frappe.whitelist()
+def get_endpoint_summary(hours: int = 24, method: str | None = None):
+    """
+    p50 / p95 / p99 latency per instrumented method over the last `hours`,
+    with mean query count, rows and per-phase time. Includes this worker's
+    records that are not flushed yet.
+    """
+    frappe.only_for("System Manager")
+
+    filters = {"started_at": [">=", add_to_date(now_datetime(), hours=-cint(hours or 24))]}
+    if method:
+        filters["method"] = method
+    records = frappe.get_all(
+        LOG_DOCTYPE,
+        filters=filters,
+        fields=["method", "duration_ms", "query_count", "rows_processed", "phases"],
+        order_by="started_at asc",
+    )
+    records += [frappe._dict(r, phases=json.dumps(r["phases"])) for r in _buffer() if not method or r["method"] == method]
+
+    by_method: dict[str, list] = {}
+    for r in records:
+        by_method.setdefault(r.method, []).append(r)
+
+    summary = []
+    for name, rows in sorted(by_method.items()):
+        durations = sorted(float(r.duration_ms or 0) for r in rows)
+        phase_totals: dict[str, float] = {}
+        for r in rows:
+            for phase, ms in (json.loads(r.phases) if r.phases else {}).items():
+                phase_totals[phase] = phase_totals.get(phase, 0.0) + ms
+        entry = {
+            "method": name,
+            "calls": len(rows),
+            "mean_queries": round(sum(cint(r.query_count) for r in rows) / len(rows), 1),
+            "mean_rows": round(sum(cint(r.rows_processed) for r in rows) / len(rows), 1),
+            "phases_ms": {k: round(v / len(rows), 3) for k, v in phase_totals.items()},
+        }
+        for pct in PERCENTILES:
+            entry[f"p{pct}_ms"] = round(_percentile(durations, pct), 3)
+        summary.append(entry)
+    return summary
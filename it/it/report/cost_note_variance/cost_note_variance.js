@@ -0,0 +1,36 @@
+// Copyright (c) 2026, Connect 4 Systems and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Cost Note Variance"] = {
+	filters: [
+		{
+			fieldname: "from_date",
+			label: __("From Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.add_months(frappe.datetime.get_today(), -12),
+		},
+		{
+			fieldname: "to_date",
+			label: __("To Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.get_today(),
+		},
+		{
+			fieldname: "cost_note",
+			label: __("Cost Note"),
+			fieldtype: "Link",
+			options: "Cost Note",
+		},
+		{
+			fieldname: "opportunity",
+			label: __("Opportunity"),
+			fieldtype: "Link",
+			options: "Opportunity",
+		},
+		{
+			fieldname: "only_invoiced",
+			label: __("Only Invoiced Lines"),
+			fieldtype: "Check",
+		},
+	],
+};
@@ -0,0 +1,41 @@
+# Copyright (c) 2026, Connect 4 Systems and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+
+from it.cost_variance import get_cost_note_variance
+
+
+def execute(filters=None):
+	filters = frappe._dict(filters or {})
+	return get_columns(), get_data(filters)
+
+
+def get_columns():
+	return [
+		{"fieldname": "cost_note", "label": _("Cost Note"), "fieldtype": "Link", "options": "Cost Note", "width": 140},
+		{"fieldname": "opportunity", "label": _("Opportunity"), "fieldtype": "Link", "options": "Opportunity", "width": 140},
+		{"fieldname": "item", "label": _("Item"), "fieldtype": "Link", "options": "Item", "width": 160},
+		{"fieldname": "uom", "label": _("UOM"), "fieldtype": "Link", "options": "UOM", "width": 70},
+		{"fieldname": "estimated_cost", "label": _("Estimated Cost"), "fieldtype": "Currency", "width": 120},
+		{"fieldname": "actual_cost", "label": _("Actual Cost"), "fieldtype": "Currency", "width": 120},
+		{"fieldname": "variance", "label": _("Variance"), "fieldtype": "Currency", "width": 110},
+		{"fieldname": "variance_pct", "label": _("Variance %"), "fieldtype": "Percent", "width": 100},
+		{"fieldname": "actual_qty", "label": _("Invoiced Qty"), "fieldtype": "Float", "width": 100},
+		{"fieldname": "actual_amount", "label": _("Invoiced Amount"), "fieldtype": "Currency", "width": 130},
+		{"fieldname": "invoices", "label": _("Invoices"), "fieldtype": "Int", "width": 80},
+	]
+
+
+def get_data(filters):
+	note_filters = {}
+	if filters.from_date and filters.to_date:
+		note_filters["date"] = ["between", [filters.from_date, filters.to_date]]
+	if filters.opportunity:
+		note_filters["opportunity"] = filters.opportunity
+
+	data = get_cost_note_variance([filters.cost_note] if filters.cost_note else None, note_filters)
+	if filters.only_invoiced:
+		data = [d for d in data if d["invoices"]]
+	return data
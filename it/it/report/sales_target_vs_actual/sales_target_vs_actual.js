@@ -0,0 +1,21 @@
+// Copyright (c) 2026, Connect 4 Systems and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Sales Target vs Actual"] = {
+	filters: [
+		{
+			fieldname: "fiscal_year",
+			label: __("Fiscal Year"),
+			fieldtype: "Link",
+			options: "Fiscal Year",
+			reqd: 1,
+			default: erpnext.utils.get_fiscal_year(frappe.datetime.get_today()),
+		},
+		{
+			fieldname: "sales_partner",
+			label: __("Sales Partner"),
+			fieldtype: "Link",
+			options: "Sales Partner",
+		},
+	],
+};
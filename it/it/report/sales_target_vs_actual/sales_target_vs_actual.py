@@ -0,0 +1,88 @@
+# Copyright (c) 2026, Connect 4 Systems and contributors
+# For license information, please see license.txt
+
+import calendar
+
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate
+
+
+def execute(filters=None):
+	filters = frappe._dict(filters or {})
+	if not filters.fiscal_year:
+		frappe.throw(_("Fiscal Year is required"))
+
+	return get_columns(), get_data(filters)
+
+
+def get_columns():
+	return [
+		{"fieldname": "sales_partner", "label": _("Sales Partner"), "fieldtype": "Link", "options": "Sales Partner", "width": 180},
+		{"fieldname": "month", "label": _("Month"), "fieldtype": "Data", "width": 110},
+		{"fieldname": "target_amount", "label": _("Target"), "fieldtype": "Currency", "width": 140},
+		{"fieldname": "achieved_amount", "label": _("Achieved"), "fieldtype": "Currency", "width": 140},
+		{"fieldname": "variance", "label": _("Variance"), "fieldtype": "Currency", "width": 140},
+		{"fieldname": "achievement", "label": _("Achievement %"), "fieldtype": "Percent", "width": 120},
+		{"fieldname": "invoice_count", "label": _("Invoices"), "fieldtype": "Int", "width": 90},
+	]
+
+
+def get_data(filters):
+	"""Reads only Sales Target, its distribution rows and the achievement aggregates."""
+	start_month = getdate(frappe.db.get_value("Fiscal Year", filters.fiscal_year, "year_start_date")).month
+	months = [(start_month + i - 1) % 12 + 1 for i in range(12)]
+
+	target_filters = {"docstatus": 1, "fiscal_year": filters.fiscal_year}
+	actual_filters = {"fiscal_year": filters.fiscal_year}
+	if filters.sales_partner:
+		target_filters["sales_partner"] = filters.sales_partner
+		actual_filters["sales_partner"] = filters.sales_partner
+
+	targets = frappe.get_all("Sales Target", filters=target_filters, fields=["name", "sales_partner", "target_amount"])
+
+	share = {}
+	if targets:
+		for d in frappe.get_all(
+			"Monthly Distribution Percentage",
+			filters={"parenttype": "Sales Target", "parent": ["in", [t.name for t in targets]]},
+			fields=["parent", "month", "percentage_allocation"],
+		):
+			share[(d.parent, d.month)] = flt(d.percentage_allocation)
+
+	target_of = {}
+	for t in targets:
+		has_distribution = any(p == t.name for p, _m in share)
+		for m in months:
+			pct = share.get((t.name, calendar.month_name[m]), 0) if has_distribution else 100.0 / 12
+			key = (t.sales_partner, m)
+			target_of[key] = target_of.get(key, 0) + flt(t.target_amount) * pct / 100.0
+
+	actual_of = {
+		(d.sales_partner, d.month_index): d
+		for d in frappe.get_all(
+			"Sales Target Achievement",
+			filters=actual_filters,
+			fields=["sales_partner", "month_index", "achieved_amount", "invoice_count"],
+		)
+	}
+
+	partners = sorted({p for p, _m in target_of} | {p for p, _m in actual_of})
+	data = []
+	for partner in partners:
+		for m in months:
+			target = flt(target_of.get((partner, m)))
+			actual = actual_of.get((partner, m)) or frappe._dict()
+			achieved = flt(actual.achieved_amount)
+			data.append(
+				{
+					"sales_partner": partner,
+					"month": _(calendar.month_name[m]),
+					"target_amount": target,
+					"achieved_amount": achieved,
+					"variance": achieved - target,
+					"achievement": (achieved / target * 100.0) if target else 0,
+					"invoice_count": actual.invoice_count or 0,
+				}
+			)
+	return data
@@ -2,17 +2,144 @@
 
 import frappe
 from erpnext.accounts.utils import get_outstanding_invoices as original_get_outstanding_invoices
+from frappe.query_builder import Order
+from frappe.query_builder.functions import Count, Sum
+from frappe.utils import cint, getdate
+
+from it.instrumentation import instrumented, lap
+
+# Keyset pagination on (posting_date, name), newest first. Backed by the
+# (customer, docstatus, posting_date, name) index added in
+# it.patches.v1_0.add_sales_invoice_customer_index.
+DEFAULT_PAGE_LENGTH = 500
+MAX_PAGE_LENGTH = 2000
+
+
+def _invoice_conditions(si, party, account=None, outstanding_only=0, from_date=None, to_date=None):
+    conditions = (si.docstatus == 1) & (si.customer == party)
+    if account:
+        conditions &= si.debit_to == account
+    if cint(outstanding_only):
+        conditions &= si.outstanding_amount > 0
+    if from_date:
+        conditions &= si.posting_date >= getdate(from_date)
+    if to_date:
+        conditions &= si.posting_date <= getdate(to_date)
+    return conditions
+
+
+def _parse_cursor(cursor):
+    """cursor = [posting_date, name] of the last row of the previous page."""
+    cursor = frappe.parse_json(cursor) if cursor else None
+    if not cursor or len(cursor) != 2:
+        return None
+    return getdate(cursor[0]), cursor[1]
+
+
+def invoice_page_query(
+    party, account=None, outstanding_only=0, from_date=None, to_date=None, cursor=None,
+    page_length=DEFAULT_PAGE_LENGTH,
+):
+    """Keyset page query of get_sales_invoices_page(), one row past the page (EXPLAINed by it.indexes)."""
+    si = frappe.qb.DocType("Sales Invoice")
+    query = (
+        frappe.qb.from_(si)
+        .select(si.name, si.posting_date, si.grand_total, si.outstanding_amount)
+        .where(_invoice_conditions(si, party, account, outstanding_only, from_date, to_date))
+        .orderby(si.posting_date, order=Order.desc)
+        .orderby(si.name, order=Order.desc)
+        .limit(page_length + 1)
+    )
+    after = _parse_cursor(cursor)
+    if after:
+        query = query.where(
+            (si.posting_date < after[0]) | ((si.posting_date == after[0]) & (si.name < after[1]))
+        )
+    return query
+
 
 @frappe.whitelist()
-def get_all_sales_invoices(doctype, party_type, party, account=None, condition=None):
+@instrumented
+def get_sales_invoices_page(
+    party,
+    account=None,
+    outstanding_only=0,
+    from_date=None,
+    to_date=None,
+    cursor=None,
+    page_length=DEFAULT_PAGE_LENGTH,
+    with_summary=1,
+):
+    """
+    One page of a customer's submitted Sales Invoices, newest first.
+
+    Returns {"invoices": [...], "next_cursor": [posting_date, name] | None,
+    "summary": {"count", "grand_total", "outstanding_amount"}}; the summary covers
+    every invoice matching the filters, not only this page, and is computed in SQL.
+    """
+    frappe.has_permission("Sales Invoice", "read", throw=True)
+
+    page_length = min(max(cint(page_length) or DEFAULT_PAGE_LENGTH, 1), MAX_PAGE_LENGTH)
+    invoices = invoice_page_query(
+        party, account, outstanding_only, from_date, to_date, cursor, page_length
+    ).run(as_dict=True)
+    lap("page")
+    next_cursor = None
+    if len(invoices) > page_length:
+        invoices = invoices[:page_length]
+        last = invoices[-1]
+        next_cursor = [str(last.posting_date), last.name]
+
+    summary = None
+    if cint(with_summary):
+        si = frappe.qb.DocType("Sales Invoice")
+        conditions = _invoice_conditions(si, party, account, outstanding_only, from_date, to_date)
+        totals = (
+            frappe.qb.from_(si)
+            .select(
+                Count(si.name).as_("count"),
+                Sum(si.grand_total).as_("grand_total"),
+                Sum(si.outstanding_amount).as_("outstanding_amount"),
+            )
+            .where(conditions)
+        ).run(as_dict=True)
+        row = totals[0] if totals else {}
+        summary = {
+            "count": cint(row.get("count")),
+            "grand_total": row.get("grand_total") or 0,
+            "outstanding_amount": row.get("outstanding_amount") or 0,
+        }
+
+    lap("summary")
+
+    return {"invoices": invoices, "next_cursor": next_cursor, "summary": summary}
+
+
+@frappe.whitelist()
+@instrumented
+def get_all_sales_invoices(doctype, party_type, party, account=None, condition=None,
+                           outstanding_only=1, from_date=None, to_date=None, cursor=None,
+                           page_length=None):
+    """
+    Sales Invoices of a customer for the Journal Entry dialog, outstanding only by default.
+
+    Called with page_length or cursor, returns one get_sales_invoices_page() result
+    (invoices, next_cursor and summary). Otherwise returns the complete list, as
+    before, read page by page on the keyset index; nothing is cut off.
+    """
     if doctype != "Sales Invoice":
         return original_get_outstanding_invoices(doctype, party_type, party, account, condition)
 
-    return frappe.db.get_all("Sales Invoice",
-        filters={
-            "docstatus": 1,
-            "customer": party
-        },
-        fields=["name", "posting_date", "grand_total", "outstanding_amount"],
-        order_by="posting_date desc"
-    )
+    filters = dict(account=account, outstanding_only=outstanding_only, from_date=from_date, to_date=to_date)
+    if page_length or cursor:
+        return get_sales_invoices_page(
+            party, cursor=cursor, page_length=page_length or DEFAULT_PAGE_LENGTH, with_summary=1, **filters
+        )
+
+    invoices = []
+    while True:
+        page = get_sales_invoices_page(party, cursor=cursor, page_length=MAX_PAGE_LENGTH, with_summary=0, **filters)
+        invoices += page["invoices"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return invoices
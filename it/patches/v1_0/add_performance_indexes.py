@@ -0,0 +1,6 @@
+from it.indexes import ensure_performance_indexes
+
+
+def execute():
+    """Composite indexes for Delivery BOM, Product Bundle Item, Sales Invoice and Purchase Order Item lookups."""
+    ensure_performance_indexes()
@@ -0,0 +1,6 @@
+from it.indexes import ensure_index
+
+
+def execute():
+    """Composite index for the Journal Entry outstanding-invoice lookup (customer, keyset on posting_date, name)."""
+    ensure_index("Sales Invoice", ("customer", "docstatus", "posting_date", "name"), "it_customer_docstatus_posting_date")
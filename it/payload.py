@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import hashlib
+
+import frappe
+from frappe.utils import cint
+
+# ----------------------------------------------------------------------
+# Compact payloads and conditional GETs for the bundle endpoints
+# ----------------------------------------------------------------------
+# Opt-in per call, the default response is unchanged:
+#   fields="item,qty"  keep only these keys of every row
+#   compact=1          {"columns": [...], "rows": [[...], ...]} instead of a list of dicts
+# shape() only reshapes data, so Python callers always get rows back. An
+# endpoint whose rows are versioned by their source document asks
+# not_modified() first: over an HTTP GET of that endpoint it tags the response
+# with an ETag derived from the version (no rows loaded yet) and reports
+# whether the browser already holds it. set_etag() (after_request) writes the
+# header and turns the answer into a bodyless 304. public/js/bundle_payload.js
+# issues these GETs and expands compact payloads back into row objects.
+CACHE_CONTROL = "private, no-cache"
+
+
+def _parse_fields(fields) -> list[str] | None:
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = frappe.parse_json(fields) if fields.lstrip().startswith("[") else fields.split(",")
+    return [f.strip() for f in fields if f and f.strip()] or None
+
+
+def shape_rows(rows: list, fields=None, compact=0):
+    """Apply the field projection and the columnar format to a list of row dicts."""
+    fields = _parse_fields(fields)
+    if fields:
+        rows = [{f: r.get(f) for f in fields} for r in rows]
+    if not cint(compact):
+        return rows
+
+    columns = fields or list(dict.fromkeys(k for r in rows for k in r))
+    return {"columns": columns, "rows": [[r.get(c) for c in columns] for r in rows]}
+
+
+def shape(result, fields=None, compact=0):
+    """shape_rows() for a list or for the items of a {"items": [...]} container."""
+    if isinstance(result, dict) and isinstance(result.get("items"), list):
+        return dict(result, items=shape_rows(result["items"], fields, compact))
+    if isinstance(result, list):
+        return shape_rows(result, fields, compact)
+    return result
+
+
+def not_modified(method: str, version: str | None, fields=None, compact=0) -> bool:
+    """
+    True when this request is an HTTP GET of `method` whose If-None-Match already
+    holds the ETag of `version` (in the requested shape); the endpoint then
+    returns without loading anything. Any other call returns False.
+    """
+    request = getattr(frappe.local, "request", None)
+    if not version or not request or request.method != "GET" or frappe.form_dict.get("cmd") != method:
+        return False
+
+    tag = "|".join((method, version, frappe.session.user, ",".join(_parse_fields(fields) or ()), str(cint(compact))))
+    etag = hashlib.md5(tag.encode("utf-8")).hexdigest()
+    hit = etag in request.if_none_match
+    frappe.local.it_payload_etag = (etag, hit)
+    return hit
+
+
+def set_etag(response=None, request=None, **kwargs):
+    """after_request: add the ETag chosen by not_modified(), 304 when the client has it."""
+    tagged = getattr(frappe.local, "it_payload_etag", None)
+    if not tagged or response is None or response.status_code != 200:
+        return
+    etag, hit = tagged
+    response.headers["ETag"] = f'"{etag}"'
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if hit:
+        response.status_code = 304
+        response.set_data(b"")
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+# ----------------------------------------------------------------------
+# Consolidated pick list for a wave of Delivery Notes
+# ----------------------------------------------------------------------
+# Required stock quantities of all selected notes are aggregated per
+# (item_code, warehouse) in one GROUP BY query (a row without a warehouse
+# falls back to the note's set_warehouse), stock for every pair comes from one
+# Bin query, and the result is a single pick route sorted by warehouse and
+# item with shortages flagged. A shortage compares the required qty with the
+# actual stock: the notes being picked usually ship against Sales Orders whose
+# reservations are part of Bin.reserved_qty, so reserved stock is shown for
+# information only. Component rows added at rate 0 by
+# make_delivery_note_merged are picked like any other row.
+MAX_NOTES = 1000
+
+
+def _required_qty(delivery_notes: list[str], include_submitted: bool) -> list:
+    return frappe.db.sql(
+        """select coalesce(dni.warehouse, dn.set_warehouse) as warehouse, dni.item_code,
+                max(dni.item_name) as item_name, max(dni.stock_uom) as stock_uom,
+                sum(dni.stock_qty) as qty, count(distinct dni.parent) as notes
+            from `tabDelivery Note Item` dni
+            inner join `tabDelivery Note` dn on dn.name = dni.parent
+            where dni.parent in %(notes)s and dn.docstatus in %(docstatus)s
+            group by coalesce(dni.warehouse, dn.set_warehouse), dni.item_code
+            order by warehouse asc, dni.item_code asc""",
+        {"notes": delivery_notes, "docstatus": (0, 1) if include_submitted else (0,)},
+        as_dict=True,
+    )
+
+
+def _bin_qty(lines) -> dict[tuple, tuple[float, float]]:
+    """(item_code, warehouse) -> (actual_qty, reserved_qty)"""
+    items = sorted({l.item_code for l in lines if l.warehouse})
+    warehouses = sorted({l.warehouse for l in lines if l.warehouse})
+    if not items:
+        return {}
+    return {
+        (r[0], r[1]): (flt(r[2]), flt(r[3]))
+        for r in frappe.db.sql(
+            """select item_code, warehouse, actual_qty, reserved_qty
+                from `tabBin`
+                where item_code in %(items)s and warehouse in %(warehouses)s""",
+            {"items": items, "warehouses": warehouses},
+        )
+    }
+
+
+@frappe.whitelist()
+def get_pick_list(delivery_notes, include_submitted: int = 0):
+    """
+    Pick route for a set of Delivery Notes (draft only unless include_submitted=1):
+    one line per (warehouse, item_code) with the required stock qty, actual and
+    reserved stock and the shortage against the actual stock.
+    """
+    frappe.has_permission("Delivery Note", "read", throw=True)
+    delivery_notes = sorted(set(frappe.parse_json(delivery_notes) or []))
+    if not delivery_notes:
+        return {"route": [], "shortages": 0, "delivery_notes": []}
+    if len(delivery_notes) > MAX_NOTES:
+        frappe.throw(_("A pick list can cover at most {0} Delivery Notes").format(MAX_NOTES))
+
+    lines = _required_qty(delivery_notes, bool(frappe.utils.cint(include_submitted)))
+    stock = _bin_qty(lines)
+
+    route, shortages = [], 0
+    for l in lines:
+        actual, reserved = stock.get((l.item_code, l.warehouse), (0.0, 0.0))
+        required = flt(l.qty)
+        shortage = max(required - actual, 0.0) if l.warehouse else required
+        shortages += 1 if shortage > 0 else 0
+        route.append(
+            {
+                "warehouse": l.warehouse,
+                "item_code": l.item_code,
+                "item_name": l.item_name,
+                "stock_uom": l.stock_uom,
+                "qty": required,
+                "notes": l.notes,
+                "actual_qty": actual,
+                "reserved_qty": reserved,
+                "shortage_qty": shortage,
+            }
+        )
+
+    return {"route": route, "shortages": shortages, "delivery_notes": delivery_notes}
@@ -0,0 +1,40 @@
+// Background bundle mapping (it.async_mapping): start the job, show realtime
+// progress and open the saved draft when it is ready.
+
+frappe.provide("it.async_mapping");
+
+it.async_mapping.start = function (mapper, source_name) {
+  // same id as it.async_mapping._job_id, known before the job can report
+  const job_id = `it-mapping::${mapper}::${source_name}`;
+  const title = __("Creating document in background");
+  let finished = false;
+
+  const handler = (data) => {
+    if (!data || data.job_id !== job_id) return;
+    frappe.show_progress(title, data.percent, 100, __(frappe.utils.to_title_case(data.stage)));
+    if (data.stage !== "done" && data.stage !== "failed") return;
+
+    finished = true;
+    frappe.realtime.off("it_mapping_progress", handler);
+    frappe.hide_progress();
+    if (data.stage === "failed") {
+      frappe.msgprint({ title: __("Background Mapping Failed"), message: data.error, indicator: "red" });
+      return;
+    }
+    frappe.set_route("Form", data.doctype, data.name);
+  };
+
+  // subscribe first, the job can finish before the call returns
+  frappe.realtime.on("it_mapping_progress", handler);
+  return frappe.call({
+    method: "it.async_mapping.enqueue_mapping",
+    args: { mapper, source_name }
+  }).then(
+    () => finished || frappe.show_progress(title, 0, 100, __("Queued")),
+    () => frappe.realtime.off("it_mapping_progress", handler)
+  );
+};
+
+it.async_mapping.add_button = function (frm, label, mapper) {
+  frm.add_custom_button(label, () => it.async_mapping.start(mapper, frm.doc.name), __("Create"));
+};
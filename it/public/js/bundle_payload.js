@@ -0,0 +1,47 @@
+// Compact / conditional calls to the bundle endpoints (it.payload): rows come
+// back as {columns, rows} over a plain GET (no cache-busting parameter), so the
+// browser keeps the response and revalidates it with the server's ETag (304
+// when the source document is unchanged); only the requested fields travel.
+
+frappe.provide("it.payload");
+
+// {columns, rows} -> [{column: value}, ...]; plain lists pass through
+it.payload.expand = function (payload) {
+  if (!payload || Array.isArray(payload) || !Array.isArray(payload.columns)) return payload;
+  const columns = payload.columns;
+  return (payload.rows || []).map(values => {
+    const row = {};
+    columns.forEach((c, i) => { row[c] = values[i]; });
+    return row;
+  });
+};
+
+function server_messages(data) {
+  try {
+    return JSON.parse(data._server_messages || "[]").map(m => JSON.parse(m).message).join("<br>");
+  } catch (e) {
+    return "";
+  }
+}
+
+// resolves to a list of row objects (or to {items: [...]} for container responses)
+it.payload.fetch_rows = function (method, args, fields) {
+  const params = new URLSearchParams();
+  Object.entries(Object.assign({}, args, { compact: 1 }, fields ? { fields: fields.join(",") } : {}))
+    .forEach(([key, value]) => { if (value !== undefined && value !== null) params.append(key, value); });
+
+  return fetch(`/api/method/${method}?${params}`, {
+    credentials: "same-origin",
+    headers: { Accept: "application/json", "X-Frappe-CSRF-Token": frappe.csrf_token }
+  }).then(r => r.json().then(data => {
+    if (!r.ok) {
+      frappe.msgprint({ title: __("Error"), message: server_messages(data) || __("Could not load rows"), indicator: "red" });
+      return Promise.reject(data);
+    }
+    const message = data && data.message;
+    if (message && !Array.isArray(message) && message.items) {
+      return Object.assign({}, message, { items: it.payload.expand(message.items) });
+    }
+    return it.payload.expand(message);
+  }));
+};
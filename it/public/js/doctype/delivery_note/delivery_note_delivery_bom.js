@@ -27,10 +27,10 @@ frappe.ui.form.on("Delivery Note", {
     const so = get_source_sales_order(frm);
     if (!so || frm._delivery_bom_appended) return;
     frm._delivery_bom_appended = true;
-    frappe.call({
-      method: "it.api.get_delivery_bom_from_sales_order",
-      args: { sales_order_name: so },
-      freeze: false
-    }).then(r => append_dn_items_from_rows(frm, r && r.message));
+    it.payload.fetch_rows(
+      "it.api.get_delivery_bom_from_sales_order",
+      { sales_order_name: so },
+      ["item", "item_name", "description", "qty"]
+    ).then(rows => append_dn_items_from_rows(frm, rows));
   }
 });
@@ -0,0 +1,52 @@
+// Delivery Note list: consolidated pick list for the selected (draft) notes
+
+function show_pick_list(data) {
+  const route = (data && data.route) || [];
+  const rows = route.map(r => `
+    <tr class="${r.shortage_qty > 0 ? "text-danger" : ""}">
+      <td>${frappe.utils.escape_html(r.warehouse || __("Not set"))}</td>
+      <td>${frappe.utils.escape_html(r.item_code)}<br><span class="text-muted">${frappe.utils.escape_html(r.item_name || "")}</span></td>
+      <td class="text-right">${format_number(r.qty)} ${frappe.utils.escape_html(r.stock_uom || "")}</td>
+      <td class="text-right">${format_number(r.actual_qty)}</td>
+      <td class="text-right text-muted">${r.reserved_qty ? format_number(r.reserved_qty) : ""}</td>
+      <td class="text-right">${r.shortage_qty > 0 ? format_number(r.shortage_qty) : ""}</td>
+      <td class="text-right">${r.notes}</td>
+    </tr>`).join("");
+
+  const d = new frappe.ui.Dialog({
+    title: __("Pick List ({0} Delivery Notes, {1} shortages)", [data.delivery_notes.length, data.shortages]),
+    size: "extra-large",
+    fields: [{ fieldtype: "HTML", fieldname: "route" }]
+  });
+  d.fields_dict.route.$wrapper.html(`
+    <table class="table table-bordered table-condensed">
+      <thead><tr>
+        <th>${__("Warehouse")}</th><th>${__("Item")}</th><th class="text-right">${__("Qty")}</th>
+        <th class="text-right">${__("In Stock")}</th><th class="text-right">${__("Reserved")}</th>
+        <th class="text-right">${__("Shortage")}</th>
+        <th class="text-right">${__("Notes")}</th>
+      </tr></thead>
+      <tbody>${rows || `<tr><td colspan="7" class="text-muted">${__("Nothing to pick")}</td></tr>`}</tbody>
+    </table>`);
+  d.show();
+}
+
+frappe.listview_settings["Delivery Note"] = frappe.listview_settings["Delivery Note"] || {};
+const it_dn_list_onload = frappe.listview_settings["Delivery Note"].onload;
+
+frappe.listview_settings["Delivery Note"].onload = function (listview) {
+  if (it_dn_list_onload) it_dn_list_onload(listview);
+
+  listview.page.add_actions_menu_item(__("Pick List"), () => {
+    const names = listview.get_checked_items(true);
+    if (!names.length) {
+      frappe.msgprint(__("Select the Delivery Notes to pick"));
+      return;
+    }
+    frappe.call({
+      method: "it.picking.get_pick_list",
+      args: { delivery_notes: names },
+      freeze: true
+    }).then(r => show_pick_list(r && r.message));
+  });
+};
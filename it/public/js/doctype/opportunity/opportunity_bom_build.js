@@ -24,7 +24,6 @@
   const H_PROFIT     = "custom_total_profit";
   const H_MARGIN_PCT = "custom_profit_margin"; // (total - total_cost) / total_cost * 100
 
-  const flt  = (v) => (isNaN(parseFloat(v)) ? 0 : parseFloat(v));
   const s    = (v) => (v || "").trim();
   const cint = (v) => (isNaN(parseInt(v)) ? 0 : parseInt(v));
 
@@ -69,75 +68,63 @@
     frm.refresh_field("items");
   }
 
-  // --- bundle row math ---
-  function recompute_bundle_row_total(r) {
-    r[B_TOTAL] = flt(r[B_QTY]) * flt(r[B_COST]);
+  // ---- server costing (it.handlers.opportunity_costing) ----
+  // Every edit schedules one debounced call with the cost columns only; the
+  // response holds just the fields that changed and is applied with a single
+  // refresh per touched table. The same engine runs again on save (validate).
+  const COSTING_METHOD      = "it.handlers.opportunity_costing.get_opportunity_costing_diff";
+  const COSTING_DEBOUNCE_MS = 250;
+  const B_COLUMNS = ["name", B_PARENT, B_QTY, B_COST, B_TOTAL];
+  const I_COLUMNS = ["name", I_CODE, I_QTY, I_RATE, I_MAIN, I_COST_PER, I_TOTAL_COST, I_MARGIN_PCT];
+  const H_COLUMNS = [H_TOTAL_SELL, H_OVERHEAD, H_TOTAL_COST, H_PROFIT, H_MARGIN_PCT];
+
+  const pick = (row, cols) => cols.reduce((out, c) => { out[c] = row[c]; return out; }, {});
+
+  function costing_payload(frm) {
+    const payload = pick(frm.doc, H_COLUMNS);
+    payload.items = (frm.doc.items || []).map((r) => pick(r, I_COLUMNS));
+    payload[BUNDLE_TABLE] = (frm.doc[BUNDLE_TABLE] || []).map((r) => pick(r, B_COLUMNS));
+    return payload;
   }
-  function recompute_all_bundle_totals(frm) {
-    (frm.doc[BUNDLE_TABLE] || []).forEach(recompute_bundle_row_total);
-    frm.refresh_field(BUNDLE_TABLE);
-  }
-
-  // --- build per-parent (per ONE unit) cost map from bundle ---
-  function map_cost_per_parent(frm) {
-    const perParent = {};
-    (frm.doc[BUNDLE_TABLE] || []).forEach((r) => {
-      const parent = s(r[B_PARENT]);
-      if (!parent) return;
-      perParent[parent] = (perParent[parent] || 0) + flt(r[B_QTY]) * flt(r[B_COST]);
-    });
-    return perParent;
-  }
-
-  // --- push costs: ONLY overwrite for MAIN rows; non-main keeps manual cost ---
-  function push_costs_from_bundle(frm) {
-    const perParent = map_cost_per_parent(frm);
 
-    (frm.doc.items || []).forEach((it) => {
-      const parentCode   = s(it[I_CODE]);
-      const bundlePerOne = perParent[parentCode] || 0;
-
-      let perUnitCost;
-      if (cint(it[I_MAIN])) {
-        // Main product -> always from bundle
-        perUnitCost = bundlePerOne;
-        it[I_COST_PER] = perUnitCost;
-      } else {
-        // Non-main -> keep user-entered cost
-        perUnitCost = flt(it[I_COST_PER]);
-      }
-
-      it[I_TOTAL_COST] = flt(it[I_QTY]) * perUnitCost;
-      toggle_cost_edit(frm, it); // keep UI state in sync
+  function apply_costing_diff(frm, diff) {
+    let changed = false;
+    [[BUNDLE_TABLE, diff.bundle], ["items", diff.items]].forEach(([table, rows]) => {
+      const names = Object.keys(rows || {});
+      if (!names.length) return;
+      const by_name = {};
+      (frm.doc[table] || []).forEach((r) => { by_name[r.name] = r; });
+      names.forEach((name) => {
+        if (by_name[name]) Object.assign(by_name[name], rows[name]);
+      });
+      frm.refresh_field(table);
+      changed = true;
     });
 
-    frm.refresh_field("items");
+    if (Object.keys(diff.header || {}).length) {
+      frm.set_value(diff.header);
+    } else if (changed) {
+      frm.dirty();
+    }
   }
 
-  // --- line margin (based on selling rate vs cost) ---
-  function recompute_item_margins(frm) {
-    (frm.doc.items || []).forEach((it) => {
-      const rate = flt(it[I_RATE]);
-      const cost = flt(it[I_COST_PER]);
-      it[I_MARGIN_PCT] = rate > 0 ? ((rate - cost) / rate) * 100.0 : 0;
+  function run_costing(frm) {
+    frm._it_costing_timer = null;
+    const seq = (frm._it_costing_seq || 0) + 1;
+    frm._it_costing_seq = seq;
+    return frappe.call({
+      method: COSTING_METHOD,
+      args: { doc: costing_payload(frm) },
+    }).then((r) => {
+      // drop answers overtaken by a newer edit
+      if (seq !== frm._it_costing_seq || frm._it_costing_timer || !r.message) return;
+      apply_costing_diff(frm, r.message);
     });
-    frm.refresh_field("items");
   }
 
-  // --- header totals & cost-based margin ---
-  function recompute_header_totals(frm) {
-    let total_cost = 0;
-    (frm.doc.items || []).forEach((it) => total_cost += flt(it[I_TOTAL_COST]));
-    total_cost += flt(frm.doc[H_OVERHEAD]);
-    frm.set_value(H_TOTAL_COST, total_cost);
-
-    const total_sell = flt(frm.doc[H_TOTAL_SELL]);
-    const profit = total_sell - total_cost;
-    frm.set_value(H_PROFIT, profit);
-
-    // (total - total_cost) / total_cost * 100
-    const cost_pct = total_cost > 0 ? (profit / total_cost) * 100.0 : 0;
-    frm.set_value(H_MARGIN_PCT, cost_pct);
+  function schedule_costing(frm) {
+    clearTimeout(frm._it_costing_timer);
+    frm._it_costing_timer = setTimeout(() => run_costing(frm), COSTING_DEBOUNCE_MS);
   }
 
   function bind_bundle_grid(frm) {
@@ -146,12 +133,7 @@
     g._it_bound = true;
 
     ["change", "row-add", "row-remove"].forEach((ev) => {
-      g.on(ev, () => {
-        recompute_all_bundle_totals(frm);
-        push_costs_from_bundle(frm);
-        recompute_item_margins(frm);
-        recompute_header_totals(frm);
-      });
+      g.on(ev, () => schedule_costing(frm));
     });
   }
 
@@ -170,24 +152,16 @@
       set_bundle_product_query(frm);
       bind_bundle_grid(frm);
 
-      // full recompute on load
-      recompute_all_bundle_totals(frm);
-      push_costs_from_bundle(frm);
-      recompute_item_margins(frm);
-      recompute_header_totals(frm);
-
-      // ensure editable states are correct
+      // saved values are already consistent (validate runs the same engine)
       apply_editability_for_all(frm);
+
+      // large opportunities: map + save the Quotation in a background job
+      if (!frm.is_new()) {
+        it.async_mapping.add_button(frm, __("Quotation (Background)"), "quotation");
+      }
     },
     [H_OVERHEAD](frm) {
-      recompute_header_totals(frm);
-    },
-    before_save(frm) {
-      // keep everything consistent
-      recompute_all_bundle_totals(frm);
-      push_costs_from_bundle(frm);
-      recompute_item_margins(frm);
-      recompute_header_totals(frm);
+      schedule_costing(frm);
     },
   });
 
@@ -198,20 +172,15 @@
       const row = locals[cdt][cdn];
       toggle_cost_edit(frm, row);
       set_bundle_product_query(frm);
-      push_costs_from_bundle(frm);
-      recompute_item_margins(frm);
-      recompute_header_totals(frm);
+      schedule_costing(frm);
     },
 
     // qty/rate changes always reflect totals
     [I_QTY](frm) {
-      push_costs_from_bundle(frm);
-      recompute_item_margins(frm);
-      recompute_header_totals(frm);
+      schedule_costing(frm);
     },
     [I_RATE](frm) {
-      recompute_item_margins(frm);
-      recompute_header_totals(frm);
+      schedule_costing(frm);
     },
 
     // manual edit of non-main cost should recalc line & header
@@ -219,10 +188,7 @@
       const row = locals[cdt][cdn];
       // if user edits a MAIN row by any chance, UI will be locked; but still guard:
       if (!cint(row[I_MAIN])) {
-        row[I_TOTAL_COST] = flt(row[I_QTY]) * flt(row[I_COST_PER]);
-        frm.refresh_field("items");
-        recompute_item_margins(frm);
-        recompute_header_totals(frm);
+        schedule_costing(frm);
       }
     },
 
@@ -235,26 +201,14 @@
 
   // Bundle child quick hooks (if child doctype name is "Product Bundle Item")
   frappe.ui.form.on("Product Bundle Item", {
-    [B_QTY](frm, cdt, cdn)  {
-      const r = locals[cdt][cdn];
-      recompute_bundle_row_total(r);
-      frm.refresh_field(BUNDLE_TABLE);
-      push_costs_from_bundle(frm);
-      recompute_item_margins(frm);
-      recompute_header_totals(frm);
+    [B_QTY](frm) {
+      schedule_costing(frm);
     },
-    [B_COST](frm, cdt, cdn) {
-      const r = locals[cdt][cdn];
-      recompute_bundle_row_total(r);
-      frm.refresh_field(BUNDLE_TABLE);
-      push_costs_from_bundle(frm);
-      recompute_item_margins(frm);
-      recompute_header_totals(frm);
+    [B_COST](frm) {
+      schedule_costing(frm);
     },
     [B_PARENT](frm) {
-      push_costs_from_bundle(frm);
-      recompute_item_margins(frm);
-      recompute_header_totals(frm);
+      schedule_costing(frm);
     },
   });
 })();
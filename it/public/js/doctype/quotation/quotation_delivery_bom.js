@@ -19,11 +19,18 @@ frappe.ui.form.on("Quotation", {
     const empty = !(frm.doc.custom_delivery_bom || []).length;
     if (empty && !frm._delivery_bom_filled) {
       frm._delivery_bom_filled = true;
-      frappe.call({
-        method: "it.api.get_delivery_bom_from_opportunity_bundle",
-        args: { opportunity_name: frm.doc.opportunity },
-        freeze: false
-      }).then(r => fill_qtn_delivery_bom(frm, r && r.message));
+      it.payload.fetch_rows(
+        "it.api.get_delivery_bom_from_opportunity_bundle",
+        { opportunity_name: frm.doc.opportunity },
+        ["item", "item_name", "description", "qty", "custom_parent_product"]
+      ).then(rows => fill_qtn_delivery_bom(frm, rows));
+    }
+  },
+
+  refresh(frm) {
+    // large quotations: map + save the Sales Order in a background job
+    if (frm.doc.docstatus === 1) {
+      it.async_mapping.add_button(frm, __("Sales Order (Background)"), "sales_order");
     }
   }
 });
@@ -28,11 +28,11 @@ frappe.ui.form.on("Sales Order", {
     const empty = !(frm.doc.custom_delivery_bom || []).length;
     if (empty && !frm._delivery_bom_filled) {
       frm._delivery_bom_filled = true;
-      frappe.call({
-        method: "it.api.get_delivery_bom_from_quotation",
-        args: { quotation_name: qtn },
-        freeze: false
-      }).then(r => fill_so_delivery_bom(frm, r && r.message));
+      it.payload.fetch_rows(
+        "it.api.get_delivery_bom_from_quotation",
+        { quotation_name: qtn },
+        ["item", "item_name", "description", "qty"]
+      ).then(rows => fill_so_delivery_bom(frm, rows));
     }
   }
 });
@@ -48,7 +48,8 @@ function build_po_selection_dialog(frm) {
     qty: it.qty || 0,
     uom: it.uom,
     conversion_factor: it.conversion_factor || 1,
-    sales_order_item: it.name
+    sales_order_item: it.name,
+    delivery_bom_row: null
   }));
 
   const bomItems = (frm.doc.custom_delivery_bom || []).map((r, idx) => ({
@@ -60,7 +61,8 @@ function build_po_selection_dialog(frm) {
     qty: r.qty || 0,
     uom: r.uom,
     conversion_factor: 1,
-    sales_order_item: null
+    sales_order_item: null,
+    delivery_bom_row: r.name
   }));
 
   const rows = [...soItems, ...bomItems].filter(r => r.item_code);
@@ -89,7 +91,8 @@ function build_po_selection_dialog(frm) {
           qty: qty,
           uom: data.uom,
           conversion_factor: data.conversion_factor,
-          sales_order_item: data.sales_order_item
+          sales_order_item: data.sales_order_item,
+          delivery_bom_row: data.delivery_bom_row
         });
       });
 
@@ -161,5 +164,56 @@ frappe.ui.form.on("Sales Order", {
     frm.add_custom_button(__("Purchase Order"), () => {
       build_po_selection_dialog(frm);
     }, __("Create"));
+
+    // large orders: map + save the Delivery Note in a background job
+    if (frm.doc.docstatus === 1 && frm.doc.per_delivered < 100) {
+      it.async_mapping.add_button(frm, __("Delivery Note (Background)"), "delivery_note");
+    }
+
+    if ((frm.doc.custom_delivery_bom || []).length) {
+      frm.add_custom_button(__("Component Availability"), () => {
+        show_component_availability(frm);
+      }, __("View"));
+    }
   }
 });
+
+// --- component stock check (custom_delivery_bom vs Bin, cached server side) ---
+function show_component_availability(frm) {
+  frappe.call({
+    method: "it.handlers.component_stock.get_component_availability",
+    args: { sales_order: frm.doc.name },
+    freeze: true
+  }).then(r => {
+    const lines = (r && r.message) || [];
+    const where = frm.doc.set_warehouse || __("All Warehouses");
+    const html = [
+      '<table class="table table-bordered table-condensed">',
+      '<thead><tr>',
+      `<th>${__("Item")}</th>`,
+      `<th class="text-right">${__("Required")}</th>`,
+      `<th class="text-right">${__("Available")} (${frappe.utils.escape_html(where)})</th>`,
+      `<th class="text-right">${__("Shortage")}</th>`,
+      `<th>${__("Stock by Warehouse")}</th>`,
+      '</tr></thead><tbody>',
+      lines.map(l => `
+        <tr class="${l.shortage_qty > 0 ? "text-danger" : ""}">
+          <td>${frappe.utils.escape_html(l.item)}<br><span class="text-muted">${frappe.utils.escape_html(l.item_name || "")}</span></td>
+          <td class="text-right">${format_number(l.required_qty)}</td>
+          <td class="text-right">${format_number(l.available_qty)}</td>
+          <td class="text-right">${l.shortage_qty > 0 ? format_number(l.shortage_qty) : ""}</td>
+          <td>${(l.bins || []).map(b =>
+            `${frappe.utils.escape_html(b.warehouse)}: ${format_number(b.actual_qty - b.reserved_qty)}`).join("<br>")}</td>
+        </tr>`).join(""),
+      '</tbody></table>'
+    ].join("");
+
+    const d = new frappe.ui.Dialog({
+      title: __("Component Availability"),
+      size: "extra-large",
+      fields: [{ fieldtype: "HTML", fieldname: "availability" }]
+    });
+    d.fields_dict.availability.$wrapper.html(html);
+    d.show();
+  });
+}
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, nowdate
+
+from it.api import _item_attr, _prefetch_items, append_so_bundle_lines
+from it.handlers.delivery_bom_ledger import ROW_LINK_FIELD, TRACE_FIELD, open_order_qty, pending_purchase_qty
+
+# ----------------------------------------------------------------------
+# Multi Sales Order -> one Purchase Order per supplier
+# ----------------------------------------------------------------------
+# Lines are built with the same bundle mapper as the form button, limited to
+# the quantity not yet on a draft or submitted Purchase Order, so running the
+# job again orders nothing twice. The default supplier (Item Default) and
+# buying rate (Item Price, falling back to Item.last_purchase_rate) of every
+# item are resolved with one query each, and lines are grouped into one draft
+# PO per (company, supplier).
+REPORT_TTL = 24 * 60 * 60
+EXCLUDED_STATUSES = ("Closed", "On Hold")
+PROGRESS_EVENT = "it_supplier_po_progress"
+DONE_EVENT = "it_supplier_po_done"
+
+PO_LINE_FIELDS = (
+    "item_code", "item_name", "description", "qty", "uom", "conversion_factor",
+    "schedule_date", "sales_order", "sales_order_item", ROW_LINK_FIELD, TRACE_FIELD,
+)
+
+
+def _report_key(report_id: str) -> str:
+    return f"it:supplier_po:{report_id}"
+
+
+def _default_suppliers(item_codes, companies) -> dict[tuple[str, str], str]:
+    """(item_code, company) -> default supplier, one Item Default query."""
+    if not item_codes:
+        return {}
+    return {
+        (d.parent, d.company): d.default_supplier
+        for d in frappe.get_all(
+            "Item Default",
+            filters={
+                "parenttype": "Item",
+                "parent": ["in", list(item_codes)],
+                "company": ["in", list(companies)],
+                "default_supplier": ["is", "set"],
+            },
+            fields=["parent", "company", "default_supplier"],
+        )
+    }
+
+
+def _buying_rates(item_codes) -> dict[tuple[str, str | None, str | None], float]:
+    """
+    (item_code, supplier or None, uom or None) -> currently valid price of the
+    default buying price list, one Item Price query.
+    """
+    price_list = frappe.db.get_single_value("Buying Settings", "buying_price_list")
+    if not item_codes or not price_list:
+        return {}
+
+    today = nowdate()
+    rates: dict[tuple[str, str | None, str | None], float] = {}
+    # newest validity first: the first price seen per key wins
+    for p in frappe.get_all(
+        "Item Price",
+        filters={"price_list": price_list, "buying": 1, "item_code": ["in", list(item_codes)]},
+        fields=["item_code", "supplier", "uom", "price_list_rate", "valid_from", "valid_upto"],
+        order_by="valid_from desc, modified desc",
+    ):
+        if (p.valid_from and str(p.valid_from) > today) or (p.valid_upto and str(p.valid_upto) < today):
+            continue
+        rates.setdefault((p.item_code, p.supplier or None, p.uom or None), flt(p.price_list_rate))
+    return rates
+
+
+def _line_rate(rates, line: dict, supplier: str) -> float:
+    """Price in the line's UOM; a stock UOM (or UOM-less) price is scaled by the conversion factor."""
+    item_code, uom = line["item_code"], line.get("uom")
+    stock_uom = _item_attr(item_code, "stock_uom")
+    factor = flt(line.get("conversion_factor")) or 1
+    for party in (supplier, None):
+        if (item_code, party, uom) in rates:
+            return rates[(item_code, party, uom)]
+        for price_uom in (stock_uom, None):
+            if (item_code, party, price_uom) in rates:
+                return rates[(item_code, party, price_uom)] * factor
+    return flt(_item_attr(item_code, "last_purchase_rate")) * factor
+
+
+@frappe.whitelist()
+def enqueue_supplier_purchase_orders(sales_orders, consolidate: int = 1):
+    """Queue the per-supplier Purchase Order run for many Sales Orders; returns the report id."""
+    frappe.has_permission("Purchase Order", "create", throw=True)
+
+    sales_orders = frappe.parse_json(sales_orders) if sales_orders else []
+    names = list(
+        dict.fromkeys(
+            frappe.get_all(
+                "Sales Order",
+                filters={
+                    "name": ["in", [n for n in sales_orders if isinstance(n, str)]],
+                    "docstatus": 1,
+                    "status": ["not in", EXCLUDED_STATUSES],
+                },
+                pluck="name",
+                order_by="name asc",
+            )
+        )
+    )
+    # the run reads every order server side: keep only the ones the user may read
+    names = [n for n in names if frappe.has_permission("Sales Order", "read", doc=n)]
+    if not names:
+        frappe.throw(_("No open submitted Sales Orders selected"))
+
+    report_id = frappe.generate_hash(length=12)
+    frappe.cache().set_value(
+        _report_key(report_id),
+        {"status": "Queued", "sales_orders": names, "user": frappe.session.user},
+        expires_in_sec=REPORT_TTL,
+    )
+    frappe.enqueue(
+        "it.purchasing.run_supplier_purchase_orders",
+        queue="long",
+        timeout=max(1500, len(names) * 20),
+        job_name=f"it_supplier_po_{report_id}",
+        sales_orders=names,
+        consolidate=cint(consolidate),
+        report_id=report_id,
+        user=frappe.session.user,
+    )
+    return {"report_id": report_id, "sales_orders": len(names)}
+
+
+def run_supplier_purchase_orders(sales_orders: list[str], consolidate: int, report_id: str, user: str | None = None):
+    """Background job: build, price and group lines, then insert one draft PO per supplier."""
+    report = {"status": "Running", "user": user, "created": [], "failed": [], "unassigned": [], "skipped": []}
+
+    # 1) pending lines per Sales Order, from the bundle mapper (in memory only)
+    open_qty = open_order_qty(sales_orders)
+    lines: list[dict] = []
+    for so_name in sales_orders:
+        try:
+            so = frappe.get_doc("Sales Order", so_name)
+            if so.status in EXCLUDED_STATUSES:
+                report["skipped"].append({"sales_order": so_name, "error": _("Sales Order is {0}").format(_(so.status))})
+                continue
+            po = frappe.new_doc("Purchase Order")
+            append_so_bundle_lines(po, so, consolidate, pending=pending_purchase_qty(so, open_qty[so_name]))
+        except Exception as e:
+            report["skipped"].append({"sales_order": so_name, "error": str(e) or e.__class__.__name__})
+            continue
+        if not po.items:
+            report["skipped"].append({"sales_order": so_name, "error": _("Nothing left to order")})
+            continue
+        for d in po.items:
+            line = {f: d.get(f) for f in PO_LINE_FIELDS}
+            line["company"] = so.company
+            line["sales_order"] = line.get("sales_order") or so_name
+            lines.append(line)
+
+    # 2) suppliers and rates for every item of the run, in bulk
+    item_codes = {l["item_code"] for l in lines}
+    _prefetch_items(item_codes)
+    suppliers = _default_suppliers(item_codes, {l["company"] for l in lines})
+    rates = _buying_rates(item_codes)
+
+    groups: dict[tuple[str, str], list[dict]] = {}
+    for line in lines:
+        supplier = suppliers.get((line["item_code"], line["company"]))
+        if not supplier:
+            report["unassigned"].append(
+                {"sales_order": line["sales_order"], "item_code": line["item_code"], "qty": line["qty"]}
+            )
+            continue
+        line["rate"] = _line_rate(rates, line, supplier)
+        groups.setdefault((line["company"], supplier), []).append(line)
+
+    # 3) one draft PO per (company, supplier)
+    total = len(groups)
+    for i, ((company, supplier), group) in enumerate(sorted(groups.items()), 1):
+        frappe.db.savepoint("it_supplier_po")
+        try:
+            po = frappe.new_doc("Purchase Order")
+            po.company = company
+            po.supplier = supplier
+            po.schedule_date = min((l["schedule_date"] for l in group if l.get("schedule_date")), default=None)
+            for line in group:
+                row = po.append("items", {})
+                for f in (*PO_LINE_FIELDS, "rate"):
+                    if line.get(f) is not None:
+                        row.set(f, line[f])
+            po.run_method("set_missing_values")
+            po.run_method("calculate_taxes_and_totals")
+            po.insert()
+            frappe.db.commit()
+            report["created"].append(
+                {
+                    "name": po.name,
+                    "supplier": supplier,
+                    "company": company,
+                    "lines": len(group),
+                    "sales_orders": sorted({l["sales_order"] for l in group}),
+                }
+            )
+        except Exception as e:
+            frappe.db.rollback(save_point="it_supplier_po")
+            report["failed"].append({"supplier": supplier, "company": company, "error": str(e) or e.__class__.__name__})
+            frappe.log_error(title=f"Supplier Purchase Order for {supplier} failed")
+        finally:
+            frappe.local.message_log = []
+
+        frappe.publish_realtime(PROGRESS_EVENT, {"report_id": report_id, "done": i, "total": total}, user=user)
+
+    report["status"] = "Completed"
+    frappe.cache().set_value(_report_key(report_id), report, expires_in_sec=REPORT_TTL)
+    frappe.publish_realtime(DONE_EVENT, dict(report, report_id=report_id), user=user)
+    return report
+
+
+@frappe.whitelist()
+def get_supplier_purchase_order_report(report_id: str):
+    """The run's report, for the user who started it (or a System Manager)."""
+    report = frappe.cache().get_value(_report_key(report_id))
+    if report and report.get("user") != frappe.session.user and "System Manager" not in frappe.get_roles():
+        frappe.throw(_("Not permitted"), frappe.PermissionError)
+    return report
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import frappe
+from frappe import _
+from frappe.model.meta import get_field_precision
+from frappe.utils import flt, nowdate
+
+# ----------------------------------------------------------------------
+# Build Sheet repricing
+# ----------------------------------------------------------------------
+# Every `tabBuild Sheet` row is repriced in one pass: the cost (Bin valuation,
+# or the buying price list) and the selling price of all referenced items are
+# read with one query per source, margin / price_delta are recomputed column
+# by column over plain lists, and only rows whose values moved are written back
+# with frappe.db.bulk_update (CASE ... WHEN batches), no parent doc is saved.
+COST_SOURCES = ("Valuation Rate", "Buying Price List")
+UPDATE_BATCH = 500
+REPRICED_FIELDS = ("base_cost", "selling_price", "margin", "price_delta")
+
+
+def _price_list_rates(price_list: str | None, item_codes, buying: bool) -> dict[str, float]:
+    """item_code -> currently valid generic rate of `price_list`, one Item Price query."""
+    if not price_list or not item_codes:
+        return {}
+    party_field = "supplier" if buying else "customer"
+    today = nowdate()
+    rates: dict[str, float] = {}
+    # newest validity first: the first rate seen per item wins
+    for p in frappe.get_all(
+        "Item Price",
+        filters={
+            "price_list": price_list,
+            "item_code": ["in", list(item_codes)],
+            party_field: ["is", "not set"],
+        },
+        fields=["item_code", "price_list_rate", "valid_from", "valid_upto"],
+        order_by="valid_from desc, modified desc",
+    ):
+        if (p.valid_from and str(p.valid_from) > today) or (p.valid_upto and str(p.valid_upto) < today):
+            continue
+        rates.setdefault(p.item_code, flt(p.price_list_rate))
+    return rates
+
+
+def _valuation_rates(item_codes) -> dict[str, float]:
+    """item_code -> stock weighted valuation rate over all warehouses, one Bin query."""
+    if not item_codes:
+        return {}
+    return {
+        item_code: flt(value) / flt(qty)
+        for item_code, qty, value in frappe.db.sql(
+            """select item_code, sum(actual_qty), sum(stock_value)
+                from `tabBin`
+                where item_code in %(items)s
+                group by item_code
+                having sum(actual_qty) > 0""",
+            {"items": list(item_codes)},
+        )
+    }
+
+
+def _precisions() -> dict[str, int]:
+    meta = frappe.get_meta("Build Sheet")
+    return {f: get_field_precision(meta.get_field(f)) or 2 for f in REPRICED_FIELDS}
+
+
+@frappe.whitelist()
+def enqueue_build_sheet_repricing(
+    cost_source: str = "Valuation Rate",
+    buying_price_list: str | None = None,
+    selling_price_list: str | None = None,
+    parenttype: str | None = None,
+):
+    """Queue a repricing of every Build Sheet row (optionally of one parent doctype)."""
+    frappe.only_for(("System Manager", "Item Manager"))
+    if cost_source not in COST_SOURCES:
+        frappe.throw(_("Cost source must be one of {0}").format(", ".join(COST_SOURCES)))
+    frappe.enqueue(
+        "it.repricing.reprice_build_sheets",
+        queue="long",
+        timeout=3600,
+        job_name="it_build_sheet_repricing",
+        cost_source=cost_source,
+        buying_price_list=buying_price_list,
+        selling_price_list=selling_price_list,
+        parenttype=parenttype,
+    )
+
+
+def reprice_build_sheets(
+    cost_source: str = "Valuation Rate",
+    buying_price_list: str | None = None,
+    selling_price_list: str | None = None,
+    parenttype: str | None = None,
+) -> dict:
+    """Recompute base_cost, selling_price, margin and price_delta; returns counts."""
+    rows = frappe.get_all(
+        "Build Sheet",
+        filters={"parenttype": parenttype} if parenttype else None,
+        fields=["name", "item_code", "qty", *REPRICED_FIELDS],
+        order_by="name asc",
+    )
+    if not rows:
+        return {"rows": 0, "updated": 0}
+
+    item_codes = {r.item_code for r in rows if r.item_code}
+    buying_price_list = buying_price_list or frappe.db.get_single_value("Buying Settings", "buying_price_list")
+    selling_price_list = selling_price_list or frappe.db.get_single_value("Selling Settings", "selling_price_list")
+
+    buying = _price_list_rates(buying_price_list, item_codes, buying=True)
+    costs = _valuation_rates(item_codes) if cost_source == "Valuation Rate" else {}
+    costs = dict(buying, **costs)  # valuation wins, buying price list fills the gaps
+    selling = _price_list_rates(selling_price_list, item_codes, buying=False)
+
+    # columns; an item without a price keeps its current value
+    names = [r.name for r in rows]
+    old = {f: [flt(r.get(f)) for r in rows] for f in REPRICED_FIELDS}
+    cost = [costs.get(r.item_code, c) for r, c in zip(rows, old["base_cost"], strict=True)]
+    sell = [selling.get(r.item_code, s) for r, s in zip(rows, old["selling_price"], strict=True)]
+    # margin is per unit (of selling), price_delta is for the row's qty
+    margin = [((s - c) / s * 100.0) if s else 0.0 for s, c in zip(sell, cost, strict=True)]
+    delta = [(s - c) * flt(r.qty) for r, s, c in zip(rows, sell, cost, strict=True)]
+
+    precision = _precisions()
+    new = {
+        f: [flt(v, precision[f]) for v in column]
+        for f, column in zip(REPRICED_FIELDS, (cost, sell, margin, delta), strict=True)
+    }
+    changed = [
+        i for i in range(len(names))
+        if any(new[f][i] != flt(old[f][i], precision[f]) for f in REPRICED_FIELDS)
+    ]
+
+    if changed:
+        frappe.db.bulk_update(
+            "Build Sheet",
+            {names[i]: {f: new[f][i] for f in REPRICED_FIELDS} for i in changed},
+            chunk_size=UPDATE_BATCH,
+        )
+        frappe.db.commit()
+
+    return {"rows": len(rows), "updated": len(changed), "priced_items": len(set(costs) | set(selling))}
@@ -0,0 +1,44 @@
+# Copyright (c) 2026, Connect 4 Systems and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from it import repricing
+
+
+def _row(name, qty, base_cost=0.0, selling_price=0.0):
+	return frappe._dict(
+		name=name,
+		item_code="TEST-RP-ITEM",
+		qty=qty,
+		base_cost=base_cost,
+		selling_price=selling_price,
+		margin=0.0,
+		price_delta=0.0,
+	)
+
+
+class TestRepricing(FrappeTestCase):
+	def _reprice(self, rows, cost, selling):
+		with (
+			patch.object(repricing.frappe, "get_all", return_value=rows),
+			patch.object(repricing.frappe.db, "get_single_value", return_value=None),
+			patch.object(repricing.frappe.db, "bulk_update") as bulk_update,
+			patch.object(repricing.frappe.db, "commit"),
+			patch.object(repricing, "_valuation_rates", return_value={"TEST-RP-ITEM": cost}),
+			patch.object(repricing, "_price_list_rates", side_effect=lambda pl, items, buying: {} if buying else {"TEST-RP-ITEM": selling}),
+			patch.object(repricing, "_precisions", return_value=dict.fromkeys(repricing.REPRICED_FIELDS, 2)),
+		):
+			repricing.reprice_build_sheets()
+		return bulk_update.call_args.args[1]
+
+	def test_price_delta_scales_with_qty_margin_is_per_unit(self):
+		updates = self._reprice([_row("BS-1", 1), _row("BS-3", 3)], cost=60.0, selling=100.0)
+
+		self.assertEqual(updates["BS-1"]["price_delta"], 40.0)
+		self.assertEqual(updates["BS-3"]["price_delta"], 120.0)
+		self.assertEqual(updates["BS-1"]["margin"], 40.0)
+		self.assertEqual(updates["BS-3"]["margin"], 40.0)